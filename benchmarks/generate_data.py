@@ -0,0 +1,243 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module generates synthetic Data files for the benchmarks.
+
+The rows are derived from the `template.csv` bundled for each message type,
+so that they are valid for its template and XSD schema: every row gets its
+own transaction identifiers and a pseudo-random amount, and the group header
+columns (`nb_of_txs`, `ctrl_sum`) match the generated rows. The same seed
+always gives the same data.
+
+Usage:
+    python -m benchmarks.generate_data -t pain.001.001.03 -n 100000 -o data
+"""
+
+import csv
+import decimal
+import os
+import random
+import sqlite3
+
+import click
+
+from pain001.constants.constants import valid_xml_types
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.db.validate_db_data import required_columns
+
+# The directory of the templates bundled with pain001
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "pain001",
+    "templates",
+)
+
+# The message types for which a template is bundled
+MESSAGE_TYPES = tuple(
+    message_type
+    for message_type in valid_xml_types
+    if os.path.isdir(os.path.join(TEMPLATES_DIR, message_type))
+)
+
+# The columns holding the identifiers of a transaction
+TRANSACTION_ID_COLUMNS = (
+    "payment_id",
+    "payment_instruction_id",
+    "payment_end_to_end_id",
+    "instruction_id",
+    "end_to_end_id",
+)
+
+# The value of required SQLite columns that a message type does not use
+FILLER_VALUE = "NOTPROVIDED"
+
+
+def generate_rows(payment_initiation_message_type, row_count, seed=0):
+    """Generates valid rows of payment data for a message type.
+
+    Args:
+        payment_initiation_message_type (str): The message type, for example
+            "pain.001.001.03".
+        row_count (int): The number of rows to generate.
+        seed (int): The seed of the pseudo-random amounts.
+
+    Returns:
+        list: The rows, as dictionaries keyed by column name.
+    """
+    template_rows = load_csv_data(
+        os.path.join(
+            TEMPLATES_DIR, payment_initiation_message_type, "template.csv"
+        )
+    )
+    amounts = random.Random(seed)
+    cents = decimal.Decimal("0.01")
+
+    rows = []
+    ctrl_sum = decimal.Decimal(0)
+    for index in range(row_count):
+        row = dict(template_rows[index % len(template_rows)])
+        for column in TRANSACTION_ID_COLUMNS:
+            if column in row:
+                row[column] = f"{column.upper()[:8]}-{index + 1}"
+        amount = decimal.Decimal(amounts.randint(1, 10_000_000)) * cents
+        row["payment_amount"] = str(amount)
+        ctrl_sum += amount
+        rows.append(row)
+
+    for row in rows:
+        row["nb_of_txs"] = str(row_count)
+        if "ctrl_sum" in row:
+            row["ctrl_sum"] = str(ctrl_sum)
+    return rows
+
+
+def write_csv_data(rows, data_file_path):
+    """Writes rows to a CSV Data file.
+
+    Args:
+        rows (list): The rows, as dictionaries keyed by column name.
+        data_file_path (str): The path of the CSV file.
+
+    Returns:
+        None
+    """
+    with open(data_file_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_db_data(rows, data_file_path, table_name="pain001"):
+    """Writes rows to the table of an SQLite Data file.
+
+    The table has the columns of the rows, plus the columns required by
+    `validate_db_table` that the rows lack, filled with a placeholder.
+
+    Args:
+        rows (list): The rows, as dictionaries keyed by column name.
+        data_file_path (str): The path of the SQLite file.
+        table_name (str): The name of the table.
+
+    Returns:
+        None
+    """
+    columns = list(rows[0])
+    columns += [column for column in required_columns if column not in rows[0]]
+
+    if os.path.exists(data_file_path):
+        os.remove(data_file_path)
+    conn = sqlite3.connect(data_file_path)
+    try:
+        conn.execute(
+            f"CREATE TABLE {table_name} "
+            f"({', '.join(f'{column} TEXT' for column in columns)})"
+        )
+        conn.executemany(
+            f"INSERT INTO {table_name} "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            (
+                [row.get(column, FILLER_VALUE) for column in columns]
+                for row in rows
+            ),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def generate_data_file(
+    payment_initiation_message_type, row_count, data_dir, data_format, seed=0
+):
+    """Returns the path of a synthetic Data file, generating it if needed.
+
+    Files are named after the message type, row count and seed, so that they
+    are only generated once and can be reused by later runs.
+
+    Args:
+        payment_initiation_message_type (str): The message type.
+        row_count (int): The number of rows.
+        data_dir (str): The directory of the Data files.
+        data_format (str): "csv" or "db".
+        seed (int): The seed of the pseudo-random amounts.
+
+    Returns:
+        str: The path of the Data file.
+    """
+    data_file_path = os.path.join(
+        data_dir,
+        f"{payment_initiation_message_type}-{row_count}-{seed}.{data_format}",
+    )
+    if not os.path.exists(data_file_path):
+        os.makedirs(data_dir, exist_ok=True)
+        rows = generate_rows(payment_initiation_message_type, row_count, seed)
+        writer = write_csv_data if data_format == "csv" else write_db_data
+        writer(rows, data_file_path)
+    return data_file_path
+
+
+@click.command(context_settings=dict(help_option_names=["-h", "--help"]))
+@click.option(
+    "-t",
+    "--xml_message_type",
+    "message_types",
+    multiple=True,
+    type=click.Choice(MESSAGE_TYPES),
+    help="Message type to generate data for (default: all)",
+)
+@click.option(
+    "-n",
+    "--rows",
+    "row_counts",
+    multiple=True,
+    type=click.IntRange(min=1),
+    default=[1000],
+    show_default=True,
+    help="Number of rows of each Data file",
+)
+@click.option(
+    "-f",
+    "--format",
+    "data_formats",
+    multiple=True,
+    type=click.Choice(["csv", "db"]),
+    default=["csv", "db"],
+    show_default=True,
+    help="Format of the Data files",
+)
+@click.option(
+    "-o",
+    "--data_dir",
+    default="benchmarks/data",
+    show_default=True,
+    type=click.Path(file_okay=False),
+    help="Directory of the Data files",
+)
+@click.option("--seed", default=0, show_default=True, help="Random seed")
+def main(message_types, row_counts, data_formats, data_dir, seed):
+    """Generates synthetic Data files for the benchmarks."""
+    for message_type in message_types or MESSAGE_TYPES:
+        for row_count in row_counts:
+            for data_format in data_formats:
+                click.echo(
+                    generate_data_file(
+                        message_type, row_count, data_dir, data_format, seed
+                    )
+                )
+
+
+if __name__ == "__main__":
+    # pylint: disable=no-value-for-parameter
+    main()
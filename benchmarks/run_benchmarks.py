@@ -0,0 +1,400 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module measures the throughput of pain001 on synthetic Data files.
+
+Each case (message type, number of rows and Data file format) is timed stage
+by stage, the way `process_files` runs them:
+
+- `load`: reading the rows of the Data file,
+- `validate`: checking the rows (inside SQLite for SQLite files),
+- `render`: preparing the data and rendering the XML template,
+- `xsd_validate`: validating the rendered XML against the XSD schema,
+- `write`: writing the XML file.
+
+Templates and schemas are compiled before timing starts, so that the stages
+measure the work done per Data file. The results are written as JSON and can
+be compared with those of an earlier run, which makes the command exit with
+an error when a stage has become slower than the allowed threshold.
+
+Usage:
+    python -m benchmarks.run_benchmarks -n 1000 -n 100000 -o results.json
+    python -m benchmarks.run_benchmarks -b baseline.json
+    python -m benchmarks.run_benchmarks -n 100000 -e direct
+"""
+
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import click
+
+from benchmarks.generate_data import (
+    MESSAGE_TYPES,
+    TEMPLATES_DIR,
+    generate_data_file,
+)
+from pain001.constants.constants import valid_xml_engines
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.csv.validate_csv_data import validate_csv_data
+from pain001.db.load_db_data import load_db_data
+from pain001.db.validate_db_data import validate_db_table
+from pain001.xml.load_xml_template import load_xml_template
+from pain001.xml.load_xsd_schema import load_xsd_schema
+from pain001.xml.prepare_xml_data import (
+    get_message_columns,
+    prepare_xml_data,
+)
+from pain001.xml.register_namespaces import register_namespaces
+from pain001.xml.xsd_stream_validator import XsdStreamValidator
+
+# The stages of the generation of a message, in order
+STAGES = ("load", "validate", "render", "xsd_validate", "write")
+
+# The row counts of the full benchmark suite
+SUITE_ROW_COUNTS = (1_000, 100_000, 1_000_000)
+
+
+def run_case(
+    payment_initiation_message_type, data_file_path, output_dir, engine="jinja"
+):
+    """Generates a message from a Data file and times each of its stages.
+
+    Args:
+        payment_initiation_message_type (str): The message type.
+        data_file_path (str): The path of the CSV or SQLite Data file.
+        output_dir (str): The directory of the generated XML file.
+        engine (str): The engine rendering the XML template.
+
+    Returns:
+        dict: The time of each stage in seconds and the size of the XML
+        file in bytes.
+
+    Raises:
+        ValueError: If the data or the generated XML is invalid.
+    """
+    template_dir = os.path.join(TEMPLATES_DIR, payment_initiation_message_type)
+    xml_file_path = os.path.join(template_dir, "template.xml")
+    xsd_file_path = os.path.join(
+        template_dir, f"{payment_initiation_message_type}.xsd"
+    )
+    output_file_path = os.path.join(
+        output_dir, f"{payment_initiation_message_type}.xml"
+    )
+
+    # Compile the template and the schema before timing
+    template = load_xml_template(xml_file_path, engine)
+    load_xsd_schema(xsd_file_path)
+    register_namespaces(payment_initiation_message_type)
+
+    stages = {}
+    clock = time.perf_counter()
+
+    def lap(stage):
+        nonlocal clock
+        now = time.perf_counter()
+        stages[stage] = now - clock
+        clock = now
+
+    if data_file_path.endswith(".csv"):
+        data = load_csv_data(data_file_path)
+        lap("load")
+        is_valid = validate_csv_data(data)
+        lap("validate")
+    else:
+        # SQLite tables are validated before they are loaded
+        is_valid = validate_db_table(data_file_path, "pain001")
+        lap("validate")
+        data = load_db_data(
+            data_file_path,
+            "pain001",
+            columns=get_message_columns(payment_initiation_message_type),
+        )
+        lap("load")
+    if not is_valid:
+        raise ValueError(f"Error: Invalid data in '{data_file_path}'.")
+
+    xml_content = template.render(
+        **prepare_xml_data(data[0], data, payment_initiation_message_type)
+    )
+    lap("render")
+
+    validator = XsdStreamValidator(xsd_file_path)
+    validator.feed(xml_content)
+    if not validator.close():
+        raise ValueError(
+            f"Error: Invalid XML generated from '{data_file_path}'."
+        )
+    lap("xsd_validate")
+
+    with open(output_file_path, "w") as xml_file:
+        xml_file.write(xml_content)
+    lap("write")
+
+    return {
+        "stages": {stage: stages[stage] for stage in STAGES},
+        "size": os.path.getsize(output_file_path),
+    }
+
+
+def run_benchmarks(
+    message_types,
+    row_counts,
+    data_formats,
+    data_dir,
+    repeat=1,
+    seed=0,
+    engine="jinja",
+):
+    """Runs every benchmark case and collects the results.
+
+    Args:
+        message_types (list): The message types to benchmark.
+        row_counts (list): The numbers of rows to benchmark.
+        data_formats (list): The formats of the Data files, "csv" or "db".
+        data_dir (str): The directory of the synthetic Data files.
+        repeat (int): The number of runs of each case; the fastest time of
+            each stage is kept.
+        seed (int): The seed of the synthetic data.
+        engine (str): The engine rendering the XML templates.
+
+    Returns:
+        dict: The environment of the run and the result of each case.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for message_type in message_types:
+            for row_count in row_counts:
+                for data_format in data_formats:
+                    data_file_path = generate_data_file(
+                        message_type, row_count, data_dir, data_format, seed
+                    )
+                    runs = [
+                        run_case(
+                            message_type, data_file_path, output_dir, engine
+                        )
+                        for _ in range(repeat)
+                    ]
+                    stages = {
+                        stage: min(run["stages"][stage] for run in runs)
+                        for stage in STAGES
+                    }
+                    total = sum(stages.values())
+                    results.append(
+                        {
+                            "message_type": message_type,
+                            "rows": row_count,
+                            "format": data_format,
+                            "stages": stages,
+                            "total": total,
+                            "rows_per_second": row_count / total,
+                            "size": runs[0]["size"],
+                        }
+                    )
+                    print_result(results[-1])
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "engine": engine,
+        "results": results,
+    }
+
+
+def compare_results(results, baseline, threshold=1.2):
+    """Finds the stages that are slower than in a baseline run.
+
+    Args:
+        results (dict): The results of the current run.
+        baseline (dict): The results of the baseline run.
+        threshold (float): The ratio of the current time to the baseline
+            time above which a stage is reported as slower.
+
+    Returns:
+        list: A `(case, stage, baseline time, current time)` tuple for each
+        slower stage, where `case` is `(message type, rows, format)`.
+    """
+    baseline_cases = {_case(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        baseline_result = baseline_cases.get(_case(result))
+        if baseline_result is None:
+            continue
+        for stage in STAGES + ("total",):
+            if stage == "total":
+                before, after = baseline_result["total"], result["total"]
+            else:
+                before = baseline_result["stages"].get(stage)
+                after = result["stages"][stage]
+            if before and after > before * threshold:
+                regressions.append((_case(result), stage, before, after))
+    return regressions
+
+
+def print_result(result):
+    """Prints the timings of a benchmark case on one line."""
+    stages = "  ".join(
+        f"{stage} {seconds:.3f}s"
+        for stage, seconds in result["stages"].items()
+    )
+    print(
+        f"{result['message_type']} {result['rows']:>9} {result['format']:<3}  "
+        f"{stages}  total {result['total']:.3f}s "
+        f"({result['rows_per_second']:.0f} rows/s)"
+    )
+
+
+def _case(result):
+    """Returns the key identifying a benchmark case."""
+    return (result["message_type"], result["rows"], result["format"])
+
+
+@click.command(context_settings=dict(help_option_names=["-h", "--help"]))
+@click.option(
+    "-t",
+    "--xml_message_type",
+    "message_types",
+    multiple=True,
+    type=click.Choice(MESSAGE_TYPES),
+    help="Message type to benchmark (default: all)",
+)
+@click.option(
+    "-n",
+    "--rows",
+    "row_counts",
+    multiple=True,
+    type=click.IntRange(min=1),
+    default=[1000],
+    show_default=True,
+    help="Number of rows of the Data files",
+)
+@click.option(
+    "--suite",
+    is_flag=True,
+    default=False,
+    help=(
+        "Run the full suite at "
+        f"{', '.join(str(count) for count in SUITE_ROW_COUNTS)} rows"
+    ),
+)
+@click.option(
+    "-f",
+    "--format",
+    "data_formats",
+    multiple=True,
+    type=click.Choice(["csv", "db"]),
+    default=["csv", "db"],
+    show_default=True,
+    help="Format of the Data files",
+)
+@click.option(
+    "-d",
+    "--data_dir",
+    default="benchmarks/data",
+    show_default=True,
+    type=click.Path(file_okay=False),
+    help="Directory of the synthetic Data files",
+)
+@click.option(
+    "-r",
+    "--repeat",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of runs of each case, the fastest being kept",
+)
+@click.option(
+    "-o",
+    "--output",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="JSON file in which the results are saved",
+)
+@click.option(
+    "-b",
+    "--baseline",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON results of an earlier run to compare against",
+)
+@click.option(
+    "--threshold",
+    default=1.2,
+    show_default=True,
+    type=click.FloatRange(min=1),
+    help="Slowdown ratio above which a stage is reported as a regression",
+)
+@click.option("--seed", default=0, show_default=True, help="Random seed")
+@click.option(
+    "-e",
+    "--engine",
+    default="jinja",
+    show_default=True,
+    type=click.Choice(valid_xml_engines),
+    help="Engine rendering the XML templates",
+)
+def main(
+    message_types,
+    row_counts,
+    suite,
+    data_formats,
+    data_dir,
+    repeat,
+    output,
+    baseline,
+    threshold,
+    seed,
+    engine,
+):
+    """Measures the throughput of each stage of pain001."""
+    results = run_benchmarks(
+        message_types or MESSAGE_TYPES,
+        SUITE_ROW_COUNTS if suite else row_counts,
+        data_formats,
+        data_dir,
+        repeat=repeat,
+        seed=seed,
+        engine=engine,
+    )
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"Results saved to `{output}`")
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            regressions = compare_results(
+                results, json.load(baseline_file), threshold
+            )
+        for case, stage, before, after in regressions:
+            print(
+                f"SLOWER {' '.join(str(part) for part in case)} {stage}: "
+                f"{before:.3f}s -> {after:.3f}s (x{after / before:.2f})"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"No stage is slower than x{threshold} the baseline.")
+
+
+if __name__ == "__main__":
+    # pylint: disable=no-value-for-parameter
+    main()
@@ -15,3 +15,13 @@
 
 """The Python pain001 module."""
 __version__ = "0.0.25"
+
+
+def __getattr__(name):
+    # The in-memory API is only imported when it is first used, so that
+    # importing pain001 stays cheap
+    if name == "generate_message":
+        from pain001.core.message import generate_message
+
+        return generate_message
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,32 +2,22 @@
 import click
 import os
 import sys
-from pain001.constants.constants import valid_xml_types
+import time
+from pain001.cli.output import (
+    configure_logging,
+    print_banner,
+    profiling,
+    quiet_output,
+)
+from pain001.cli.serve import serve
+from pain001.constants.constants import valid_xml_engines, valid_xml_types
 from pain001.context.context import Context
-from pain001.core.core import process_files
-from rich.console import Console
-from rich.table import Table
-from rich import box
-
-console = Console()
-
-description = """
-A powerful Python library that enables you to create
-ISO 20022-compliant payment files directly from CSV or SQLite Data files.\n
-https://pain001.com
-"""
-title = "Pain001"
 
-table = Table(box=box.ROUNDED, safe_box=True, show_header=False, title=title)
-table.add_column(justify="center", no_wrap=False, vertical="middle")
-table.add_row(description)
-table.width = 80
-console.print(table)
 
-
-@click.command(
+@click.group(
     help=("To use Pain001, you must specify the following options:\n\n"),
     context_settings=dict(help_option_names=["-h", "--help"]),
+    invoke_without_command=True,
 )
 @click.option(
     "-t",
@@ -56,18 +46,159 @@ console.print(table)
     type=click.Path(),
     help="Path to data file (CSV or SQLite) (required)",
 )
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Stream rows to the XML file to keep memory use flat (optional)",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Stream rows, recording checkpoints so that a failed run resumes "
+    "from the last one when run again (optional)",
+)
+@click.option(
+    "-b",
+    "--batch",
+    default=None,
+    help=(
+        "Directory, glob pattern or manifest file of data files to process "
+        "in parallel, instead of a single data file (optional)"
+    ),
+)
+@click.option(
+    "-o",
+    "--output_dir",
+    default=None,
+    type=click.Path(),
+    help="Directory of the XML files generated in batch mode (optional)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of worker processes in batch or split mode, or rendering "
+    "the transactions of a single message (optional)",
+)
+@click.option(
+    "--max_txs",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Split the payments into messages of at most N transactions "
+    "(optional)",
+)
+@click.option(
+    "--max_bytes",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Split the payments into messages of at most N estimated bytes "
+    "(optional)",
+)
+@click.option(
+    "--max_amount",
+    default=None,
+    help="Split the payments into messages whose total amount does not "
+    "exceed this value (optional)",
+)
+@click.option(
+    "--engine",
+    default="jinja",
+    show_default=True,
+    type=click.Choice(valid_xml_engines),
+    help="Engine rendering the XML template; the direct XML writer is "
+    "faster on large files and produces the same output",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Reuse the XML file of an earlier run on unchanged inputs, when "
+    "PAIN001_CACHE_DIR is set",
+)
+@click.option(
+    "--errors_file",
+    "errors_file_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write every missing or invalid value of the CSV Data file to this "
+    "CSV file (optional)",
+)
+@click.option(
+    "--quarantine_file",
+    "quarantine_file_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write the invalid rows of the CSV Data file to this CSV file and "
+    "generate the message from the valid ones (optional)",
+)
+@click.option(
+    "-q",
+    "--quiet",
+    is_flag=True,
+    default=False,
+    help="Only print errors, and no banner (optional)",
+)
+@click.option(
+    "--profile",
+    "profile_file_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write the time, rows/s and peak memory of each stage to this "
+    "JSON file (optional)",
+)
+@click.pass_context
 def cli(
+    ctx,
     xml_message_type,
     xml_template_file_path,
     xsd_schema_file_path,
     data_file_path,
+    stream,
+    batch,
+    output_dir,
+    jobs,
+    max_txs,
+    max_bytes,
+    max_amount,
+    engine,
+    quiet,
+    profile_file_path,
+    resume,
+    cache,
+    errors_file_path,
+    quarantine_file_path,
 ):
-    main(
-        xml_message_type,
-        xml_template_file_path,
-        xsd_schema_file_path,
-        data_file_path,
-    )
+    # The options only apply when no command, such as serve, is given
+    if ctx.invoked_subcommand is not None:
+        return
+    configure_logging(quiet)
+    if not quiet:
+        print_banner()
+    with quiet_output(quiet), profiling(profile_file_path):
+        main(
+            xml_message_type,
+            xml_template_file_path,
+            xsd_schema_file_path,
+            data_file_path,
+            stream,
+            batch,
+            output_dir,
+            jobs,
+            max_txs,
+            max_bytes,
+            max_amount,
+            engine,
+            resume,
+            cache,
+            errors_file_path,
+            quarantine_file_path,
+        )
+
+
+cli.add_command(serve)
 
 
 def main(
@@ -75,25 +206,66 @@ def main(
     xml_template_file_path,
     xsd_schema_file_path,
     data_file_path,
+    stream=False,
+    batch=None,
+    output_dir=None,
+    jobs=None,
+    max_txs=None,
+    max_bytes=None,
+    max_amount=None,
+    engine="jinja",
+    resume=False,
+    cache=True,
+    errors_file_path=None,
+    quarantine_file_path=None,
 ):
     try:
         # Check that the required arguments are provided
         if not xml_message_type:
-            console.print(
-                "The XML message type is required. Use -h for help.\n"
-            )
+            click.echo("The XML message type is required. Use -h for help.\n")
             sys.exit(1)
 
         if not xml_template_file_path:
-            console.print("The XML template file path is required.\n")
+            click.echo("The XML template file path is required.\n")
             sys.exit(1)
 
         if not xsd_schema_file_path:
-            console.print("The XSD schema file path is required.\n")
+            click.echo("The XSD schema file path is required.\n")
+            sys.exit(1)
+
+        if not data_file_path and not batch:
+            click.echo("The data file path is required.\n")
             sys.exit(1)
 
-        if not data_file_path:
-            console.print("The data file path is required.\n")
+        if data_file_path and batch:
+            click.echo(
+                "Use either a data file path or a batch source, not both.\n"
+            )
+            sys.exit(1)
+
+        split = any(
+            limit is not None for limit in (max_txs, max_bytes, max_amount)
+        )
+        if split and batch:
+            click.echo("Splitting is not available in batch mode.\n")
+            sys.exit(1)
+
+        if resume and batch:
+            click.echo("Resuming is not available in batch mode.\n")
+            sys.exit(1)
+
+        if errors_file_path and (batch or stream or resume):
+            click.echo(
+                "The errors file is not available in batch or streaming "
+                "mode.\n"
+            )
+            sys.exit(1)
+
+        if quarantine_file_path and (batch or resume or errors_file_path):
+            click.echo(
+                "The quarantine file is not available in batch or resumable "
+                "mode, nor with the errors file.\n"
+            )
             sys.exit(1)
 
         logger = Context.get_instance().get_logger()
@@ -103,7 +275,7 @@ def main(
         # Check that the XML message type is valid
         if xml_message_type not in valid_xml_types:
             logger.info(f"Invalid XML message type: {xml_message_type}.")
-            console.print(f"Invalid XML message type: {xml_message_type}.")
+            click.echo(f"Invalid XML message type: {xml_message_type}.")
             sys.exit(1)
 
         if not os.path.isfile(xml_template_file_path):
@@ -112,7 +284,7 @@ def main(
             The XML template file '{xml_template_file_path}' does not exist.
             """
             )
-            console.print(
+            click.echo(
                 f"""
             The XML template file '{xml_template_file_path}' does not exist.
             """
@@ -125,26 +297,63 @@ def main(
             The XSD template file '{xsd_schema_file_path}' does not exist.
             """
             )
-            console.print(
+            click.echo(
                 f"""
             The XSD template file '{xsd_schema_file_path}' does not exist.
             """
             )
             sys.exit(1)
 
+        # The processing modules are only imported once the arguments have
+        # been checked, to keep the start-up of the command line fast
+        if batch:
+            from pain001.core.batch import (
+                find_data_files,
+                print_batch_report,
+                process_batch,
+            )
+
+            start = time.perf_counter()
+            results = process_batch(
+                xml_message_type,
+                xml_template_file_path,
+                xsd_schema_file_path,
+                find_data_files(batch),
+                output_dir=output_dir,
+                jobs=jobs,
+                stream=stream,
+                engine=engine,
+                cache=cache,
+            )
+            if not print_batch_report(results, start):
+                sys.exit(1)
+            return
+
         if not os.path.isfile(data_file_path):
             logger.info(f"The data file '{data_file_path}' does not exist.")
-            console.print(f"The data file '{data_file_path}' does not exist.")
+            click.echo(f"The data file '{data_file_path}' does not exist.")
             sys.exit(1)
 
+        from pain001.core.core import process_files
+
         process_files(
             xml_message_type,
             xml_template_file_path,
             xsd_schema_file_path,
             data_file_path,
+            stream=stream,
+            max_txs=max_txs,
+            max_bytes=max_bytes,
+            max_amount=max_amount,
+            jobs=jobs,
+            engine=engine,
+            resume=resume,
+            cache=cache,
+            errors_file_path=errors_file_path,
+            quarantine_file_path=quarantine_file_path,
         )
     except Exception as e:
-        console.print(f"An error occurred: {e}")
+        click.echo(f"An error occurred: {e}")
         sys.exit(1)
 
 
@@ -16,38 +16,25 @@
 
 import os
 import sys
+import time
 import click
 import configparser
 
-from pain001.constants.constants import valid_xml_types
+from pain001.cli.output import (
+    configure_logging,
+    print_banner,
+    profiling,
+    quiet_output,
+)
+from pain001.cli.serve import serve
+from pain001.constants.constants import valid_xml_engines, valid_xml_types
 from pain001.context.context import Context
-from pain001.core.core import process_files
-from pain001.xml.validate_via_xsd import validate_via_xsd
-
-from rich.console import Console
-from rich.table import Table
-from rich import box
-
-console = Console()
-
-description = """
-A powerful Python library that enables you to create
-ISO 20022-compliant payment files directly from CSV or SQLite Data files.\n
-https://pain001.com
-"""
-title = "Pain001"
-
-table = Table(box=box.ROUNDED, safe_box=True, show_header=False, title=title)
 
-table.add_column(justify="center", no_wrap=False, vertical="middle")
-table.add_row(description)
-table.width = 80
-console.print(table)
 
-
-@click.command(
+@click.group(
     help=("To use Pain001, you must specify the following options:\n\n"),
     context_settings=dict(help_option_names=["-h", "--help"]),
+    invoke_without_command=True,
 )
 @click.option(
     "-t",
@@ -83,17 +70,187 @@ console.print(table)
     type=click.Path(),
     help="Path to configuration file (optional)",
 )
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Stream rows to the XML file to keep memory use flat (optional)",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Stream rows, recording checkpoints so that a failed run resumes "
+    "from the last one when run again (optional)",
+)
+@click.option(
+    "-b",
+    "--batch",
+    default=None,
+    help=(
+        "Directory, glob pattern or manifest file of data files to process "
+        "in parallel, instead of a single data file (optional)"
+    ),
+)
+@click.option(
+    "-o",
+    "--output_dir",
+    default=None,
+    type=click.Path(),
+    help="Directory of the XML files generated in batch mode (optional)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of worker processes in batch or split mode, or rendering "
+    "the transactions of a single message (optional)",
+)
+@click.option(
+    "--max_txs",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Split the payments into messages of at most N transactions "
+    "(optional)",
+)
+@click.option(
+    "--max_bytes",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Split the payments into messages of at most N estimated bytes "
+    "(optional)",
+)
+@click.option(
+    "--max_amount",
+    default=None,
+    help="Split the payments into messages whose total amount does not "
+    "exceed this value (optional)",
+)
+@click.option(
+    "--engine",
+    default="jinja",
+    show_default=True,
+    type=click.Choice(valid_xml_engines),
+    help="Engine rendering the XML template; the direct XML writer is "
+    "faster on large files and produces the same output",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Reuse the XML file of an earlier run on unchanged inputs, when "
+    "PAIN001_CACHE_DIR is set",
+)
+@click.option(
+    "--errors_file",
+    "errors_file_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write every missing or invalid value of the CSV Data file to this "
+    "CSV file (optional)",
+)
+@click.option(
+    "--quarantine_file",
+    "quarantine_file_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write the invalid rows of the CSV Data file to this CSV file and "
+    "generate the message from the valid ones (optional)",
+)
+@click.option(
+    "-q",
+    "--quiet",
+    is_flag=True,
+    default=False,
+    help="Only print errors, and no banner (optional)",
+)
+@click.option(
+    "--profile",
+    "profile_file_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write the time, rows/s and peak memory of each stage to this "
+    "JSON file (optional)",
+)
+@click.pass_context
 def main(
+    ctx,
     xml_message_type,
     xml_template_file_path,
     xsd_schema_file_path,
     data_file_path,
     config_file,
+    stream,
+    batch,
+    output_dir,
+    jobs,
+    max_txs,
+    max_bytes,
+    max_amount,
+    engine,
+    quiet,
+    profile_file_path,
+    resume,
+    cache,
+    errors_file_path,
+    quarantine_file_path,
+):
+    # The options only apply when no command, such as serve, is given
+    if ctx.invoked_subcommand is not None:
+        return
+    configure_logging(quiet)
+    if not quiet:
+        print_banner()
+    with quiet_output(quiet), profiling(profile_file_path):
+        run(
+            xml_message_type,
+            xml_template_file_path,
+            xsd_schema_file_path,
+            data_file_path,
+            config_file,
+            stream,
+            batch,
+            output_dir,
+            jobs,
+            max_txs,
+            max_bytes,
+            max_amount,
+            engine,
+            resume,
+            cache,
+            errors_file_path,
+            quarantine_file_path,
+        )
+
+
+main.add_command(serve)
+
+
+def run(
+    xml_message_type,
+    xml_template_file_path,
+    xsd_schema_file_path,
+    data_file_path,
+    config_file=None,
+    stream=False,
+    batch=None,
+    output_dir=None,
+    jobs=None,
+    max_txs=None,
+    max_bytes=None,
+    max_amount=None,
+    engine="jinja",
+    resume=False,
+    cache=True,
+    errors_file_path=None,
+    quarantine_file_path=None,
 ):
     # Expand user-friendly paths
     xml_template_file_path = os.path.expanduser(xml_template_file_path)
     xsd_schema_file_path = os.path.expanduser(xsd_schema_file_path)
-    data_file_path = os.path.expanduser(data_file_path)
+    if data_file_path:
+        data_file_path = os.path.expanduser(data_file_path)
 
     # Load configuration file if provided
     if config_file:
@@ -115,12 +272,34 @@ def main(
         print("The XML message type is required.")
         sys.exit(1)
 
-    # Check file existence
+    split = any(
+        limit is not None for limit in (max_txs, max_bytes, max_amount)
+    )
+    if split and batch:
+        print("Splitting is not available in batch mode.")
+        sys.exit(1)
+
+    if resume and batch:
+        print("Resuming is not available in batch mode.")
+        sys.exit(1)
+
+    if errors_file_path and (batch or stream or resume):
+        print("The errors file is not available in batch or streaming mode.")
+        sys.exit(1)
+
+    if quarantine_file_path and (batch or resume or errors_file_path):
+        print(
+            "The quarantine file is not available in batch or resumable "
+            "mode, nor with the errors file."
+        )
+        sys.exit(1)
+
+    # Check file existence, the data files of a batch being checked when
+    # the batch source is expanded
     for file_path in [
         xml_template_file_path,
         xsd_schema_file_path,
-        data_file_path,
-    ]:
+    ] + ([] if batch else [data_file_path]):
         if not os.path.isfile(file_path):
             print(f"The file '{file_path}' does not exist.")
             sys.exit(1)
@@ -140,6 +319,16 @@ def main(
         )
         sys.exit(1)
 
+    # The processing modules are only imported once the arguments have been
+    # checked, to keep the start-up of the command line fast
+    from pain001.core.batch import (
+        find_data_files,
+        print_batch_report,
+        process_batch,
+    )
+    from pain001.core.core import process_files
+    from pain001.xml.validate_via_xsd import validate_via_xsd
+
     # Validate XML and XSD schemas
     try:
         validate_via_xsd(xml_template_file_path, xsd_schema_file_path)
@@ -148,11 +337,43 @@ def main(
         print(f"Schema validation failed: {e}")
         sys.exit(1)
 
+    if batch:
+        start = time.perf_counter()
+        try:
+            results = process_batch(
+                xml_message_type,
+                xml_template_file_path,
+                xsd_schema_file_path,
+                find_data_files(batch),
+                output_dir=output_dir,
+                jobs=jobs,
+                stream=stream,
+                engine=engine,
+                cache=cache,
+            )
+            all_ok = print_batch_report(results, start)
+        except (FileNotFoundError, ValueError) as e:
+            print(e)
+            sys.exit(1)
+        if not all_ok:
+            sys.exit(1)
+        return
+
     process_files(
         xml_message_type,
         xml_template_file_path,
         xsd_schema_file_path,
         data_file_path,
+        stream=stream,
+        max_txs=max_txs,
+        max_bytes=max_bytes,
+        max_amount=max_amount,
+        jobs=jobs,
+        engine=engine,
+        resume=resume,
+        cache=cache,
+        errors_file_path=errors_file_path,
+        quarantine_file_path=quarantine_file_path,
     )
 
 
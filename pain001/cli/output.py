@@ -0,0 +1,118 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the helpers shared by the command line interfaces to
+print the banner, configure logging and silence the output of quiet runs.
+
+Nothing is printed or configured when the module is imported, and Rich is
+only imported when the banner is actually shown.
+"""
+
+import contextlib
+import io
+import logging
+import sys
+
+description = """
+A powerful Python library that enables you to create
+ISO 20022-compliant payment files directly from CSV or SQLite Data files.\n
+https://pain001.com
+"""
+title = "Pain001"
+
+
+def print_banner():
+    """Prints the Pain001 banner when the output is an interactive terminal.
+
+    Returns:
+        None
+    """
+    if not sys.stdout.isatty():
+        return
+
+    from rich import box
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(
+        box=box.ROUNDED, safe_box=True, show_header=False, title=title
+    )
+    table.add_column(justify="center", no_wrap=False, vertical="middle")
+    table.add_row(description)
+    table.width = 80
+    Console().print(table)
+
+
+def configure_logging(quiet=False):
+    """Sends log messages to the standard error stream.
+
+    Args:
+        quiet (bool): If True, only errors are logged.
+
+    Returns:
+        None
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    if quiet:
+        handler.setLevel(logging.ERROR)
+    logging.basicConfig(handlers=[handler])
+
+
+@contextlib.contextmanager
+def quiet_output(quiet=True):
+    """Holds back everything printed in the block, unless it fails.
+
+    The output of a successful block is discarded. If the block raises an
+    exception or exits with an error, its output is printed before the
+    exception is propagated, so that the cause of the failure is not lost.
+
+    Args:
+        quiet (bool): If False, the output is printed as usual.
+    """
+    if not quiet:
+        yield
+        return
+
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            yield
+    except SystemExit as e:
+        if e.code:
+            sys.stdout.write(output.getvalue())
+        raise
+    except BaseException:
+        sys.stdout.write(output.getvalue())
+        raise
+
+
+@contextlib.contextmanager
+def profiling(profile_file_path=None):
+    """Profiles the block when a report path is given.
+
+    Args:
+        profile_file_path (str, optional): The path of the JSON report. If
+            None, the block runs without profiling.
+    """
+    if not profile_file_path:
+        yield
+        return
+
+    from pain001.context.profile import profile
+
+    with profile(profile_file_path):
+        yield
@@ -0,0 +1,125 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the `serve` command shared by the command line
+interfaces, which runs pain001 as a long-running local HTTP server.
+
+The server module is only imported when the command runs, to keep the
+start-up of the command line fast.
+"""
+
+import sys
+
+import click
+
+from pain001.cli.output import configure_logging, print_banner
+from pain001.constants.constants import valid_xml_engines
+
+
+@click.command(
+    help="Run a local HTTP server that generates payment messages from CSV "
+    "or JSON data, keeping the XML templates and XSD schemas compiled "
+    "between requests.",
+    context_settings=dict(help_option_names=["-h", "--help"]),
+)
+@click.option(
+    "-t",
+    "--xml_message_type",
+    "xml_message_types",
+    multiple=True,
+    help="Type of XML message to serve, repeated for several types "
+    "(optional, defaults to every type found in the templates directory)",
+)
+@click.option(
+    "--templates_dir",
+    default=None,
+    type=click.Path(file_okay=False),
+    help="Directory holding <type>/template.xml and <type>/<type>.xsd for "
+    "each message type (optional, defaults to the bundled templates)",
+)
+@click.option(
+    "--host",
+    default="127.0.0.1",
+    show_default=True,
+    help="Address to listen on",
+)
+@click.option(
+    "-p",
+    "--port",
+    default=8001,
+    show_default=True,
+    type=click.IntRange(min=0, max=65535),
+    help="TCP port to listen on",
+)
+@click.option(
+    "--socket",
+    "unix_socket_path",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Listen on this Unix domain socket instead of a TCP port (optional)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of worker processes rendering and validating the messages "
+    "(optional, defaults to the number of CPUs)",
+)
+@click.option(
+    "--engine",
+    default="jinja",
+    show_default=True,
+    type=click.Choice(valid_xml_engines),
+    help="Engine rendering the XML templates",
+)
+@click.option(
+    "-q",
+    "--quiet",
+    is_flag=True,
+    default=False,
+    help="Only log errors, and no banner (optional)",
+)
+def serve(
+    xml_message_types,
+    templates_dir,
+    host,
+    port,
+    unix_socket_path,
+    jobs,
+    engine,
+    quiet,
+):
+    configure_logging(quiet)
+    if not quiet:
+        print_banner()
+
+    from pain001.core.server import find_templates, serve as run_server
+
+    try:
+        templates = find_templates(templates_dir, xml_message_types)
+    except (FileNotFoundError, ValueError) as e:
+        click.echo(e)
+        sys.exit(1)
+
+    run_server(
+        templates,
+        host=host,
+        port=port,
+        unix_socket_path=unix_socket_path,
+        jobs=jobs,
+        engine=engine,
+    )
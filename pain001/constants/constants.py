@@ -26,3 +26,7 @@ valid_xml_types = [
     "pain.001.001.10"  # Notification of Amendment (pain.001.001.10)
     "pain.001.001.11",  # Request for Cancellation (pain.001.001.11)
 ]
+
+# Defines the engines that can render the XML templates: Jinja2, or the
+# direct XML writer compiled from the same templates.
+valid_xml_engines = ["jinja", "direct"]
@@ -13,11 +13,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import logging
+import time
+import tracemalloc
 
 
 class Context:
-    """A class that can be used to manage logging.
+    """A class that can be used to manage logging and instrumentation.
 
     Methods:
         __init__(self): Initializes the class and creates a logger.
@@ -26,6 +29,11 @@ class Context:
         init_logger(self): Initializes the logger.
         set_log_level(self, log_level): Sets the log level of the logger.
         set_name(self, name): Sets the name of the logger.
+        timer(self, name): Times a block of code as a pipeline stage.
+        increment(self, name, value): Adds a value to a counter.
+        set_gauge(self, name, value): Sets the current value of a gauge.
+        get_metrics(self): Returns the timers, counters and gauges.
+        reset_metrics(self): Clears the timers, counters and gauges.
     """
 
     instance = None
@@ -54,6 +62,7 @@ class Context:
             raise Exception("This class is a singleton!")
         else:
             Context.instance = self
+            self.reset_metrics()
             self.logger = logging.getLogger(self.name)
             self.logger.setLevel(self.log_level)
             self.logger.info("Context initialized")
@@ -129,3 +138,77 @@ class Context:
         if self.logger is None:
             self.init_logger()
         return self.logger
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Times a block of code and adds its duration to a timer.
+
+        Timers of the same name add up. When memory tracing has been
+        started with `tracemalloc.start()`, the peak memory allocated while
+        the block runs is recorded too, nested timers included.
+
+        Args:
+            name: The name of the timer, usually a pipeline stage.
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if self._peaks:
+                self._peaks[-1] = max(
+                    self._peaks[-1], tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            timer = self.timers.setdefault(name, {"seconds": 0.0, "calls": 0})
+            timer["seconds"] += seconds
+            timer["calls"] += 1
+            if tracing and tracemalloc.is_tracing():
+                peak = max(
+                    self._peaks.pop(), tracemalloc.get_traced_memory()[1]
+                )
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                timer["peak_memory"] = max(timer.get("peak_memory", 0), peak)
+
+    def increment(self, name, value=1):
+        """Adds a value to a counter.
+
+        Args:
+            name: The name of the counter.
+            value: The value to add.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """Sets the current value of a gauge.
+
+        Args:
+            name: The name of the gauge.
+            value: The value of the gauge.
+        """
+        self.gauges[name] = value
+
+    def get_metrics(self):
+        """Returns the timers, counters and gauges recorded so far.
+
+        Returns:
+            A dictionary with a "timers", a "counters" and a "gauges" entry.
+        """
+        return {
+            "timers": {
+                name: dict(timer) for name, timer in self.timers.items()
+            },
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def reset_metrics(self):
+        """Clears the timers, counters and gauges."""
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self._peaks = []
@@ -0,0 +1,91 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the context manager `profile`, which records the
+timers, counters and gauges of the `Context` while a block of code runs and
+writes them to a JSON report.
+
+Memory is traced with `tracemalloc` while profiling, which slows the run
+down: the wall times of a profiled run are only meaningful relative to each
+other.
+"""
+
+import contextlib
+import json
+import tracemalloc
+
+from pain001.context.context import Context
+
+
+@contextlib.contextmanager
+def profile(profile_file_path):
+    """Profiles a block of code and writes the report to a JSON file.
+
+    The report is written even if the block fails.
+
+    Args:
+        profile_file_path (str): The path of the JSON report.
+    """
+    context = Context.get_instance()
+    context.reset_metrics()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        with context.timer("total"):
+            yield
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        report = build_profile_report(context.get_metrics())
+        with open(profile_file_path, "w") as profile_file:
+            json.dump(report, profile_file, indent=2)
+
+
+def build_profile_report(metrics):
+    """Builds a profile report from the metrics of the context.
+
+    Args:
+        metrics (dict): The metrics returned by `Context.get_metrics`, with
+            the whole run timed as "total".
+
+    Returns:
+        dict: The wall time, number of rows, rows per second and peak memory
+        of the run and of each of its stages, and the counters and gauges.
+    """
+    timers = dict(metrics["timers"])
+    total = timers.pop("total", {"seconds": 0.0})
+    rows = metrics["counters"].get("rows", 0)
+
+    def summarize(timer):
+        seconds = timer["seconds"]
+        return {
+            "wall_time": seconds,
+            "rows_per_second": rows / seconds if rows and seconds else None,
+            "peak_memory": timer.get("peak_memory"),
+        }
+
+    stages = {}
+    for name, timer in timers.items():
+        stages[name] = dict(summarize(timer), calls=timer["calls"])
+
+    return dict(
+        summarize(total),
+        rows=rows,
+        stages=stages,
+        counters=metrics["counters"],
+        gauges=metrics["gauges"],
+    )
@@ -0,0 +1,289 @@
+# Copyright (C) 2023 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+#
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the batch mode of pain001, which generates one ISO 20022
+payment message per Data file for a whole set of Data files.
+
+The Data files are given as a directory, a glob pattern or a manifest file
+listing one path per line. They are processed by a pool of worker processes.
+Each worker compiles the XML template and the XSD schema once, when it
+starts, and reuses them for every file it is given.
+"""
+
+# Import the standard libraries
+import concurrent.futures
+import contextlib
+import glob
+import io
+import os
+import time
+
+# Import the pain001 library functions
+from pain001.core.core import process_files
+from pain001.xml.load_xml_template import load_xml_template
+from pain001.xml.load_xsd_schema import load_xsd_schema
+from pain001.xml.register_namespaces import register_namespaces
+
+# The extensions of the Data files picked up from a directory or a glob
+DATA_FILE_EXTENSIONS = (".csv", ".db")
+
+# The message type, XML template and XSD schema used by the current worker
+_worker_settings = None
+
+
+def find_data_files(source):
+    """
+    Returns the Data files designated by a directory, a manifest file or a
+    glob pattern.
+
+    Args:
+        source (str): A directory containing the Data files, a manifest file
+        listing one Data file per line (blank lines and lines starting with
+        '#' are ignored, relative paths are resolved against the directory
+        of the manifest) or a glob pattern.
+
+    Returns:
+        list: The paths of the Data files, in a stable order.
+
+    Raises:
+        FileNotFoundError: If no Data file matches the source.
+    """
+    if os.path.isdir(source):
+        data_file_paths = sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.endswith(DATA_FILE_EXTENSIONS)
+            and os.path.isfile(os.path.join(source, name))
+        )
+    elif os.path.isfile(source):
+        manifest_dir = os.path.dirname(source)
+        with open(source, "r", encoding="utf-8") as manifest:
+            data_file_paths = [
+                os.path.join(manifest_dir, os.path.expanduser(line.strip()))
+                for line in manifest
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+    else:
+        data_file_paths = sorted(
+            path
+            for path in glob.glob(os.path.expanduser(source), recursive=True)
+            if path.endswith(DATA_FILE_EXTENSIONS) and os.path.isfile(path)
+        )
+
+    if not data_file_paths:
+        raise FileNotFoundError(f"Error: No data files found in '{source}'.")
+    return data_file_paths
+
+
+def process_batch(
+    xml_message_type,
+    xml_template_file_path,
+    xsd_schema_file_path,
+    data_file_paths,
+    output_dir=None,
+    jobs=None,
+    stream=False,
+    engine="jinja",
+    cache=True,
+):
+    """
+    Generates one ISO 20022 payment message per Data file, using a pool of
+    worker processes.
+
+    Args:
+        xml_message_type (str): The type of XML message to generate.
+        xml_template_file_path (str): The path of the XML template file.
+        xsd_schema_file_path (str): The path of the XSD schema file.
+        data_file_paths (list): The paths of the CSV or SQLite files.
+        output_dir (str, optional): The directory in which the XML files are
+        written, each named after its Data file. Defaults to the directory of
+        each Data file.
+        jobs (int, optional): The number of worker processes. Defaults to the
+        number of CPUs. With a single job, the files are processed in the
+        current process.
+        stream (bool): If True, each file is processed in streaming mode.
+        engine (str): The engine rendering the XML template, "jinja" or
+        "direct".
+        cache (bool): If True, the XML files of unchanged Data files are
+        reused from the output cache, when it is enabled.
+
+    Yields:
+        dict: The outcome of each file, in completion order, with the keys
+        `data_file_path`, `output_file_path`, `ok`, `error`, `seconds` and
+        `size` (the size of the generated XML file in bytes).
+
+    Raises:
+        ValueError: If two Data files would be written to the same XML file,
+        or an XML file would overwrite the XML template, the XSD schema or a
+        Data file.
+    """
+    output_file_paths = [
+        _get_output_file_path(data_file_path, output_dir)
+        for data_file_path in data_file_paths
+    ]
+    if len(set(output_file_paths)) != len(output_file_paths):
+        raise ValueError(
+            "Error: Several data files have the same name; "
+            "their XML files would overwrite each other."
+        )
+    # An XML file named after its Data file must not replace an input
+    input_file_paths = {
+        os.path.realpath(file_path)
+        for file_path in (
+            xml_template_file_path,
+            xsd_schema_file_path,
+            *data_file_paths,
+        )
+    }
+    for output_file_path in output_file_paths:
+        if os.path.realpath(output_file_path) in input_file_paths:
+            raise ValueError(
+                f"Error: The XML file '{output_file_path}' would overwrite "
+                "the XML template, the XSD schema or a data file; write the "
+                "XML files to another directory with --output_dir."
+            )
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    settings = (
+        xml_message_type,
+        xml_template_file_path,
+        xsd_schema_file_path,
+        engine,
+    )
+    tasks = [
+        (data_file_path, output_file_path, stream, cache)
+        for data_file_path, output_file_path in zip(
+            data_file_paths, output_file_paths
+        )
+    ]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+
+    if jobs <= 1:
+        _init_worker(*settings)
+        for task in tasks:
+            yield _process_file(*task)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=settings
+    ) as executor:
+        futures = [executor.submit(_process_file, *task) for task in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def print_batch_report(results, start):
+    """
+    Prints the status of each processed file and the aggregate throughput.
+
+    Args:
+        results (iterable): The outcomes yielded by `process_batch`. Each one
+        is printed as soon as it is available.
+        start (float): The time at which the batch started, as returned by
+        `time.perf_counter`.
+
+    Returns:
+        bool: True if every file was processed successfully, False otherwise.
+    """
+    count = failed = size = 0
+    for result in results:
+        count += 1
+        size += result["size"]
+        if result["ok"]:
+            print(
+                f"OK     {result['data_file_path']} -> "
+                f"{result['output_file_path']} ({result['seconds']:.2f}s)"
+            )
+        else:
+            failed += 1
+            print(f"FAILED {result['data_file_path']}: {result['error']}")
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(
+        f"Processed {count} file(s), {failed} failed, in {elapsed:.2f}s "
+        f"({count / elapsed:.1f} files/s, "
+        f"{size / elapsed / 1024 / 1024:.2f} MB/s)"
+    )
+    return failed == 0
+
+
+def _get_output_file_path(data_file_path, output_dir):
+    """Returns the path of the XML file generated from a Data file."""
+    name = os.path.splitext(os.path.basename(data_file_path))[0] + ".xml"
+    if output_dir:
+        return os.path.join(output_dir, name)
+    return os.path.join(os.path.dirname(data_file_path), name)
+
+
+def _init_worker(
+    xml_message_type, xml_template_file_path, xsd_schema_file_path, engine
+):
+    """Compiles the XML template and the XSD schema once per worker."""
+    global _worker_settings
+    load_xml_template(xml_template_file_path, engine)
+    load_xsd_schema(xsd_schema_file_path)
+    register_namespaces(xml_message_type)
+    _worker_settings = (
+        xml_message_type,
+        xml_template_file_path,
+        xsd_schema_file_path,
+        engine,
+    )
+
+
+def _process_file(data_file_path, output_file_path, stream, cache):
+    """Generates the XML file of one Data file and reports the outcome."""
+    start = time.perf_counter()
+    output = io.StringIO()
+    error = None
+    (
+        xml_message_type,
+        xml_template_file_path,
+        xsd_schema_file_path,
+        engine,
+    ) = _worker_settings
+    try:
+        with contextlib.redirect_stdout(output):
+            process_files(
+                xml_message_type,
+                xml_template_file_path,
+                xsd_schema_file_path,
+                data_file_path,
+                stream=stream,
+                output_file_path=output_file_path,
+                engine=engine,
+                cache=cache,
+            )
+    except SystemExit:
+        # The generators print their errors before exiting
+        lines = output.getvalue().strip().splitlines()
+        error = lines[-1] if lines else "Error: Generation failed."
+    except Exception as e:
+        error = str(e)
+
+    size = 0
+    if error is None and os.path.exists(output_file_path):
+        size = os.path.getsize(output_file_path)
+    return {
+        "data_file_path": data_file_path,
+        "output_file_path": output_file_path,
+        "ok": error is None,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+        "size": size,
+    }
@@ -19,14 +19,24 @@ import sys
 import os
 
 # Import the pain001 library functions
-from pain001.constants.constants import valid_xml_types
+from pain001.constants.constants import valid_xml_engines, valid_xml_types
 from pain001.context.context import Context
-from pain001.csv.load_csv_data import load_csv_data
-from pain001.csv.validate_csv_data import validate_csv_data
-from pain001.db.load_db_data import load_db_data
-from pain001.db.validate_db_data import validate_db_data
+from pain001.core.output_cache import (
+    fetch_cached_output,
+    store_cached_output,
+)
+from pain001.csv.load_csv_data import iter_csv_data, load_csv_data
+from pain001.csv.validate_csv_data import (
+    iter_valid_csv_data,
+    validate_csv_data,
+)
+from pain001.db.load_db_data import iter_db_data, load_db_data
+from pain001.db.validate_db_data import validate_db_table
 from pain001.xml.register_namespaces import register_namespaces
 from pain001.xml.generate_xml import generate_xml
+from pain001.xml.prepare_xml_data import get_message_columns
+from pain001.xml.split_xml import split_xml
+from pain001.xml.stream_xml import stream_xml
 
 
 def process_files(
@@ -34,6 +44,17 @@ def process_files(
     xml_template_file_path,
     xsd_schema_file_path,
     data_file_path,
+    stream=False,
+    output_file_path=None,
+    max_txs=None,
+    max_bytes=None,
+    max_amount=None,
+    jobs=None,
+    engine="jinja",
+    resume=False,
+    cache=True,
+    errors_file_path=None,
+    quarantine_file_path=None,
 ):
     """
     This function generates an ISO 20022 payment message from a CSV or SQLite
@@ -47,6 +68,40 @@ def process_files(
         xsd_schema_file_path (str): The path of the XSD schema file.
         data_file_path (str): The path of the CSV or SQLite file containing the
         payment data.
+        stream (bool): If True, the rows are read, validated and rendered one
+        at a time and written straight to the output file, so that memory use
+        stays flat whatever the size of the Data file.
+        output_file_path (str, optional): The path of the generated XML file.
+        Defaults to a file named after the message type next to the XML
+        template file.
+        max_txs (int, optional): If set, the payments are split into several
+        messages of at most this many transactions.
+        max_bytes (int, optional): If set, the payments are split into several
+        messages of at most this estimated size in bytes.
+        max_amount (str, optional): If set, the payments are split into several
+        messages whose total amount does not exceed this value.
+        jobs (int, optional): The number of worker processes used to generate
+        split messages, defaulting to the number of CPUs, or to render the
+        transactions of a single message in parallel, which is otherwise
+        rendered in the current process.
+        engine (str): The engine rendering the XML template: "jinja", or
+        "direct" for the direct XML writer, which is faster on large files
+        and produces the same output.
+        resume (bool): If True, the rows are streamed and the progress is
+        recorded in a journal next to the partial XML file, so that a failed
+        run can be resumed from its last checkpoint by running it again.
+        cache (bool): If True and the `PAIN001_CACHE_DIR` environment
+        variable is set, the XML file of an earlier run on the same Data
+        file, XML template and XSD schema is reused, and the XML file
+        generated is stored for later runs. Split messages are not cached.
+        errors_file_path (str, optional): The path of a CSV file to which
+        every missing or invalid value of a CSV Data file that is not
+        streamed is written, if there are any.
+        quarantine_file_path (str, optional): If set, the invalid rows of a
+        CSV Data file are written to this CSV file with their errors instead
+        of failing the run, and the message is generated from the valid
+        rows, its number of transactions and control sum being computed
+        from them. Unless the payments are split, the rows are streamed.
 
     Returns:
         None
@@ -70,6 +125,12 @@ def process_files(
         logger.error(error_message)
         raise ValueError(error_message)
 
+    # Check if the XML engine is supported.
+    if engine not in valid_xml_engines:
+        error_message = f"Error: Invalid XML engine: '{engine}'."
+        logger.error(error_message)
+        raise ValueError(error_message)
+
     # Check if the XML template file exists
     if not os.path.exists(xml_template_file_path):
         error_message = (
@@ -107,39 +168,118 @@ def process_files(
     #     "PmtMtd": "payment_method",
     # }
 
+    # Resuming a run relies on the partial XML file of streaming mode
+    stream = stream or resume
+
+    # Check that splitting is not combined with streaming
+    split = any(
+        limit is not None for limit in (max_txs, max_bytes, max_amount)
+    )
+    if split and stream:
+        error_message = (
+            "Error: Payments cannot be split into several messages in "
+            "streaming mode."
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
     # Determine the type of data file (CSV or SQLite)
     is_csv = data_file_path.endswith(".csv")
     is_sqlite = data_file_path.endswith(".db")
 
-    # Load data into a list of dictionaries based on the file type
-    if is_csv:
-        data = load_csv_data(data_file_path)
-        if not validate_csv_data(data):
-            error_message = "Error: Invalid CSV data."
-            logger.error(error_message)
-            raise ValueError(error_message)
-    elif is_sqlite:
-        data = load_db_data(data_file_path, table_name="pain001")
-        if not validate_db_data(data):
-            error_message = "Error: Invalid SQLite data."
-            logger.error(error_message)
-            raise ValueError(error_message)
-    else:
-        error_message = "Error: Unsupported data file type."
-        logger.error(error_message)
-        raise ValueError(error_message)
+    # Invalid rows are quarantined while the valid ones are streamed, the
+    # group header totals being computed once they have all been rendered
+    quarantine = quarantine_file_path is not None
+    stream = stream or (quarantine and not split)
 
-    # Register the namespace prefixes and URIs for the XML message type
-    register_namespaces(xml_message_type)
+    # Each stage of the pipeline is timed through the context
+    context = Context.get_instance()
+
+    # Reuse the XML file of an earlier run on the same inputs
+    cache_lookup = None
+    if cache and not split and not quarantine and (is_csv or is_sqlite):
+        cache_lookup = fetch_cached_output(
+            xml_message_type,
+            xml_template_file_path,
+            xsd_schema_file_path,
+            data_file_path,
+            output_file_path,
+        )
+    if cache_lookup is not None and cache_lookup.reused:
+        logger.info(
+            f"Reused cached XML file '{cache_lookup.output_file_path}'"
+        )
+        return
 
-    # Generate the updated XML file path
-    generate_xml(
-        data,
+    # Load data into a list of dictionaries based on the file type
+    data = _load_rows(
         xml_message_type,
-        xml_template_file_path,
-        xsd_schema_file_path,
+        data_file_path,
+        stream,
+        errors_file_path,
+        quarantine_file_path,
     )
 
+    # Register the namespace prefixes and URIs for the XML message type
+    with context.timer("register_namespaces"):
+        register_namespaces(xml_message_type)
+
+    # Generate the XML file, from the rows as they are consumed, as several
+    # messages, or as a single one
+    if stream:
+        data = _count_rows(data, context)
+        try:
+            # Loading, validation, rendering and writing are interleaved
+            with context.timer("stream"):
+                stream_xml(
+                    data,
+                    xml_message_type,
+                    xml_template_file_path,
+                    xsd_schema_file_path,
+                    output_file_path,
+                    engine,
+                    resume,
+                    compute_totals=quarantine,
+                )
+        except ValueError as e:
+            logger.error(str(e))
+            raise
+    elif split:
+        context.increment("rows", len(data))
+        try:
+            with context.timer("split"):
+                paths = split_xml(
+                    data,
+                    xml_message_type,
+                    xml_template_file_path,
+                    xsd_schema_file_path,
+                    max_txs=max_txs,
+                    max_bytes=max_bytes,
+                    max_amount=max_amount,
+                    output_file_path=output_file_path,
+                    jobs=jobs,
+                    engine=engine,
+                )
+        except ValueError as e:
+            logger.error(str(e))
+            raise
+        context.set_gauge("messages", len(paths))
+    else:
+        context.increment("rows", len(data))
+        generate_xml(
+            data,
+            xml_message_type,
+            xml_template_file_path,
+            xsd_schema_file_path,
+            output_file_path,
+            engine,
+            jobs,
+        )
+
+    # Store the validated XML file for later runs on the same inputs
+    if cache_lookup is not None:
+        store_cached_output(cache_lookup)
+
     # Confirm the XML file has been created
     if os.path.exists(xml_template_file_path):
         logger.info(
@@ -151,6 +291,100 @@ def process_files(
         )
 
 
+def _count_rows(rows, context):
+    """Yields the rows, counting each one as it is consumed."""
+    for row in rows:
+        context.increment("rows")
+        yield row
+
+
+def _load_rows(
+    xml_message_type,
+    data_file_path,
+    stream=False,
+    errors_file_path=None,
+    quarantine_file_path=None,
+):
+    """Loads and validates the rows of a CSV or SQLite Data file.
+
+    Args:
+        xml_message_type (str): The type of XML message to generate.
+        data_file_path (str): The path of the CSV or SQLite Data file.
+        stream (bool): If True, the rows are returned as an iterator that
+        reads and validates them as they are consumed.
+        errors_file_path (str, optional): The path of a CSV file to which
+        every missing or invalid value of a CSV Data file that is not
+        streamed is written, if there are any.
+        quarantine_file_path (str, optional): The path of a CSV file to which
+        the invalid rows of a CSV Data file are written, the valid rows only
+        being returned.
+
+    Returns:
+        list or iterator of dict: The rows of the Data file.
+
+    Raises:
+        ValueError: If the data is invalid or the file type is unsupported,
+        or if rows are quarantined from a file that is not a CSV file.
+    """
+    logger = Context.get_instance().get_logger()
+    context = Context.get_instance()
+
+    if data_file_path.endswith(".csv"):
+        if stream:
+            # Rows are validated lazily while the XML file is being written
+            return iter_valid_csv_data(
+                iter_csv_data(data_file_path), quarantine_file_path
+            )
+        with context.timer("load"):
+            data = load_csv_data(data_file_path)
+        if quarantine_file_path is not None:
+            # The totals of each split message are computed from its rows
+            with context.timer("validate"):
+                data = list(iter_valid_csv_data(data, quarantine_file_path))
+            if not data:
+                error_message = "Error: No valid CSV data."
+                logger.error(error_message)
+                raise ValueError(error_message)
+            return data
+        with context.timer("validate"):
+            is_valid = validate_csv_data(data, errors_file_path)
+        if not is_valid:
+            error_message = "Error: Invalid CSV data."
+            logger.error(error_message)
+            raise ValueError(error_message)
+        return data
+
+    if not data_file_path.endswith(".db"):
+        error_message = "Error: Unsupported data file type."
+        logger.error(error_message)
+        raise ValueError(error_message)
+    if quarantine_file_path is not None:
+        error_message = (
+            "Error: Invalid rows can only be quarantined from a CSV Data file."
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    # The table is validated inside SQLite before any row is loaded
+    with context.timer("validate"):
+        is_valid = validate_db_table(data_file_path, table_name="pain001")
+    if not is_valid:
+        error_message = "Error: Invalid SQLite data."
+        logger.error(error_message)
+        raise ValueError(error_message)
+    # Only the columns used by the message type are read from the table
+    columns = get_message_columns(xml_message_type)
+    if stream:
+        # Rows are fetched in batches while the XML file is being written
+        return iter_db_data(
+            data_file_path, table_name="pain001", columns=columns
+        )
+    with context.timer("load"):
+        return load_db_data(
+            data_file_path, table_name="pain001", columns=columns
+        )
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 5:
         print(
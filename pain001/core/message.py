@@ -0,0 +1,222 @@
+# Copyright (C) 2023 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+#
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains `generate_message`, the in-memory counterpart of
+`process_files`.
+
+Applications that already hold their payment rows in memory can generate a
+message from them directly, without writing them to a Data file first. The
+rows are validated, rendered and validated against the XSD schema as they
+are consumed, and the message is returned as bytes or written to a binary
+file-like object supplied by the caller. No file is created on the way.
+"""
+
+# Import the standard libraries
+import collections.abc
+import datetime
+import io
+import itertools
+import os
+
+# Import the pain001 library functions
+from pain001.constants.constants import valid_xml_engines, valid_xml_types
+from pain001.context.context import Context
+from pain001.csv.validate_csv_data import validate_csv_row
+from pain001.xml.load_xml_template import (
+    bundled_templates_dir,
+    load_xml_template,
+)
+from pain001.xml.prepare_xml_data import prepare_xml_data
+from pain001.xml.xsd_stream_validator import XsdStreamValidator
+
+# The size, in characters, of the chunks written to the output
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def generate_message(
+    rows,
+    xml_message_type,
+    output=None,
+    columns=None,
+    xml_template_file_path=None,
+    xsd_schema_file_path=None,
+    engine="jinja",
+):
+    """
+    Generates an ISO 20022 payment message from rows held in memory.
+
+    Args:
+        rows (iterable): The payment data, one row per transaction, with the
+        same columns as a CSV Data file. Each row is either a mapping of
+        column names to values, or a tuple of values in the order given by
+        `columns`. Values other than strings are converted: None to an empty
+        value, booleans to "true" or "false", dates and times to ISO 8601 and
+        anything else with `str`. The rows are consumed once, lazily.
+        xml_message_type (str): The type of XML message to generate.
+        output (file-like, optional): A binary file-like object to which the
+        message is written as it is generated. If the rows or the message
+        turn out to be invalid, part of the message may already have been
+        written and must be discarded. Defaults to returning the message as
+        bytes.
+        columns (sequence, optional): The column names of rows given as
+        tuples.
+        xml_template_file_path (str, optional): The path of the XML template
+        file. Defaults to the template bundled for the message type.
+        xsd_schema_file_path (str, optional): The path of the XSD schema
+        file. Defaults to the schema bundled for the message type.
+        engine (str): The engine rendering the XML template, "jinja" or
+        "direct".
+
+    Returns:
+        bytes: The UTF-8 encoded message, if no output is given. Otherwise
+        None.
+
+    Raises:
+        ValueError: If the message type or the engine is not supported, if
+        there are no rows, or if the rows or the generated message are
+        invalid. The details of invalid rows are printed.
+        FileNotFoundError: If the XML template or the XSD schema file does
+        not exist.
+    """
+    logger = Context.get_instance().get_logger()
+
+    if xml_message_type not in valid_xml_types:
+        error_message = (
+            f"Error: Invalid XML message type: '{xml_message_type}'."
+        )
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if engine not in valid_xml_engines:
+        error_message = f"Error: Invalid XML engine: '{engine}'."
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    # Default to the template and schema bundled for the message type
+    bundled_dir = os.path.join(bundled_templates_dir(), xml_message_type)
+    if xml_template_file_path is None:
+        xml_template_file_path = os.path.join(bundled_dir, "template.xml")
+    if xsd_schema_file_path is None:
+        xsd_schema_file_path = os.path.join(
+            bundled_dir, f"{xml_message_type}.xsd"
+        )
+    for file_path, description in (
+        (xml_template_file_path, "XML template"),
+        (xsd_schema_file_path, "XSD schema file"),
+    ):
+        if not os.path.isfile(file_path):
+            error_message = (
+                f"Error: {description} '{file_path}' does not exist."
+            )
+            logger.error(error_message)
+            raise FileNotFoundError(error_message)
+
+    rows = _iter_valid_rows(_iter_rows(rows, columns))
+    buffer = io.BytesIO() if output is None else output
+    validator = XsdStreamValidator(xsd_schema_file_path)
+    try:
+        # The first row also provides the group header values
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("Error: No data to process.")
+
+        template = load_xml_template(xml_template_file_path, engine)
+        xml_data = prepare_xml_data(
+            header, itertools.chain([header], rows), xml_message_type
+        )
+
+        # Render the template in chunks, validating each one against the
+        # XSD schema before it is written
+        for chunk in _iter_buffered(template.stream(**xml_data)):
+            validator.feed(chunk)
+            if not validator.is_valid:
+                break
+            buffer.write(chunk.encode("utf-8"))
+        if not validator.close():
+            raise ValueError("Error: Invalid XML data.")
+    except ValueError as e:
+        logger.error(str(e))
+        raise
+
+    if output is None:
+        return buffer.getvalue()
+    return None
+
+
+def _iter_rows(rows, columns):
+    """Converts the rows to dictionaries of strings, like CSV rows."""
+    for row in rows:
+        if not isinstance(row, collections.abc.Mapping):
+            if columns is None:
+                raise ValueError(
+                    "Error: The column names are required for rows that are "
+                    "not mappings."
+                )
+            row = tuple(row)
+            if len(row) != len(columns):
+                raise ValueError(
+                    f"Error: Expected {len(columns)} values, got {len(row)} "
+                    f"in row: {row}"
+                )
+            row = zip(columns, row)
+        else:
+            row = row.items()
+        yield {column: format_value(value) for column, value in row}
+
+
+def _iter_valid_rows(rows):
+    """Validates the rows as they are consumed."""
+    for index, row in enumerate(rows):
+        if not validate_csv_row(row, index):
+            raise ValueError("Error: Invalid payment data.")
+        yield row
+
+
+def format_value(value):
+    """Returns the string stored in a CSV file for a value.
+
+    Args:
+        value: A value of a row, such as a string, a number, a boolean, a
+        date, a time or None.
+
+    Returns:
+        str: The value as written in a CSV Data file.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _iter_buffered(chunks):
+    """Joins small rendered chunks into chunks of about WRITE_BUFFER_SIZE."""
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER_SIZE:
+            yield "".join(pending)
+            pending.clear()
+            size = 0
+    if pending:
+        yield "".join(pending)
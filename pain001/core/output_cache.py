@@ -0,0 +1,276 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains a content-addressed cache of the XML files generated by
+`process_files`, so that a run on unchanged inputs reuses the XML file of an
+earlier run instead of loading, rendering and validating the data again.
+
+Each XML file is stored under a digest of everything it depends on: the
+version of pain001, the message type, and the contents of the Data file, of
+the XML template and of the XSD schema. Only XML files that have been
+validated against the XSD schema are stored. The cache lives in the
+`outputs` directory of `PAIN001_CACHE_DIR`, and is only used when that
+environment variable is set. Once it grows beyond `OUTPUT_CACHE_SIZE`
+bytes, or the value of the `PAIN001_OUTPUT_CACHE_SIZE` environment variable,
+the least recently used XML files are evicted.
+"""
+
+import collections
+import hashlib
+import os
+import shutil
+
+from pain001 import __version__
+from pain001.context.context import Context
+from pain001.xml.generate_updated_xml_file_path import (
+    generate_updated_xml_file_path,
+)
+
+# The default maximum size of the cache, in bytes
+OUTPUT_CACHE_SIZE = 1024 * 1024 * 1024
+
+# The size of the blocks in which files are read to be hashed
+_BLOCK_SIZE = 1024 * 1024
+
+# The lookup of the XML file of a run in the cache, kept until the run has
+# written its own XML file
+CacheLookup = collections.namedtuple(
+    "CacheLookup",
+    ["digest", "output_file_path", "cache_dir", "previous_stat", "reused"],
+)
+
+
+def get_output_cache_dir():
+    """Returns the directory of the output cache.
+
+    Returns:
+        str: The `outputs` directory of `PAIN001_CACHE_DIR`, or None if that
+        environment variable is not set.
+    """
+    cache_dir = os.environ.get("PAIN001_CACHE_DIR")
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, "outputs")
+
+
+def compute_digest(
+    xml_message_type,
+    xml_template_file_path,
+    xsd_schema_file_path,
+    data_file_path,
+):
+    """Returns the digest of the inputs of a generated XML file.
+
+    Args:
+        xml_message_type (str): The message type, for example
+            "pain.001.001.03".
+        xml_template_file_path (str): The path of the XML template file.
+        xsd_schema_file_path (str): The path of the XSD schema file.
+        data_file_path (str): The path of the CSV or SQLite Data file.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest of the inputs.
+    """
+    digest = hashlib.sha256()
+    # The extension of the Data file selects how it is read
+    for value in (
+        __version__,
+        xml_message_type,
+        os.path.splitext(data_file_path)[1],
+    ):
+        digest.update(value.encode("utf-8") + b"\0")
+    for file_path in (
+        data_file_path,
+        xml_template_file_path,
+        xsd_schema_file_path,
+    ):
+        digest.update(str(os.path.getsize(file_path)).encode("ascii") + b"\0")
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def fetch_output(digest, output_file_path, cache_dir):
+    """Copies the cached XML file of a digest to its destination.
+
+    Args:
+        digest (str): The digest of the inputs of the XML file.
+        output_file_path (str): The path to copy the XML file to.
+        cache_dir (str): The directory of the output cache.
+
+    Returns:
+        bool: True if the XML file was found in the cache and copied.
+    """
+    entry_file_path = os.path.join(cache_dir, digest + ".xml")
+    partial_file_path = output_file_path + ".part"
+    try:
+        shutil.copyfile(entry_file_path, partial_file_path)
+        # The modification time of an entry records when it was last used
+        os.utime(entry_file_path)
+    except OSError:
+        if os.path.exists(partial_file_path):
+            os.remove(partial_file_path)
+        return False
+    os.replace(partial_file_path, output_file_path)
+    return True
+
+
+def store_output(digest, xml_file_path, cache_dir, max_size=None):
+    """Stores a validated XML file in the cache, evicting older ones.
+
+    Failures to write to the cache are ignored, the cache being an
+    optimization only.
+
+    Args:
+        digest (str): The digest of the inputs of the XML file.
+        xml_file_path (str): The path of the XML file.
+        cache_dir (str): The directory of the output cache.
+        max_size (int, optional): The maximum size of the cache, in bytes.
+            Defaults to the `PAIN001_OUTPUT_CACHE_SIZE` environment variable,
+            or to `OUTPUT_CACHE_SIZE`.
+
+    Returns:
+        bool: True if the XML file was stored.
+    """
+    if max_size is None:
+        max_size = _get_max_size()
+    entry_file_path = os.path.join(cache_dir, digest + ".xml")
+    temporary_file_path = f"{entry_file_path}.{os.getpid()}.tmp"
+    try:
+        if os.path.getsize(xml_file_path) > max_size:
+            return False
+        os.makedirs(cache_dir, exist_ok=True)
+        shutil.copyfile(xml_file_path, temporary_file_path)
+        os.replace(temporary_file_path, entry_file_path)
+        _evict(cache_dir, max_size)
+    except OSError:
+        if os.path.exists(temporary_file_path):
+            os.remove(temporary_file_path)
+        return False
+    return True
+
+
+def fetch_cached_output(
+    xml_message_type,
+    xml_template_file_path,
+    xsd_schema_file_path,
+    data_file_path,
+    output_file_path=None,
+):
+    """Reuses the cached XML file of the inputs of a run, if there is one.
+
+    Args:
+        xml_message_type (str): The message type, for example
+            "pain.001.001.03".
+        xml_template_file_path (str): The path of the XML template file.
+        xsd_schema_file_path (str): The path of the XSD schema file.
+        data_file_path (str): The path of the CSV or SQLite Data file.
+        output_file_path (str, optional): The path of the XML file. Defaults
+            to a file named after the message type next to the XML template
+            file.
+
+    Returns:
+        CacheLookup: The lookup, whose `reused` field tells whether the XML
+        file was copied from the cache, to be passed to
+        `store_cached_output` once the run has written the XML file
+        otherwise. None if the cache is not enabled.
+    """
+    cache_dir = get_output_cache_dir()
+    if cache_dir is None:
+        return None
+    if output_file_path is None:
+        output_file_path = generate_updated_xml_file_path(
+            xml_template_file_path, xml_message_type
+        )
+
+    context = Context.get_instance()
+    with context.timer("cache"):
+        digest = compute_digest(
+            xml_message_type,
+            xml_template_file_path,
+            xsd_schema_file_path,
+            data_file_path,
+        )
+        reused = fetch_output(digest, output_file_path, cache_dir)
+    if reused:
+        context.increment("bytes_written", os.path.getsize(output_file_path))
+        print(
+            f"The XML file at `{output_file_path}` has been reused from the "
+            "cache"
+        )
+    # Only an XML file written by the run is stored in the cache
+    previous_stat = None if reused else _stat(output_file_path)
+    return CacheLookup(
+        digest, output_file_path, cache_dir, previous_stat, reused
+    )
+
+
+def store_cached_output(lookup):
+    """Stores the XML file written by a run that was not found in the cache.
+
+    Args:
+        lookup (CacheLookup): The lookup returned by `fetch_cached_output`
+            before the run.
+    """
+    stat = _stat(lookup.output_file_path)
+    if stat is not None and stat != lookup.previous_stat:
+        with Context.get_instance().timer("cache"):
+            store_output(
+                lookup.digest, lookup.output_file_path, lookup.cache_dir
+            )
+
+
+def _stat(file_path):
+    """Returns the identity of a file's current contents, or None if it
+    does not exist."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _get_max_size():
+    """Returns the maximum size of the cache, in bytes."""
+    try:
+        return int(os.environ["PAIN001_OUTPUT_CACHE_SIZE"])
+    except (KeyError, ValueError):
+        return OUTPUT_CACHE_SIZE
+
+
+def _evict(cache_dir, max_size):
+    """Removes the least recently used XML files until the cache fits in
+    `max_size` bytes."""
+    entries = []
+    total_size = 0
+    with os.scandir(cache_dir) as scanned_entries:
+        for entry in scanned_entries:
+            if not entry.name.endswith(".xml"):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total_size += stat.st_size
+    entries.sort()
+    for _, size, entry_file_path in entries:
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(entry_file_path)
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            pass
+        total_size -= size
@@ -0,0 +1,583 @@
+# Copyright (C) 2023 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+#
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the service mode of pain001, a long-running HTTP server
+that generates ISO 20022 payment messages on request.
+
+Starting a Python process for every message means compiling the XML template
+and the XSD schema again every time. The server is started once instead: it
+runs a pool of worker processes, each of which compiles the templates and
+schemas of every message type it serves when it starts, and keeps them warm
+for all the requests it handles afterwards. Requests are accepted by an
+asyncio HTTP server, on a TCP port or on a Unix domain socket, and the
+CPU-bound rendering and validation run in the worker processes, through
+`process_files`.
+
+The server speaks a small subset of HTTP/1.1:
+
+- `GET /health` returns the status of the server and the message types it
+  serves, as a JSON object,
+- `POST /<message type>` takes the payment data, as CSV (`text/csv`) or as a
+  JSON array with one object per row (`application/json`), and returns the
+  XML message once it has been validated against the XSD schema
+  (`application/xml`).
+
+Errors are returned as a JSON object, whose `error` key holds the error
+message and whose `output` key holds what was printed while generating the
+message, such as the rows that failed validation.
+"""
+
+# Import the standard libraries
+import asyncio
+import concurrent.futures
+import contextlib
+import csv
+import http
+import io
+import json
+import os
+import signal
+import tempfile
+import time
+import urllib.parse
+
+# Import the pain001 library functions
+from pain001.constants.constants import valid_xml_types
+from pain001.context.context import Context
+from pain001.core.core import process_files
+from pain001.core.message import format_value
+from pain001.xml.load_xml_template import (
+    bundled_templates_dir,
+    load_xml_template,
+)
+from pain001.xml.load_xsd_schema import load_xsd_schema
+
+# The address the server listens on by default
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8001
+
+# The largest request body accepted, in bytes
+MAX_BODY_SIZE = 256 * 1024 * 1024
+
+# The data formats accepted, keyed by the content type of the request
+DATA_FORMATS = {"text/csv": "csv", "application/json": "json"}
+
+# The XML templates and XSD schemas used by the current worker, keyed by
+# message type, and the engine rendering the templates
+_worker_settings = None
+
+
+class HttpError(Exception):
+    """An error returned to the client with an HTTP status code, and the
+    output printed while the request was handled."""
+
+    def __init__(self, status, message, output=None):
+        super().__init__(message)
+        self.status = status
+        self.output = output or []
+
+
+def find_templates(templates_dir=None, xml_message_types=None):
+    """
+    Returns the XML template and XSD schema of each message type to serve.
+
+    Args:
+        templates_dir (str, optional): A directory laid out like the
+        templates bundled with pain001, holding a
+        `<message type>/template.xml` XML template and a
+        `<message type>/<message type>.xsd` XSD schema per message type.
+        Defaults to the bundled templates.
+        xml_message_types (list, optional): The message types to serve.
+        Defaults to every message type found in the templates directory.
+
+    Returns:
+        dict: The paths of the XML template and of the XSD schema of each
+        message type, keyed by message type.
+
+    Raises:
+        ValueError: If a message type is not supported.
+        FileNotFoundError: If the XML template or the XSD schema of a message
+        type does not exist.
+    """
+    templates_dir = os.path.expanduser(
+        templates_dir or bundled_templates_dir()
+    )
+    for xml_message_type in xml_message_types or ():
+        if xml_message_type not in valid_xml_types:
+            raise ValueError(
+                f"Error: Invalid XML message type: '{xml_message_type}'."
+            )
+
+    templates = {}
+    for xml_message_type in xml_message_types or valid_xml_types:
+        xml_template_file_path = os.path.join(
+            templates_dir, xml_message_type, "template.xml"
+        )
+        xsd_schema_file_path = os.path.join(
+            templates_dir, xml_message_type, f"{xml_message_type}.xsd"
+        )
+        for file_path in (xml_template_file_path, xsd_schema_file_path):
+            if not os.path.isfile(file_path):
+                if xml_message_types:
+                    raise FileNotFoundError(
+                        f"Error: The file '{file_path}' does not exist."
+                    )
+                break
+        else:
+            templates[xml_message_type] = (
+                xml_template_file_path,
+                xsd_schema_file_path,
+            )
+
+    if not templates:
+        raise FileNotFoundError(
+            f"Error: No templates found in '{templates_dir}'."
+        )
+    return templates
+
+
+class GenerationServer:
+    """
+    An asyncio HTTP server generating payment messages in a pool of worker
+    processes.
+
+    Args:
+        templates (dict): The paths of the XML template and of the XSD schema
+        of each message type served, as returned by `find_templates`.
+        jobs (int, optional): The number of worker processes. Defaults to the
+        number of CPUs.
+        engine (str): The engine rendering the XML templates, "jinja" or
+        "direct".
+        max_body_size (int): The largest request body accepted, in bytes.
+    """
+
+    def __init__(
+        self,
+        templates,
+        jobs=None,
+        engine="jinja",
+        max_body_size=MAX_BODY_SIZE,
+    ):
+        self.templates = templates
+        self.jobs = jobs or os.cpu_count() or 1
+        self.engine = engine
+        self.max_body_size = max_body_size
+        self.server = None
+        self._executor = None
+        self._writers = set()
+
+    async def start(
+        self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket_path=None
+    ):
+        """
+        Starts the worker processes, then listens for requests.
+
+        The workers compile the templates and schemas before the server
+        starts listening, so that the first requests are as fast as the
+        following ones.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The TCP port to listen on; 0 picks a free port.
+            unix_socket_path (str, optional): If set, the server listens on
+            this Unix domain socket instead of a TCP port.
+
+        Returns:
+            asyncio.Server: The listening server.
+        """
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_worker,
+            initargs=(self.templates, self.engine),
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, _ping)
+                for _ in range(self.jobs)
+            )
+        )
+
+        if unix_socket_path:
+            self.server = await asyncio.start_unix_server(
+                self._handle_connection, path=unix_socket_path
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self._handle_connection, host, port
+            )
+        return self.server
+
+    def get_addresses(self):
+        """Returns the addresses the server listens on, as URLs or paths."""
+        addresses = []
+        for sock in self.server.sockets:
+            address = sock.getsockname()
+            if isinstance(address, tuple):
+                host = f"[{address[0]}]" if ":" in address[0] else address[0]
+                addresses.append(f"http://{host}:{address[1]}")
+            else:
+                addresses.append(address)
+        return addresses
+
+    async def close(self):
+        """Stops listening, closes the connections and the worker pool."""
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self.server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    async def _handle_connection(self, reader, writer):
+        """Answers the requests sent on one connection, in turn."""
+        self._writers.add(writer)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await _read_request(reader, self.max_body_size)
+                except HttpError as e:
+                    # The rest of the connection cannot be trusted
+                    writer.write(_format_error(e.status, str(e), False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+
+                start = time.perf_counter()
+                try:
+                    content_type, content = await self._respond(
+                        method, target, headers, body
+                    )
+                    response = _format_response(
+                        200, content_type, content, keep_alive
+                    )
+                    status = 200
+                except HttpError as e:
+                    response = _format_error(
+                        e.status, str(e), keep_alive, e.output
+                    )
+                    status = e.status
+
+                writer.write(response)
+                await writer.drain()
+                Context.get_instance().get_logger().info(
+                    f"{method} {target} {status} "
+                    f"({time.perf_counter() - start:.3f}s)"
+                )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def _respond(self, method, target, headers, body):
+        """Returns the content type and content answering a request."""
+        path = urllib.parse.urlsplit(target).path.strip("/")
+        if path == "health":
+            if method != "GET":
+                raise HttpError(405, "Error: Use GET to query /health.")
+            status = {
+                "status": "ok",
+                "message_types": sorted(self.templates),
+                "engine": self.engine,
+                "jobs": self.jobs,
+            }
+            return "application/json", json.dumps(status).encode("utf-8")
+
+        if path not in self.templates:
+            raise HttpError(404, f"Error: Not found: '/{path}'.")
+        if method != "POST":
+            raise HttpError(
+                405, f"Error: Use POST to generate a {path} message."
+            )
+
+        content_type = headers.get("content-type", "")
+        content_type = content_type.split(";")[0].strip().lower()
+        if content_type not in DATA_FORMATS:
+            raise HttpError(
+                415,
+                f"Error: Unsupported content type: '{content_type}'. Use "
+                f"{' or '.join(DATA_FORMATS)}.",
+            )
+        if not body:
+            raise HttpError(400, "Error: No data to process.")
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor,
+                _generate,
+                path,
+                body,
+                DATA_FORMATS[content_type],
+            )
+        except Exception as e:
+            raise HttpError(500, f"Error: {e}") from e
+
+        if result["status"] != 200:
+            raise HttpError(
+                result["status"], result["error"], result["output"]
+            )
+        return "application/xml; charset=utf-8", result["xml"]
+
+
+def serve(
+    templates,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    unix_socket_path=None,
+    jobs=None,
+    engine="jinja",
+):
+    """
+    Runs a generation server until it is interrupted or terminated.
+
+    Args:
+        templates (dict): The paths of the XML template and of the XSD schema
+        of each message type served, as returned by `find_templates`.
+        host (str): The address to listen on.
+        port (int): The TCP port to listen on.
+        unix_socket_path (str, optional): If set, the server listens on this
+        Unix domain socket instead of a TCP port.
+        jobs (int, optional): The number of worker processes. Defaults to the
+        number of CPUs.
+        engine (str): The engine rendering the XML templates, "jinja" or
+        "direct".
+
+    Returns:
+        None
+    """
+    asyncio.run(
+        _serve(
+            GenerationServer(templates, jobs=jobs, engine=engine),
+            host,
+            port,
+            unix_socket_path,
+        )
+    )
+
+
+async def _serve(server, host, port, unix_socket_path):
+    """Runs a server until the process receives SIGTERM or SIGINT."""
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal_number, stopped.set)
+
+    try:
+        await server.start(host, port, unix_socket_path)
+        print(
+            f"Serving {', '.join(sorted(server.templates))} on "
+            f"{', '.join(server.get_addresses())} with {server.jobs} "
+            "worker process(es)"
+        )
+        await stopped.wait()
+    finally:
+        await server.close()
+        if unix_socket_path:
+            with contextlib.suppress(OSError):
+                os.remove(unix_socket_path)
+
+
+async def _read_request(reader, max_body_size):
+    """
+    Reads one HTTP request from a connection.
+
+    Returns the method, target, version, headers and body of the request, or
+    None if the connection was closed before a new request started.
+    """
+    try:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise HttpError(400, "Error: Malformed request line.")
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, separator, value = line.decode("latin-1").partition(":")
+            if not separator:
+                raise HttpError(400, "Error: Malformed header line.")
+            headers[name.strip().lower()] = value.strip()
+    except ValueError as e:
+        # Lines longer than the limit of the stream reader
+        raise HttpError(431, "Error: Request line or header too long.") from e
+
+    if headers.get("transfer-encoding", "identity").lower() != "identity":
+        raise HttpError(
+            411,
+            "Error: Chunked requests are not supported; send a "
+            "Content-Length header.",
+        )
+    try:
+        content_length = int(headers.get("content-length", "0"))
+    except ValueError as e:
+        raise HttpError(400, "Error: Invalid Content-Length header.") from e
+    if content_length < 0:
+        raise HttpError(400, "Error: Invalid Content-Length header.")
+    if content_length > max_body_size:
+        raise HttpError(
+            413,
+            f"Error: The request body exceeds {max_body_size} bytes.",
+        )
+
+    body = await reader.readexactly(content_length)
+    return method, target, version, headers, body
+
+
+def _format_response(status, content_type, content, keep_alive):
+    """Returns the bytes of an HTTP response."""
+    reason = http.HTTPStatus(status).phrase
+    head = (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(content)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + content
+
+
+def _format_error(status, message, keep_alive, output=()):
+    """Returns the bytes of an HTTP response reporting an error."""
+    error = {"error": message, "output": list(output)}
+    return _format_response(
+        status,
+        "application/json",
+        json.dumps(error).encode("utf-8"),
+        keep_alive,
+    )
+
+
+def _init_worker(templates, engine):
+    """Compiles the XML templates and the XSD schemas once per worker."""
+    global _worker_settings
+    for xml_template_file_path, xsd_schema_file_path in templates.values():
+        load_xml_template(xml_template_file_path, engine)
+        load_xsd_schema(xsd_schema_file_path)
+    _worker_settings = (templates, engine)
+
+
+def _ping():
+    """Returns once the worker running it has been initialized."""
+
+
+def _generate(xml_message_type, body, data_format):
+    """Generates the XML message of one request and reports the outcome."""
+    templates, engine = _worker_settings
+    xml_template_file_path, xsd_schema_file_path = templates[xml_message_type]
+    output = io.StringIO()
+
+    with tempfile.TemporaryDirectory(prefix="pain001-") as directory:
+        data_file_path = os.path.join(directory, "data.csv")
+        output_file_path = os.path.join(directory, f"{xml_message_type}.xml")
+        try:
+            _write_data_file(body, data_format, data_file_path)
+        except ValueError as e:
+            return {"status": 400, "error": str(e), "output": []}
+
+        status = 422
+        try:
+            with contextlib.redirect_stdout(output):
+                process_files(
+                    xml_message_type,
+                    xml_template_file_path,
+                    xsd_schema_file_path,
+                    data_file_path,
+                    output_file_path=output_file_path,
+                    engine=engine,
+                )
+            with open(output_file_path, "rb") as xml_file:
+                return {"status": 200, "xml": xml_file.read()}
+        except SystemExit:
+            # The generators print their errors before exiting
+            lines = output.getvalue().strip().splitlines()
+            error = lines[-1] if lines else "Error: Generation failed."
+        except ValueError as e:
+            error = str(e)
+        except Exception as e:
+            status = 500
+            error = f"Error: {e}"
+
+    return {
+        "status": status,
+        "error": error,
+        "output": [
+            line.strip()
+            for line in output.getvalue().splitlines()
+            if line.strip()
+        ],
+    }
+
+
+def _write_data_file(body, data_format, data_file_path):
+    """Writes the payment data of a request to a CSV file."""
+    if data_format == "csv":
+        with open(data_file_path, "wb") as data_file:
+            data_file.write(body)
+        return
+
+    try:
+        rows = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"Error: Invalid JSON data: {e}") from e
+    if (
+        not isinstance(rows, list)
+        or not rows
+        or not all(isinstance(row, dict) for row in rows)
+    ):
+        raise ValueError(
+            "Error: The JSON data must be a non-empty array of objects, one "
+            "per row."
+        )
+
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with open(data_file_path, "w", encoding="utf-8", newline="") as data_file:
+        writer = csv.DictWriter(data_file, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {
+                    column: _format_json_value(column, value)
+                    for column, value in row.items()
+                }
+            )
+
+
+def _format_json_value(column, value):
+    """Returns the CSV value of a JSON value."""
+    if value is not None and not isinstance(value, (str, bool, int, float)):
+        raise ValueError(
+            f"Error: The value of '{column}' must be a string, a number, a "
+            "boolean or null."
+        )
+    return format_value(value)
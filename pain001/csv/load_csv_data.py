@@ -16,7 +16,8 @@
 import csv
 import logging
 
-logging.basicConfig(level=logging.ERROR, format="%(levelname)s: %(message)s")
+# Configure the logger
+logger = logging.getLogger(__name__)
 
 
 def load_csv_data(file_path):
@@ -41,15 +42,15 @@ def load_csv_data(file_path):
             for row in csv_reader:
                 data.append(row)
     except FileNotFoundError:
-        logging.error(f"File '{file_path}' not found.")
+        logger.error(f"File '{file_path}' not found.")
         raise
     except IOError:
-        logging.error(
+        logger.error(
             f"An IOError occurred while reading the file '{file_path}'."
         )
         raise
     except UnicodeDecodeError:
-        logging.error(
+        logger.error(
             "A UnicodeDecodeError occurred while decoding the file '"
             + file_path
             + "'."
@@ -60,3 +61,47 @@ def load_csv_data(file_path):
         raise ValueError(f"The CSV file '{file_path}' is empty.")
 
     return data
+
+
+def iter_csv_data(file_path):
+    """Lazily read CSV data from a file, one row at a time.
+
+    Unlike `load_csv_data`, the rows are never collected into a list, so the
+    memory used stays the same whatever the size of the file.
+
+    Args:
+        file_path (str): The path to the CSV file.
+
+    Yields:
+        dict: A dictionary containing one row of the CSV data.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        IOError: If there is an issue reading the file.
+        UnicodeDecodeError: If there is an issue decoding the file's content.
+        ValueError: If the CSV file is empty.
+    """
+    is_empty = True
+    try:
+        with open(file_path, mode="r", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                is_empty = False
+                yield row
+    except FileNotFoundError:
+        logger.error(f"File '{file_path}' not found.")
+        raise
+    except IOError:
+        logger.error(
+            f"An IOError occurred while reading the file '{file_path}'."
+        )
+        raise
+    except UnicodeDecodeError:
+        logger.error(
+            "A UnicodeDecodeError occurred while decoding the file '"
+            + file_path
+            + "'."
+        )
+        raise
+
+    if is_empty:
+        raise ValueError(f"The CSV file '{file_path}' is empty.")
@@ -0,0 +1,332 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the columnar validation engine used by
+`validate_csv_data`.
+
+Instead of checking every row column by column, one validator is compiled per
+column up front and is then run over the whole column at once. Each distinct
+value is only checked once, which makes date and code columns (with few
+distinct values) almost free to validate, and numeric columns are converted
+in a single pass that runs at C speed. Values are only looked at one by one
+when that fast pass finds something wrong. The outcome is returned as a
+`ValidationReport` recording every missing or invalid value.
+"""
+
+import collections
+import csv
+import datetime
+import functools
+import heapq
+import itertools
+import operator
+
+# A missing or invalid value, identified by its row index and column name.
+CsvValidationError = collections.namedtuple(
+    "CsvValidationError", ["row", "column", "error", "value"]
+)
+
+
+class ValidationReport:
+    """The outcome of the validation of CSV data.
+
+    Every missing or invalid value is recorded by its row index, its column
+    and its error code, "missing" or "invalid", while only the first ones
+    are kept with their value as examples, so that a corrupt file does not
+    make the report grow with the values of its rows.
+
+    Attributes:
+        row_count (int): The number of rows that were validated.
+        columns (dict): The validated columns and their expected data type.
+        errors (list): The `CsvValidationError` of the missing or invalid
+            values kept as examples, ordered by row and then by column.
+        indices (dict): The row indices of every missing or invalid value,
+            keyed by column and error code.
+        error_count (int): The number of missing or invalid values.
+
+    Methods:
+        is_valid(self): Returns True if no error was found.
+        rows(self): Returns the errors kept as examples grouped by row index.
+        error_counts(self): Returns the number of errors per column.
+        iter_errors(self): Yields every error in row order.
+        summary(self): Returns a compact summary of the errors.
+        write_errors(self, file_path): Writes every error to a CSV file.
+    """
+
+    def __init__(self, row_count, columns, errors, indices=None):
+        """Initializes the report.
+
+        Args:
+            row_count (int): The number of rows that were validated.
+            columns (dict): The validated columns and their data type.
+            errors (list): The errors kept as examples.
+            indices (dict, optional): The row indices of every missing or
+                invalid value, keyed by column and error code. Defaults to
+                those of `errors`.
+        """
+        self.row_count = row_count
+        self.columns = columns
+        self.errors = errors
+        if indices is None:
+            indices = {}
+            for error in errors:
+                key = (error.column, error.error)
+                indices.setdefault(key, []).append(error.row)
+        self.indices = indices
+        self.error_count = sum(map(len, indices.values()))
+
+    def is_valid(self):
+        """Returns True if no missing or invalid value was found."""
+        return not self.error_count
+
+    def rows(self):
+        """Returns the errors kept as examples grouped by row index, in row
+        order.
+
+        Returns:
+            dict: A mapping of row index to the list of errors of that row.
+        """
+        rows = {}
+        for error in self.errors:
+            rows.setdefault(error.row, []).append(error)
+        return rows
+
+    def error_counts(self):
+        """Returns the number of errors per column.
+
+        Returns:
+            collections.Counter: A mapping of column name to error count.
+        """
+        counts = collections.Counter()
+        for (column, _), indices in self.indices.items():
+            counts[column] += len(indices)
+        return counts
+
+    def iter_errors(self):
+        """Yields every missing or invalid value, ordered by row and then by
+        column.
+
+        Yields:
+            tuple: The row index, the column and the error code.
+        """
+        order = {
+            column: position for position, column in enumerate(self.columns)
+        }
+        runs = [
+            zip(
+                indices,
+                itertools.repeat(order[column]),
+                itertools.repeat(column),
+                itertools.repeat(error),
+            )
+            for (column, error), indices in self.indices.items()
+        ]
+        for index, _, column, error in heapq.merge(*runs):
+            yield index, column, error
+
+    def summary(self):
+        """Returns a compact summary of the errors, with a line per column.
+
+        Returns:
+            list of str: The lines of the summary.
+        """
+        rows = set().union(*self.indices.values())
+        lines = [
+            f"Error: {self.error_count} missing or invalid value(s) in "
+            f"{len(rows)} of {self.row_count} row(s)."
+        ]
+        for column, data_type in self.columns.items():
+            for error in ("missing", "invalid"):
+                count = len(self.indices.get((column, error), ()))
+                if not count:
+                    continue
+                line = f"  {column}: {count} {error}"
+                if error == "invalid":
+                    line += f", expected {data_type.__name__}"
+                lines.append(line)
+        return lines
+
+    def write_errors(self, file_path):
+        """Writes every missing or invalid value to a CSV file.
+
+        Each line holds the number of the row, counted from 1 without the
+        header, its column and the error code.
+
+        Args:
+            file_path (str): The path of the CSV file.
+        """
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "column", "error"])
+            writer.writerows(
+                (index + 1, column, error)
+                for index, column, error in self.iter_errors()
+            )
+
+
+def is_valid_int(value):
+    """Returns True if the value can be read as an integer."""
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def is_valid_float(value):
+    """Returns True if the value can be read as a float."""
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def is_valid_bool(value):
+    """Returns True if the value is 'true' or 'false', in any case."""
+    return value.strip().lower() in ("true", "false")
+
+
+def is_valid_datetime(value):
+    """Returns True if the value is an ISO 8601 date and time, or a date in
+    the YYYY-MM-DD format."""
+    # Handle the "Z" suffix for UTC
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        datetime.datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            datetime.datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            return False
+    return True
+
+
+# The function checking a single non-empty value of each data type. Strings
+# only need to be present.
+value_validators = {
+    int: is_valid_int,
+    float: is_valid_float,
+    bool: is_valid_bool,
+    datetime.datetime: is_valid_datetime,
+    str: None,
+}
+
+# The conversion used to check a whole numeric column in a single pass.
+column_converters = {int: int, float: float}
+
+
+@functools.lru_cache(maxsize=None)
+def compile_column_validator(data_type):
+    """Compiles the validator of a column of the given data type.
+
+    Args:
+        data_type (type): The expected data type of the column, one of the
+            keys of `value_validators`.
+
+    Validators are compiled once per data type and then reused.
+
+    Returns:
+        callable: A function taking the list of values of a column and
+        returning the indices of its missing values and of its invalid
+        values, as two lists.
+    """
+    validate_value = value_validators[data_type]
+    convert = column_converters.get(data_type)
+
+    def is_valid_column(distinct):
+        # Numeric conversions also reject missing values
+        if convert is not None:
+            collections.deque(map(convert, distinct), maxlen=0)
+            return True
+        if None in distinct or "" in distinct:
+            return False
+        if any(map(str.isspace, distinct)):
+            return False
+        return validate_value is None or all(map(validate_value, distinct))
+
+    def validate_column(values):
+        # Check each distinct value only once
+        distinct = set(values)
+        try:
+            if is_valid_column(distinct):
+                return [], []
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+        # Something is wrong: find out which values are missing or invalid
+        missing_values = {
+            value for value in distinct if not value or value.isspace()
+        }
+        invalid_values = set()
+        if validate_value is not None:
+            invalid_values = {
+                value
+                for value in distinct - missing_values
+                if not validate_value(value)
+            }
+        missing = [
+            index
+            for index, value in enumerate(values)
+            if value in missing_values
+        ]
+        invalid = [
+            index
+            for index, value in enumerate(values)
+            if value in invalid_values
+        ]
+        return missing, invalid
+
+    return validate_column
+
+
+def validate_csv_columns(data, columns, max_examples=None):
+    """Validates CSV data column by column.
+
+    Args:
+        data (list): A list of dictionaries containing the CSV data.
+        columns (dict): The columns to validate and their expected data
+            type.
+        max_examples (int, optional): The number of errors kept with their
+            value in the report. Defaults to keeping all of them.
+
+    Returns:
+        ValidationReport: The missing and invalid values that were found.
+    """
+    errors = []
+    indices = {}
+    for column, data_type in columns.items():
+        validate_column = compile_column_validator(data_type)
+        try:
+            values = list(map(operator.itemgetter(column), data))
+        except KeyError:
+            values = [row.get(column) for row in data]
+        missing, invalid = validate_column(values)
+        for error, rows in (("missing", missing), ("invalid", invalid)):
+            if not rows:
+                continue
+            indices[(column, error)] = rows
+            # The first errors of the file are among the first of each column
+            errors.extend(
+                CsvValidationError(index, column, error, values[index])
+                for index in rows[:max_examples]
+            )
+
+    # Order the errors by row, keeping the column order within a row
+    order = {column: position for position, column in enumerate(columns)}
+    errors.sort(key=lambda error: (error.row, order[error.column]))
+    return ValidationReport(len(data), columns, errors[:max_examples], indices)
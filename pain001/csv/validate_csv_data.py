@@ -40,94 +40,204 @@
 # - remittance_information (str) - remittance information
 
 
+import csv
 import datetime
 
+from pain001.context.context import Context
+from pain001.csv.validate_csv_columns import (
+    validate_csv_columns,
+    value_validators,
+)
 
-def validate_csv_data(data):
+# The number of missing or invalid values reported with their row
+MAX_ERROR_EXAMPLES = 10
+
+# The columns that every CSV row must provide, with their expected data type.
+required_columns = {
+    "id": int,
+    "date": datetime.datetime,
+    "nb_of_txs": int,
+    "ctrl_sum": float,
+    "initiator_name": str,
+    "payment_information_id": str,
+    "payment_method": str,
+    "batch_booking": bool,
+    "service_level_code": str,
+    "requested_execution_date": datetime.datetime,
+    "debtor_name": str,
+    "debtor_account_IBAN": str,
+    "debtor_agent_BIC": str,
+    "forwarding_agent_BIC": str,
+    "charge_bearer": str,
+    "payment_id": str,
+    "payment_amount": float,
+    "currency": str,
+    "creditor_agent_BIC": str,
+    "creditor_name": str,
+    "creditor_account_IBAN": str,
+    "remittance_information": str,
+}
+
+
+def validate_csv_data(data, errors_file_path=None):
     """Validate the CSV data before processing it.
 
+    The data is validated column by column with `validate_csv_columns`. The
+    rows of the first `MAX_ERROR_EXAMPLES` missing or invalid values are
+    reported on the standard output, followed by the number of errors of
+    each column.
+
     Args:
         data (list): A list of dictionaries containing the CSV data.
+        errors_file_path (str, optional): The path of a CSV file to which
+            every missing or invalid value is written, if there are any.
 
     Returns:
         bool: True if the data is valid, False otherwise.
     """
-    required_columns = {
-        "id": int,
-        "date": datetime.datetime,
-        "nb_of_txs": int,
-        "ctrl_sum": float,
-        "initiator_name": str,
-        "payment_information_id": str,
-        "payment_method": str,
-        "batch_booking": bool,
-        "service_level_code": str,
-        "requested_execution_date": datetime.datetime,
-        "debtor_name": str,
-        "debtor_account_IBAN": str,
-        "debtor_agent_BIC": str,
-        "forwarding_agent_BIC": str,
-        "charge_bearer": str,
-        "payment_id": str,
-        "payment_amount": float,
-        "currency": str,
-        "creditor_agent_BIC": str,
-        "creditor_name": str,
-        "creditor_account_IBAN": str,
-        "remittance_information": str,
-    }
-
     if not data:
         print("Error: The CSV data is empty.")
         return False
 
-    is_valid = True
-
-    for row in data:
-        missing_columns = []
-        invalid_columns = []
-        for column, data_type in required_columns.items():
-            value = row.get(column)
-            if value is None or value.strip() == "":
-                missing_columns.append(column)
-                is_valid = False
-            else:
-                try:
-                    if data_type == int:
-                        int(value)
-                    elif data_type == float:
-                        float(value)
-                    elif data_type == bool:
-                        if value.strip().lower() not in [
-                            "true",
-                            "false",
-                        ]:
-                            raise ValueError
-                    elif data_type == datetime.datetime:
-                        try:
-                            # Handle the "Z" suffix for UTC
-                            if value.endswith("Z"):
-                                value = value[:-1] + "+00:00"
-                            datetime.datetime.fromisoformat(value)
-                        except ValueError:
-                            datetime.datetime.strptime(value, "%Y-%m-%d")
-                    else:
-                        str(value)
-                except ValueError:
-                    invalid_columns.append(column)
-                    is_valid = False
-        if missing_columns:
-            print(
-                f"Error: Missing value(s) for column(s) {missing_columns} "
-                f"in row: {row}"
-            )
-        if invalid_columns:
-            expected_types = [
-                required_columns[col].__name__ for col in invalid_columns
-            ]
-            print(
-                f"Error: Invalid data type for column(s) {invalid_columns}, "
-                f"expected {expected_types} in row: {row}"
-            )
-
-    return is_valid
+    report = validate_csv_columns(data, required_columns, MAX_ERROR_EXAMPLES)
+    if report.is_valid():
+        return True
+
+    for index, errors in report.rows().items():
+        print_csv_row_errors(
+            f"row {index + 1}",
+            [error.column for error in errors if error.error == "missing"],
+            [error.column for error in errors if error.error == "invalid"],
+        )
+    for line in report.summary():
+        print(line)
+    if errors_file_path is not None:
+        report.write_errors(errors_file_path)
+        print(f"The CSV errors have been written to `{errors_file_path}`")
+
+    return False
+
+
+def validate_csv_row(row, index=None):
+    """Validate a single row of CSV data.
+
+    Any missing or invalid values are reported on the standard output, with
+    the number of the row rather than its values.
+
+    Args:
+        row (dict): A dictionary containing one row of the CSV data.
+        index (int, optional): The 0-based position of the row in the data,
+            reported as a 1-based row number.
+
+    Returns:
+        bool: True if the row is valid, False otherwise.
+    """
+    missing_columns, invalid_columns = find_csv_row_errors(row)
+    location = "row" if index is None else f"row {index + 1}"
+    print_csv_row_errors(location, missing_columns, invalid_columns)
+
+    return not missing_columns and not invalid_columns
+
+
+def find_csv_row_errors(row):
+    """Find the missing and invalid values of a single row of CSV data.
+
+    Args:
+        row (dict): A dictionary containing one row of the CSV data.
+
+    Returns:
+        tuple: The list of the columns whose value is missing, and the list
+        of the columns whose value is invalid.
+    """
+    missing_columns = []
+    invalid_columns = []
+    for column, data_type in required_columns.items():
+        value = row.get(column)
+        if value is None or value.strip() == "":
+            missing_columns.append(column)
+        else:
+            validate_value = value_validators[data_type]
+            if validate_value and not validate_value(value):
+                invalid_columns.append(column)
+    return missing_columns, invalid_columns
+
+
+def print_csv_row_errors(location, missing_columns, invalid_columns):
+    """Report the missing and invalid values of a row on the standard output.
+
+    Args:
+        location (str): The row, as shown in the messages.
+        missing_columns (list): The columns whose value is missing.
+        invalid_columns (list): The columns whose value is invalid.
+    """
+    if missing_columns:
+        print(
+            f"Error: Missing value(s) for column(s) {missing_columns} "
+            f"in {location}"
+        )
+    if invalid_columns:
+        expected_types = [
+            required_columns[col].__name__ for col in invalid_columns
+        ]
+        print(
+            f"Error: Invalid data type for column(s) {invalid_columns}, "
+            f"expected {expected_types} in {location}"
+        )
+
+
+def iter_valid_csv_data(rows, quarantine_file_path=None):
+    """Validate CSV rows lazily, as they are consumed.
+
+    This is the streaming counterpart of `validate_csv_data`: each row is
+    checked when it is pulled from the iterator and passed on unchanged, so
+    that validation does not require the whole file to be held in memory.
+
+    Args:
+        rows (iterable of dict): The CSV rows, for example as yielded by
+            `iter_csv_data`.
+        quarantine_file_path (str, optional): If set, the invalid rows are
+            written to this CSV file, with an `errors` column giving their
+            missing and invalid values, and are skipped instead of stopping
+            the validation.
+
+    Yields:
+        dict: Each row, once it has been validated.
+
+    Raises:
+        ValueError: As soon as an invalid row is found, unless the invalid
+            rows are quarantined.
+    """
+    if quarantine_file_path is None:
+        for index, row in enumerate(rows):
+            if not validate_csv_row(row, index):
+                raise ValueError("Error: Invalid CSV data.")
+            yield row
+        return
+
+    rejected = 0
+    with open(quarantine_file_path, "w", newline="") as quarantine_file:
+        writer = None
+        for row in rows:
+            # The columns of the quarantine file are those of the first row
+            if writer is None:
+                writer = csv.DictWriter(
+                    quarantine_file,
+                    [*row, "errors"],
+                    extrasaction="ignore",
+                )
+                writer.writeheader()
+            missing_columns, invalid_columns = find_csv_row_errors(row)
+            if not missing_columns and not invalid_columns:
+                yield row
+                continue
+            errors = [f"{column}: missing" for column in missing_columns]
+            errors += [f"{column}: invalid" for column in invalid_columns]
+            writer.writerow(dict(row, errors="; ".join(errors)))
+            rejected += 1
+
+    Context.get_instance().increment("rows_rejected", rejected)
+    if rejected:
+        print(
+            f"{rejected} invalid row(s) have been written to "
+            f"`{quarantine_file_path}`"
+        )
@@ -42,13 +42,15 @@ def sanitize_table_name(table_name):
     return sanitized_name
 
 
-def load_db_data(data_file_path, table_name):
+def load_db_data(data_file_path, table_name, columns=None):
     """
     Load data from an SQLite database table into a list of dictionaries.
 
     Args:
         data_file_path (str): The path to the SQLite database file.
         table_name (str): The name of the table from which data will be loaded.
+        columns (list, optional): The columns to load. Columns missing from
+            the table are left out. Defaults to all the columns of the table.
 
     Returns:
         list:
@@ -66,6 +68,36 @@ def load_db_data(data_file_path, table_name):
     Example:
         data = load_db_data("my_database.db", "my_table")
     """
+    return list(iter_db_data(data_file_path, table_name, columns=columns))
+
+
+def iter_db_data(data_file_path, table_name, columns=None, arraysize=1000):
+    """
+    Stream the rows of an SQLite database table as dictionaries.
+
+    This is the streaming counterpart of `load_db_data`: rows are fetched
+    from the cursor `arraysize` at a time with `fetchmany`, so that memory
+    use stays bounded and the first rows can be processed before the last
+    ones are read. The query is run when the function is called, so that
+    errors are raised straight away; the connection is closed once all the
+    rows have been consumed or the iterator is closed.
+
+    Args:
+        data_file_path (str): The path to the SQLite database file.
+        table_name (str): The name of the table from which data will be loaded.
+        columns (list, optional): The columns to load. Columns missing from
+            the table are left out. Defaults to all the columns of the table.
+        arraysize (int): The number of rows fetched at a time.
+
+    Returns:
+        iterator: The rows of the table, as dictionaries keyed by column name.
+
+    Raises:
+        FileNotFoundError:
+            If the SQLite file specified by data_file_path does not exist.
+        sqlite3.OperationalError:
+            If there is an issue with SQLite database operations.
+    """
 
     # Check if the SQLite file exists
     if not os.path.exists(data_file_path):
@@ -73,35 +105,46 @@ def load_db_data(data_file_path, table_name):
             f"SQLite file '{data_file_path}' does not exist."
         )
 
-    # Connect to the SQLite database
-    conn = sqlite3.connect(data_file_path)
-    cursor = conn.cursor()
-
     # Sanitize the table_name before using it in the query
     table_name = sanitize_table_name(table_name)
 
-    # Fetch column names from the table
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [column[1] for column in cursor.fetchall()]
-
-    # Sanitize the table_name before using it in the query
-    table_name = sanitize_table_name(table_name)
-
-    # Use string formatting to construct the query
-
-    query = f"SELECT * FROM {table_name}"
-    cursor.execute(query)
-    rows = cursor.fetchall()
-
-    # Create a list of dictionaries with column names as keys
-    data = []
-    for row in rows:
-        row_dict = {}
-        for i, value in enumerate(row):
-            row_dict[columns[i]] = value
-        data.append(row_dict)
-
-    # Close the connection to the SQLite database
-    conn.close()
-
-    return data
+    # Connect to the SQLite database
+    conn = sqlite3.connect(data_file_path)
+    try:
+        cursor = conn.cursor()
+        cursor.arraysize = arraysize
+
+        # Only select the requested columns that the table provides
+        selection = "*"
+        if columns is not None:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            available = {column[1] for column in cursor.fetchall()}
+            selection = ", ".join(
+                f'"{column}"' for column in columns if column in available
+            )
+            if not selection:
+                raise sqlite3.OperationalError(
+                    f"no such table or columns: {table_name}"
+                )
+
+        cursor.execute(f"SELECT {selection} FROM {table_name}")
+    except BaseException:
+        conn.close()
+        raise
+
+    # Rows are fetched as tuples and keyed by the column names of the query
+    names = [description[0] for description in cursor.description]
+    return _fetch_rows(conn, cursor, names)
+
+
+def _fetch_rows(conn, cursor, names):
+    """Yields the rows of a cursor in batches, then closes the connection."""
+    try:
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(names, row))
+    finally:
+        conn.close()
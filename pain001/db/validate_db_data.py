@@ -14,10 +14,66 @@
 # limitations under the License.
 
 import logging
+import os
+import sqlite3
+
+from pain001.db.load_db_data import sanitize_table_name
 
 # Configure the logger
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.ERROR)
+
+# The columns that every row of the SQLite table must provide.
+required_columns = [
+    "id",
+    "date",
+    "nb_of_txs",
+    "initiator_name",
+    "initiator_street_name",
+    "initiator_building_number",
+    "initiator_postal_code",
+    "initiator_town_name",
+    "initiator_country_code",
+    "payment_information_id",
+    "payment_method",
+    "batch_booking",
+    "requested_execution_date",
+    "debtor_name",
+    "debtor_street_name",
+    "debtor_building_number",
+    "debtor_postal_code",
+    "debtor_town_name",
+    "debtor_country_code",
+    "debtor_account_IBAN",
+    "debtor_agent_BIC",
+    "charge_bearer",
+    "payment_id",
+    "payment_amount",
+    "currency",
+    "payment_currency",
+    "ctrl_sum",
+    "creditor_agent_BIC",
+    "creditor_name",
+    "creditor_street_name",
+    "creditor_building_number",
+    "creditor_postal_code",
+    "creditor_town_name",
+    "creditor_country_code",
+    "creditor_account_IBAN",
+    "purpose_code",
+    "reference_number",
+    "reference_date",
+    "service_level_code",
+    "end_to_end_id",
+    "payment_instruction_id",
+    "instruction_id",
+    "category_purpose",
+    "remittance_info_unstructured",
+    "remittance_info_structured",
+    "addtl_end_to_end_id",
+    "payment_info_structured",
+    "forwarding_agent_BIC",
+    "remittance_information",
+]
 
 
 def validate_db_data(data):
@@ -30,58 +86,6 @@ def validate_db_data(data):
     Returns:
         bool: True if the data is valid, False otherwise.
     """
-    required_columns = [
-        "id",
-        "date",
-        "nb_of_txs",
-        "initiator_name",
-        "initiator_street_name",
-        "initiator_building_number",
-        "initiator_postal_code",
-        "initiator_town_name",
-        "initiator_country_code",
-        "payment_information_id",
-        "payment_method",
-        "batch_booking",
-        "requested_execution_date",
-        "debtor_name",
-        "debtor_street_name",
-        "debtor_building_number",
-        "debtor_postal_code",
-        "debtor_town_name",
-        "debtor_country_code",
-        "debtor_account_IBAN",
-        "debtor_agent_BIC",
-        "charge_bearer",
-        "payment_id",
-        "payment_amount",
-        "currency",
-        "payment_currency",
-        "ctrl_sum",
-        "creditor_agent_BIC",
-        "creditor_name",
-        "creditor_street_name",
-        "creditor_building_number",
-        "creditor_postal_code",
-        "creditor_town_name",
-        "creditor_country_code",
-        "creditor_account_IBAN",
-        "purpose_code",
-        "reference_number",
-        "reference_date",
-        "service_level_code",
-        "end_to_end_id",
-        "payment_instruction_id",
-        "instruction_id",
-        "category_purpose",
-        "remittance_info_unstructured",
-        "remittance_info_structured",
-        "addtl_end_to_end_id",
-        "payment_info_structured",
-        "forwarding_agent_BIC",
-        "remittance_information",
-    ]
-
     for row in data:
         for column in required_columns:
             if column not in row or row[column] is None:
@@ -92,3 +96,92 @@ def validate_db_data(data):
                 )
                 return False
     return True
+
+
+def validate_db_table(data_file_path, table_name, max_errors=100):
+    """
+    Validate the data of an SQLite table inside SQLite itself.
+
+    The schema of the table is checked once with `PRAGMA table_info`, then a
+    single aggregate query counts the rows in which a required column is null
+    or empty, so that a valid table is validated without any row being loaded
+    into Python. Only when that query finds such rows are the rowids of the
+    offending rows fetched, up to `max_errors` of them, and logged.
+
+    Args:
+        data_file_path (str): The path to the SQLite database file.
+        table_name (str): The name of the table to validate.
+        max_errors (int): The maximum number of offending rows to log.
+
+    Returns:
+        bool: True if the data is valid, False otherwise.
+
+    Raises:
+        FileNotFoundError:
+            If the SQLite file specified by data_file_path does not exist.
+    """
+    if not os.path.exists(data_file_path):
+        raise FileNotFoundError(
+            f"SQLite file '{data_file_path}' does not exist."
+        )
+
+    table_name = sanitize_table_name(table_name)
+    conn = sqlite3.connect(data_file_path)
+    try:
+        cursor = conn.cursor()
+
+        # Check the schema of the table once
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        columns = {column[1] for column in cursor.fetchall()}
+        missing_columns = [
+            column for column in required_columns if column not in columns
+        ]
+        if missing_columns:
+            logger.error(
+                "Error: Missing column(s) %s in table '%s'",
+                missing_columns,
+                table_name,
+            )
+            return False
+
+        # Count the rows with null or empty values in a single pass
+        conditions = [
+            f'("{column}" IS NULL OR trim("{column}") = \'\')'
+            for column in required_columns
+        ]
+        cursor.execute(
+            f"SELECT count(*) FROM {table_name} WHERE "
+            + " OR ".join(conditions)
+        )
+        invalid_row_count = cursor.fetchone()[0]
+        if not invalid_row_count:
+            return True
+
+        # Fetch the rowids of the first offending rows and the columns they
+        # miss
+        logger.error(
+            "Error: %s row(s) with missing values in table '%s'",
+            invalid_row_count,
+            table_name,
+        )
+        cursor.execute(
+            "SELECT rowid, "
+            + " || ".join(
+                f"CASE WHEN {condition} THEN '{column},' ELSE '' END"
+                for column, condition in zip(required_columns, conditions)
+            )
+            + f" FROM {table_name} WHERE "
+            + " OR ".join(conditions)
+            + " ORDER BY rowid LIMIT ?",
+            (max_errors,),
+        )
+        for rowid, row_columns in cursor.fetchall():
+            logger.error(
+                "Error: Missing value(s) for column(s) %s in row with "
+                "rowid %s",
+                row_columns.rstrip(",").split(","),
+                rowid,
+            )
+        return False
+    finally:
+        conn.close()
@@ -18,20 +18,21 @@ This module contains the function `create_xml_v3`, which constructs an XML tree
 for the ISO 20022 pain.001.001.03 schema.
 
 The function takes in a root ElementTree element and a list of dictionaries
-containing the required data. It then uses Jinja2 templating to dynamically
-generate the XML content based on the given data. The function ultimately
-returns the root element of the modified XML tree.
+containing the required data. It then builds the XML content from the
+bundled XML template and the given data, straight into ElementTree
+elements. The function ultimately returns the root element of the modified
+XML tree.
 """
 
 import xml.etree.ElementTree as et
-from jinja2 import Environment, FileSystemLoader
+from pain001.xml.load_xml_template import load_bundled_xml_template
 
 
 def create_xml_v3(root, data):
     """
     Constructs an XML tree based on the pain.001.001.03 schema and appends it
-    to the provided root element. This function uses the Jinja2 templating
-    engine to generate the XML content.
+    to the provided root element. This function builds the XML content from
+    the bundled template with the direct XML engine.
 
     Parameters
     ----------
@@ -54,15 +55,10 @@ def create_xml_v3(root, data):
     cstmr_cdt_trf_initn_element = et.Element("CstmrCdtTrfInitn")
     root.append(cstmr_cdt_trf_initn_element)
 
-    # Initialize the Jinja2 environment
-    env = Environment(loader=FileSystemLoader("."), autoescape=True)
+    # Load the pain.001.001.03 template from the template registry
+    template = load_bundled_xml_template("pain.001.001.03", engine="direct")
 
-    # Load the Jinja2 template for the pain.001.001.03 schema
-    template = env.get_template(
-        "pain001/templates/pain.001.001.03/template.xml"
-    )
-
-    # Prepare the data dictionary for rendering through the Jinja2 template
+    # Prepare the data dictionary for building through the XML template
     # This dictionary is a reformatted version of the `data` parameter, made to
     # fit the template's requirements.
     xml_data_pain001_001_03 = {
@@ -110,11 +106,9 @@ def create_xml_v3(root, data):
         ],
     }
 
-    # Render the XML content using the Jinja2 template and the prepared data
-    xml_content = template.render(**xml_data_pain001_001_03)
-
-    # Parse the rendered XML content into an ElementTree object
-    rendered_xml_tree = et.fromstring(xml_content)
+    # Build the XML tree straight from the data, without rendering the
+    # template to a string and parsing it back
+    rendered_xml_tree = template.build(**xml_data_pain001_001_03)
 
     # Append the rendered XML content as children to the "CstmrCdtTrfInitn"
     # element
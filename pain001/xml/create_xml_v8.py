@@ -18,14 +18,15 @@ This module contains the function `create_xml_v8`, which constructs an XML tree
 following the ISO 20022 pain.001.001.08 schema.
 
 The function takes in a root ElementTree element and a list of dictionaries
-containing the required data. It then uses Jinja2 templating to dynamically
-generate the XML content based on the given data. The function ultimately
-returns the root element of the modified XML tree.
+containing the required data. It then builds the XML content from the
+bundled XML template and the given data, straight into ElementTree
+elements. The function ultimately returns the root element of the modified
+XML tree.
 """
 
-# Import ElementTree and Jinja2
+# Import ElementTree and the template registry
 import xml.etree.ElementTree as et
-from jinja2 import Environment, FileSystemLoader
+from pain001.xml.load_xml_template import load_bundled_xml_template
 
 
 def create_xml_v8(root, data):
@@ -44,13 +45,8 @@ def create_xml_v8(root, data):
     cstmr_cdt_trf_initn_element = et.Element("CstmrCdtTrfInitn")
     root.append(cstmr_cdt_trf_initn_element)
 
-    # Create a Jinja2 environment
-    env = Environment(loader=FileSystemLoader("."), autoescape=True)
-
-    # Load pain.001.001.08 template
-    template = env.get_template(
-        "pain001/templates/pain.001.001.08/template.xml"
-    )
+    # Load pain.001.001.08 template from the template registry
+    template = load_bundled_xml_template("pain.001.001.08", engine="direct")
 
     # Prepare data for rendering
     xml_data = {
@@ -96,11 +92,9 @@ def create_xml_v8(root, data):
         "reference_date": data[0]["reference_date"],
     }
 
-    # Render template
-    xml_content = template.render(**xml_data)
-
-    # Parse rendered content
-    rendered_xml = et.fromstring(xml_content)
+    # Build the XML tree straight from the data, without rendering the
+    # template to a string and parsing it back
+    rendered_xml = template.build(**xml_data)
 
     # Append rendered XML children
     for child in rendered_xml:
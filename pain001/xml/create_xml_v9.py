@@ -18,15 +18,16 @@ This module contains the function `create_xml_v9`, which constructs an XML tree
 following the ISO 20022 pain.001.001.09 schema.
 
 The function takes in a root ElementTree element and a list of dictionaries
-containing the required data. It then uses Jinja2 templating to dynamically
-generate the XML content based on the given data. The function ultimately
-returns the root element of the modified XML tree.
+containing the required data. It then builds the XML content from the
+bundled XML template and the given data, straight into ElementTree
+elements. The function ultimately returns the root element of the modified
+XML tree.
 """
 
 # Import the ElementTree package
 import xml.etree.ElementTree as et
 
-from jinja2 import Environment, FileSystemLoader
+from pain001.xml.load_xml_template import load_bundled_xml_template
 
 
 def create_xml_v9(root, data):
@@ -46,13 +47,8 @@ def create_xml_v9(root, data):
     cstmr_cdt_trf_initn_element = et.Element("CstmrCdtTrfInitn")
     root.append(cstmr_cdt_trf_initn_element)
 
-    # Create a Jinja2 environment
-    env = Environment(loader=FileSystemLoader("."), autoescape=True)
-
-    # Load the Jinja2 template
-    template = env.get_template(
-        "pain001/templates/pain.001.001.09/template.xml"
-    )
+    # Load the compiled template from the template registry
+    template = load_bundled_xml_template("pain.001.001.09", engine="direct")
 
     # Prepare the data
     xml_data_pain001_001_09 = {
@@ -88,11 +84,9 @@ def create_xml_v9(root, data):
         ],
     }
 
-    # Render the template
-    xml_content = template.render(**xml_data_pain001_001_09)
-
-    # Parse the rendered XML content and append its children to the root
-    rendered_xml_tree = et.fromstring(xml_content)
+    # Build the XML tree straight from the data, without rendering the
+    # template to a string and parsing it back
+    rendered_xml_tree = template.build(**xml_data_pain001_001_09)
 
     # Append the rendered XML content as children to the "CstmrCdtTrfInitn"
     # element
@@ -0,0 +1,155 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains a process-wide registry of Jinja2 templates.
+
+Jinja2 environments are created once and reused, so each template is only
+compiled once per process and kept in memory afterwards. Compiled templates
+are also written to a bytecode cache on disk, so that later runs do not need
+to compile them again. The bytecode cache lives in `PAIN001_CACHE_DIR` when
+that environment variable is set, and in a private temporary directory
+otherwise.
+
+The templates bundled with pain001 are loaded through a package-relative
+loader, so they are found whatever the current working directory is.
+
+Jinja2 is only imported when the first template is loaded, so that importing
+pain001 stays cheap. Templates can also be compiled for the "direct" engine,
+`pain001.xml.xml_writer.XmlWriter`, which renders the same output without
+Jinja2.
+"""
+
+import os
+
+# The Jinja2 environments, keyed by the directory they load templates from
+_environments = {}
+
+# The bytecode cache shared by all the environments
+_bytecode_cache = None
+
+# The directory of the templates bundled with pain001
+_BUNDLED_TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates"
+)
+
+
+def bundled_templates_dir():
+    """Returns the directory of the templates bundled with pain001.
+
+    Returns:
+        str: The directory holding one subdirectory per message type, with
+        its XML template, XSD schema and sample Data file.
+    """
+    return _BUNDLED_TEMPLATES_DIR
+
+
+def load_xml_template(xml_template_file_path, engine="jinja"):
+    """Returns the compiled Jinja2 template for an XML template file.
+
+    Args:
+        xml_template_file_path (str): Path to the XML template file.
+        engine (str): "jinja", or "direct" to compile the template into an
+            `XmlWriter` instead.
+
+    Returns:
+        jinja2.Template: The compiled template. It is recompiled when the
+        file is modified.
+
+    Raises:
+        jinja2.TemplateNotFound: If the XML template file does not exist.
+        ValueError: If the engine is not supported, or if the template uses
+            syntax that the direct engine does not support.
+    """
+    if engine == "direct":
+        from pain001.xml.xml_writer import load_xml_writer
+
+        return load_xml_writer(xml_template_file_path)
+    if engine != "jinja":
+        raise ValueError(f"Error: Invalid XML engine: '{engine}'.")
+
+    directory, file_name = os.path.split(
+        os.path.abspath(xml_template_file_path)
+    )
+    environment = _environments.get(directory)
+    if environment is None:
+        from jinja2 import FileSystemLoader
+
+        environment = _create_environment(FileSystemLoader(directory))
+        _environments[directory] = environment
+    return environment.get_template(file_name)
+
+
+def load_bundled_xml_template(payment_initiation_message_type, engine="jinja"):
+    """Returns the compiled Jinja2 template bundled for a message type.
+
+    Args:
+        payment_initiation_message_type (str): The message type, for example
+            "pain.001.001.03".
+        engine (str): "jinja", or "direct" to compile the template into an
+            `XmlWriter` instead.
+
+    Returns:
+        jinja2.Template: The compiled `template.xml` shipped in
+        `pain001/templates/<message type>/`.
+
+    Raises:
+        jinja2.TemplateNotFound: If no template is bundled for the message
+            type.
+    """
+    if engine != "jinja":
+        return load_xml_template(
+            os.path.join(
+                _BUNDLED_TEMPLATES_DIR,
+                payment_initiation_message_type,
+                "template.xml",
+            ),
+            engine,
+        )
+
+    environment = _environments.get(None)
+    if environment is None:
+        from jinja2 import PackageLoader
+
+        environment = _create_environment(
+            PackageLoader("pain001", "templates")
+        )
+        _environments[None] = environment
+    return environment.get_template(
+        f"{payment_initiation_message_type}/template.xml"
+    )
+
+
+def _create_environment(loader):
+    """Creates a Jinja2 environment using the shared bytecode cache."""
+    from jinja2 import Environment, FileSystemBytecodeCache
+
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        cache_dir = os.environ.get("PAIN001_CACHE_DIR")
+        try:
+            if cache_dir:
+                cache_dir = os.path.join(cache_dir, "templates")
+                os.makedirs(cache_dir, exist_ok=True)
+            _bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        except (OSError, RuntimeError):
+            # Without a usable cache directory, templates are compiled
+            # in memory only
+            _bytecode_cache = False
+    return Environment(
+        loader=loader,
+        autoescape=True,
+        bytecode_cache=_bytecode_cache or None,
+    )
@@ -0,0 +1,133 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the function `load_xsd_schema`, a process-wide registry
+of compiled XSD schemas.
+
+Compiling a pain.001 XSD schema with `xmlschema` is expensive, so compiled
+schemas are kept in a least-recently-used cache keyed by the path of the XSD
+file and its modification time. Compiled schemas can also be persisted to an
+on-disk cache directory, so that later runs can skip the compilation step
+altogether. The on-disk cache is only used when a cache directory is given,
+either explicitly or through the `PAIN001_CACHE_DIR` environment variable.
+As it stores pickled objects, that directory must only be writable by trusted
+users.
+
+`xmlschema` is only imported when the first schema is compiled, so that
+importing pain001 stays cheap.
+"""
+
+import functools
+import hashlib
+import os
+import pickle  # nosec B403
+import sys
+import tempfile
+
+# The number of compiled schemas kept in memory
+XSD_SCHEMA_CACHE_SIZE = 16
+
+
+def load_xsd_schema(xsd_file_path, cache_dir=None):
+    """Returns the compiled XMLSchema object for an XSD schema file.
+
+    Args:
+        xsd_file_path (str): Path to the XSD schema file.
+        cache_dir (str, optional): Directory in which compiled schemas are
+            persisted between runs. Defaults to the `PAIN001_CACHE_DIR`
+            environment variable; if neither is set, schemas are only cached
+            in memory.
+
+    Returns:
+        xmlschema.XMLSchema: The compiled schema.
+
+    Raises:
+        FileNotFoundError: If the XSD schema file does not exist.
+    """
+    xsd_file_path = os.path.abspath(xsd_file_path)
+    stat = os.stat(xsd_file_path)
+    if cache_dir is None:
+        cache_dir = os.environ.get("PAIN001_CACHE_DIR")
+    return _load_xsd_schema(
+        xsd_file_path, stat.st_mtime_ns, stat.st_size, cache_dir
+    )
+
+
+def clear_xsd_schema_cache():
+    """Empties the in-memory cache of compiled schemas.
+
+    Returns:
+        None
+    """
+    _load_xsd_schema.cache_clear()
+
+
+@functools.lru_cache(maxsize=XSD_SCHEMA_CACHE_SIZE)
+def _load_xsd_schema(xsd_file_path, mtime_ns, size, cache_dir):
+    """Compiles an XSD schema, or loads it from the on-disk cache.
+
+    The modification time and size of the file are part of the cache key, so
+    that an edited schema is compiled again.
+    """
+    import xmlschema
+
+    if not cache_dir:
+        return xmlschema.XMLSchema(xsd_file_path)
+
+    # The key also covers the versions of xmlschema and Python, as pickled
+    # schemas are not portable between them
+    key = "\0".join(
+        [
+            xsd_file_path,
+            str(mtime_ns),
+            str(size),
+            xmlschema.__version__,
+            sys.version,
+        ]
+    )
+    schema_cache_dir = os.path.join(cache_dir, "schemas")
+    cache_file_path = os.path.join(
+        schema_cache_dir,
+        hashlib.sha256(key.encode("utf-8")).hexdigest() + ".pickle",
+    )
+
+    # A missing or unreadable cache entry is simply compiled again
+    try:
+        with open(cache_file_path, "rb") as cache_file:
+            return pickle.load(cache_file)  # nosec B301
+    except Exception:
+        pass
+
+    schema = xmlschema.XMLSchema(xsd_file_path)
+
+    # Write the cache entry atomically, so that concurrent runs never read a
+    # partially written file. Failing to write it is not an error.
+    try:
+        os.makedirs(schema_cache_dir, exist_ok=True)
+        file_descriptor, temporary_file_path = tempfile.mkstemp(
+            dir=schema_cache_dir, suffix=".tmp"
+        )
+    except OSError:
+        return schema
+
+    try:
+        with os.fdopen(file_descriptor, "wb") as cache_file:
+            pickle.dump(schema, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file_path, cache_file_path)
+    except Exception:
+        os.remove(temporary_file_path)
+
+    return schema
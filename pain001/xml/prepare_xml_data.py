@@ -0,0 +1,551 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the function `prepare_xml_data`, which maps the rows of
+a Data file onto the variables expected by the template of each pain.001
+message version.
+
+The mapping of each message version is declared once, in
+`MESSAGE_MAPPINGS`, and compiled the first time it is used. The variables of
+each transaction are read from a row with a single `operator.itemgetter`
+call into a named tuple, whose fields templates read as attributes, so that
+preparing a row costs little more than reading it. The transactions are
+returned lazily so that rows can be rendered one at a time, which keeps
+memory use flat when the rows come from a streaming reader. The same
+mappings serve CSV and SQLite Data files and rows held in memory.
+
+It also contains the function `get_message_columns`, which returns the
+columns of the Data file that a message version actually uses, so that
+loaders can leave the other columns out.
+"""
+
+import collections
+import decimal
+import functools
+import operator
+
+# The template variables of each message version, and the columns of the
+# Data file they are read from. The header variables are read from the first
+# row, and the transaction variables from every row. Each field is either:
+#
+# - "column", for a variable named after a column that must be present,
+# - ("variable", "column"), for a column that must be present,
+# - ("variable", "column", default), for a column that may be missing, in
+#   which case the variable is set to the default.
+MESSAGE_MAPPINGS = {
+    "pain.001.001.03": {
+        "header": (
+            "id",
+            "date",
+            "nb_of_txs",
+            "initiator_name",
+            "initiator_street_name",
+            "initiator_building_number",
+            "initiator_postal_code",
+            "initiator_town_name",
+            "initiator_country_code",
+            "payment_id",
+            "payment_method",
+            "batch_booking",
+            "requested_execution_date",
+            "debtor_name",
+            "debtor_street_name",
+            "debtor_building_number",
+            "debtor_postal_code",
+            "debtor_town_name",
+            "debtor_country_code",
+            "debtor_account_IBAN",
+            "debtor_agent_BIC",
+            "charge_bearer",
+        ),
+        "transaction": (
+            "payment_id",
+            ("payment_amount", "payment_amount", ""),
+            ("payment_currency", "payment_currency", ""),
+            "charge_bearer",
+            "creditor_agent_BIC",
+            "creditor_name",
+            "creditor_street_name",
+            "creditor_building_number",
+            "creditor_postal_code",
+            "creditor_town_name",
+            "creditor_country_code",
+            "creditor_account_IBAN",
+            "purpose_code",
+            "reference_number",
+            "reference_date",
+        ),
+    },
+    "pain.001.001.04": {
+        "header": (
+            ("id", "id", ""),
+            ("date", "date", ""),
+            ("nb_of_txs", "nb_of_txs", ""),
+            ("initiator_name", "initiator_name", ""),
+            ("initiator_street", "initiator_street_name", ""),
+            ("initiator_building_number", "initiator_building_number", ""),
+            ("initiator_postal_code", "initiator_postal_code", ""),
+            ("initiator_town", "initiator_town_name", ""),
+            ("initiator_country", "initiator_country_code", ""),
+            ("payment_information_id", "payment_id", ""),
+            ("payment_method", "payment_method", ""),
+            ("batch_booking", "batch_booking", ""),
+            ("requested_execution_date", "requested_execution_date", ""),
+            ("debtor_name", "debtor_name", ""),
+            ("debtor_street", "debtor_street_name", ""),
+            ("debtor_building_number", "debtor_building_number", ""),
+            ("debtor_postal_code", "debtor_postal_code", ""),
+            ("debtor_town", "debtor_town_name", ""),
+            ("debtor_country", "debtor_country_code", ""),
+            ("debtor_account_IBAN", "debtor_account_IBAN", ""),
+            ("debtor_agent_BIC", "debtor_agent_BIC", ""),
+            ("debtor_agent_account_IBAN", "debtor_agent_account_IBAN", ""),
+            (
+                "instruction_for_debtor_agent",
+                "instruction_for_debtor_agent",
+                "",
+            ),
+            ("charge_bearer", "charge_bearer", ""),
+            ("charge_account_IBAN", "charge_account_IBAN", ""),
+            ("charge_agent_BICFI", "charge_agent_BICFI", ""),
+            ("payment_instruction_id", "payment_instruction_id", ""),
+            ("payment_end_to_end_id", "payment_end_to_end_id", ""),
+            ("payment_currency", "payment_currency", ""),
+            ("payment_amount", "payment_amount", ""),
+            ("creditor_agent_BIC", "creditor_agent_BIC", ""),
+            ("creditor_name", "creditor_name", ""),
+            ("creditor_street", "creditor_street", ""),
+            ("creditor_building_number", "creditor_building_number", ""),
+            ("creditor_postal_code", "creditor_postal_code", ""),
+            ("creditor_town", "creditor_town", ""),
+            ("creditor_account_IBAN", "creditor_account_IBAN", ""),
+            ("purpose_code", "purpose_code", ""),
+            ("reference_number", "reference_number", ""),
+            ("reference_date", "reference_date", ""),
+        ),
+        "transaction": (
+            ("payment_instruction_id", "payment_id", ""),
+            ("payment_end_to_end_id", "reference_number", ""),
+            ("payment_currency", "payment_currency", "EUR"),
+            ("payment_amount", "payment_amount", ""),
+            ("charge_bearer", "charge_bearer", ""),
+            ("creditor_agent_BIC", "creditor_agent_BIC", ""),
+            ("creditor_name", "creditor_name", ""),
+            ("creditor_street", "creditor_street_name", ""),
+            ("creditor_building_number", "creditor_building_number", ""),
+            ("creditor_postal_code", "creditor_postal_code", ""),
+            ("creditor_town", "creditor_town_name", ""),
+            ("creditor_account_IBAN", "creditor_account_IBAN", ""),
+            ("purpose_code", "purpose_code", ""),
+            ("reference_number", "reference_number", ""),
+            ("reference_date", "reference_date", ""),
+        ),
+    },
+    "pain.001.001.05": {
+        "header": (
+            "id",
+            "date",
+            "nb_of_txs",
+            "ctrl_sum",
+            "initiator_name",
+            "initiator_street_name",
+            "initiator_building_number",
+            "initiator_postal_code",
+            ("initiator_town", "initiator_town_name"),
+            "initiator_country",
+            "ultimate_debtor_name",
+            "service_level_code",
+            "requested_execution_date",
+            "payment_information_id",
+            "payment_method",
+            "batch_booking",
+            "debtor_name",
+            "debtor_street",
+            "debtor_building_number",
+            "debtor_postal_code",
+            "debtor_town",
+            "debtor_country",
+            "debtor_account_IBAN",
+            "debtor_agent_BIC",
+            "payment_instruction_id",
+            "payment_end_to_end_id",
+            "payment_currency",
+            "payment_amount",
+            "charge_bearer",
+            "creditor_name",
+            "creditor_street",
+            "creditor_building_number",
+            "creditor_postal_code",
+            "creditor_town",
+            "creditor_country",
+            "creditor_account_IBAN",
+            "creditor_agent_BICFI",
+            "purpose_code",
+            "reference_number",
+            "reference_date",
+        ),
+    },
+    "pain.001.001.06": {
+        "header": (
+            "id",
+            "date",
+            "nb_of_txs",
+            "ctrl_sum",
+            "initiator_name",
+            "initiator_street_name",
+            "initiator_building_number",
+            "initiator_postal_code",
+            "initiator_town",
+            "initiator_country",
+            "payment_information_id",
+            "payment_method",
+            "batch_booking",
+            "requested_execution_date",
+            "debtor_name",
+            "debtor_street",
+            "debtor_building_number",
+            "debtor_postal_code",
+            "debtor_town",
+            "debtor_country",
+            "debtor_account_IBAN",
+            "debtor_agent_BIC",
+            "payment_instruction_id",
+            "payment_end_to_end_id",
+            "payment_currency",
+            "payment_amount",
+            "charge_bearer",
+            "creditor_name",
+            "creditor_street",
+            "creditor_building_number",
+            "creditor_postal_code",
+            "creditor_town",
+            "creditor_country",
+            "creditor_account_IBAN",
+            "creditor_agent_BICFI",
+            "purpose_code",
+            "reference_number",
+            "reference_date",
+        ),
+        "transaction": (
+            "payment_id",
+            "payment_amount",
+            ("payment_currency", "payment_currency", ""),
+            "charge_bearer",
+            "creditor_agent_BIC",
+            "creditor_name",
+            "creditor_account_IBAN",
+            ("creditor_remittance_information", "remittance_information"),
+        ),
+    },
+    "pain.001.001.07": {
+        "header": (
+            "id",
+            "date",
+            "nb_of_txs",
+            "ctrl_sum",
+            "initiator_name",
+            "initiator_street_name",
+            "initiator_building_number",
+            "initiator_postal_code",
+            "initiator_town",
+            "initiator_country",
+            "payment_information_id",
+            "payment_method",
+            "batch_booking",
+            "requested_execution_date",
+            "debtor_name",
+            "debtor_street",
+            "debtor_building_number",
+            "debtor_postal_code",
+            "debtor_town",
+            "debtor_country",
+            "debtor_account_IBAN",
+            "debtor_agent_BIC",
+            "payment_instruction_id",
+            "payment_end_to_end_id",
+            "payment_currency",
+            "payment_amount",
+            "charge_bearer",
+            "creditor_name",
+            "creditor_street",
+            "creditor_building_number",
+            "creditor_postal_code",
+            "creditor_town",
+            "creditor_country",
+            "creditor_account_IBAN",
+            "creditor_agent_BICFI",
+            "purpose_code",
+            "reference_number",
+            "reference_date",
+        ),
+        "transaction": (
+            "payment_id",
+            "payment_amount",
+            ("payment_currency", "payment_currency", ""),
+            "charge_bearer",
+            "creditor_agent_BIC",
+            "creditor_name",
+            "creditor_account_IBAN",
+            ("creditor_remittance_information", "remittance_information"),
+        ),
+    },
+    "pain.001.001.08": {
+        "header": (
+            "id",
+            "date",
+            "nb_of_txs",
+            "ctrl_sum",
+            "initiator_name",
+            "initiator_street_name",
+            "initiator_building_number",
+            "initiator_postal_code",
+            "initiator_town",
+            "initiator_country",
+            "payment_information_id",
+            "payment_method",
+            "batch_booking",
+            "requested_execution_date",
+            "debtor_name",
+            "debtor_street",
+            "debtor_building_number",
+            "debtor_postal_code",
+            "debtor_town",
+            "debtor_country",
+            "debtor_account_IBAN",
+            "debtor_agent_BIC",
+            "payment_instruction_id",
+            "payment_end_to_end_id",
+            "payment_currency",
+            "payment_amount",
+            "charge_bearer",
+            "creditor_name",
+            "creditor_street",
+            "creditor_building_number",
+            "creditor_postal_code",
+            "creditor_town",
+            "creditor_country",
+            "creditor_account_IBAN",
+            "creditor_agent_BICFI",
+            "purpose_code",
+            "reference_number",
+            "reference_date",
+        ),
+        "transaction": (
+            "payment_id",
+            "payment_amount",
+            ("payment_currency", "payment_currency", ""),
+            "charge_bearer",
+            "creditor_agent_BIC",
+            "creditor_name",
+            "creditor_account_IBAN",
+            ("creditor_remittance_information", "remittance_information"),
+        ),
+    },
+    "pain.001.001.09": {
+        "header": (
+            "id",
+            "date",
+            "nb_of_txs",
+            "initiator_name",
+            "payment_id",
+            "payment_method",
+            ("payment_nb_of_txs", "nb_of_txs"),
+            "requested_execution_date",
+            "debtor_name",
+            "debtor_account_IBAN",
+            "debtor_agent_BIC",
+            "charge_bearer",
+        ),
+        "transaction": (
+            "payment_id",
+            "payment_amount",
+            ("payment_currency", "payment_currency", ""),
+            "charge_bearer",
+            "creditor_agent_BIC",
+            "creditor_name",
+            "creditor_account_IBAN",
+            ("creditor_remittance_information", "remittance_information"),
+        ),
+    },
+}
+
+
+def prepare_xml_data(header, rows, payment_initiation_message_type):
+    """Prepares the template variables for a pain.001 message.
+
+    Args:
+        header (dict): The row holding the group header and payment
+            information values, usually the first row of the Data file.
+        rows (iterable of dict): All the rows of the Data file, including the
+            header row. It is consumed lazily while the template is rendered.
+        payment_initiation_message_type (str): The message type, for example
+            "pain.001.001.03".
+
+    Returns:
+        dict: The variables to pass to the template. The `transactions`
+        variable, if the message type has one, is an iterator of named
+        tuples, which also provide the `get` method of dictionaries.
+
+    Raises:
+        ValueError: If the message type is not supported.
+        KeyError: If a row has not got a column that must be present.
+    """
+    header_fields, read_transaction = _compile_mapping(
+        payment_initiation_message_type
+    )
+    xml_data = _read_fields(header, header_fields)
+    if read_transaction is not None:
+        xml_data["transactions"] = map(read_transaction, rows)
+    return xml_data
+
+
+@functools.lru_cache(maxsize=None)
+def get_message_columns(payment_initiation_message_type):
+    """Returns the columns of the Data file used by a message type.
+
+    Args:
+        payment_initiation_message_type (str): The message type, for example
+            "pain.001.001.03".
+
+    Returns:
+        tuple: The column names, in the order in which they are first used.
+
+    Raises:
+        ValueError: If the message type is not supported.
+    """
+    header_fields, read_transaction = _compile_mapping(
+        payment_initiation_message_type
+    )
+    fields = header_fields
+    if read_transaction is not None:
+        fields += read_transaction.fields
+    return tuple(dict.fromkeys(column for _, column, _, _ in fields))
+
+
+def get_payment_amount(row):
+    """Returns the payment amount of a row as a Decimal.
+
+    Args:
+        row (dict): A row of the Data file.
+
+    Returns:
+        decimal.Decimal: The value of its `payment_amount` column, or 0 if it
+        is empty.
+
+    Raises:
+        ValueError: If the payment amount is not a number.
+    """
+    try:
+        return decimal.Decimal(str(row.get("payment_amount") or 0))
+    except decimal.InvalidOperation:
+        # Name the payment only, the row holds account details
+        payment_id = row.get("payment_id") or row.get("id")
+        raise ValueError(
+            f"Error: Invalid payment amount for payment '{payment_id}'."
+        ) from None
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_mapping(payment_initiation_message_type):
+    """Compiles the mapping of a message type.
+
+    Returns the header fields, as `(variable, column, required, default)`
+    tuples, and the function reading the transaction of a row, or None if
+    the message type has no transactions.
+    """
+    mapping = MESSAGE_MAPPINGS.get(payment_initiation_message_type)
+    if mapping is None:
+        raise ValueError(
+            "Error: Invalid XML message type: "
+            f"'{payment_initiation_message_type}'."
+        )
+
+    header_fields = tuple(map(_parse_field, mapping["header"]))
+    read_transaction = None
+    if "transaction" in mapping:
+        read_transaction = _compile_transaction(
+            tuple(map(_parse_field, mapping["transaction"]))
+        )
+    return header_fields, read_transaction
+
+
+def _parse_field(field):
+    """Returns a field as a `(variable, column, required, default)` tuple."""
+    if isinstance(field, str):
+        return field, field, True, None
+    if len(field) == 2:
+        return field[0], field[1], True, None
+    return field[0], field[1], False, field[2]
+
+
+def _read_fields(row, fields):
+    """Returns the variables of fields, read one by one from a row."""
+    return {
+        variable: row[column] if required else row.get(column, default)
+        for variable, column, required, default in fields
+    }
+
+
+def _compile_transaction(fields):
+    """Returns a function reading the transaction variables of a row.
+
+    The function reads every column at once with `operator.itemgetter`. When
+    a row has not got one of the optional columns, their defaults are merged
+    into a copy of the row first.
+    """
+    transaction_type = _make_transaction_type(
+        [variable for variable, _, _, _ in fields]
+    )
+    columns = [column for _, column, _, _ in fields]
+    defaults = {
+        column: default
+        for _, column, required, default in fields
+        if not required
+    }
+    read_columns = operator.itemgetter(*columns)
+    if len(columns) == 1:
+        read_column = read_columns
+
+        def read_columns(row):
+            return (read_column(row),)
+
+    new = tuple.__new__
+
+    def read_transaction(row):
+        try:
+            values = read_columns(row)
+        except KeyError:
+            # A required column is missing if the KeyError is raised again
+            values = read_columns({**defaults, **row})
+        return new(transaction_type, values)
+
+    read_transaction.fields = fields
+    return read_transaction
+
+
+def _make_transaction_type(variables):
+    """Returns a named tuple type holding the variables of a transaction."""
+    positions = {variable: index for index, variable in enumerate(variables)}
+
+    class Transaction(collections.namedtuple("Transaction", variables)):
+        __slots__ = ()
+
+        def get(self, variable, default=None):
+            """Returns the value of a variable, like `dict.get`."""
+            index = positions.get(variable)
+            return default if index is None else self[index]
+
+    return Transaction
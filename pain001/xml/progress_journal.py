@@ -0,0 +1,264 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the class `ProgressJournal`, which records the progress
+of an XML file being streamed, so that its generation can be resumed after a
+crash.
+
+Every `CHECKPOINT_ROWS` rows, the partial XML file is flushed to disk and a
+checkpoint is written to a journal next to it: the number of rows consumed,
+the number of bytes of XML content written for them, and the running control
+sum of their payment amounts. Checkpoints are only taken between two
+transactions, so that the content up to a checkpoint is always a whole
+prefix of the XML file.
+"""
+
+import decimal
+import json
+import os
+
+from pain001.xml.prepare_xml_data import get_payment_amount
+
+# The number of rows between two checkpoints
+CHECKPOINT_ROWS = 10000
+
+# The version of the journal format
+JOURNAL_VERSION = 1
+
+
+class ProgressJournal:
+    """Records the progress of an XML file being streamed.
+
+    Attributes:
+        journal_file_path (str): The path of the journal.
+        rows (int): The number of rows consumed so far.
+        bytes (int): The number of bytes of XML content produced so far.
+        control_sum (Decimal): The total payment amount of the rows
+            consumed so far.
+        prefix_bytes (int): The number of bytes of the group header and of
+            the first transaction, or None until they have been produced.
+        checkpoint (dict): The checkpoint to resume from, or None.
+
+    Methods:
+        __init__(self, partial_xml_file_path,
+            payment_initiation_message_type): Initializes the journal.
+        load(self): Reads the checkpoint to resume from.
+        open(self): Opens the partial XML file for writing.
+        write(self, data): Writes a chunk of XML content.
+        close(self): Checks that the content up to the checkpoint was
+            produced again.
+        track(self, rows): Yields rows, taking checkpoints between them.
+        remove(self): Removes the journal.
+    """
+
+    def __init__(self, partial_xml_file_path, payment_initiation_message_type):
+        """Initializes the journal.
+
+        Args:
+            partial_xml_file_path (str): The path of the partial XML file.
+                The journal is written next to it.
+            payment_initiation_message_type (str): The message type, for
+                example "pain.001.001.03".
+        """
+        self.journal_file_path = partial_xml_file_path + ".journal"
+        self.partial_xml_file_path = partial_xml_file_path
+        self.payment_initiation_message_type = payment_initiation_message_type
+        self.checkpoint_rows = CHECKPOINT_ROWS
+        self.rows = 0
+        self.bytes = 0
+        self.control_sum = decimal.Decimal(0)
+        self.prefix_bytes = None
+        self.checkpoint = None
+        self.xml_file = None
+
+    def load(self):
+        """Reads the checkpoint to resume from, if there is one.
+
+        Returns:
+            dict: The last checkpoint, or None if no journal was written, in
+            which case the XML file is generated from the start.
+
+        Raises:
+            ValueError: If the journal cannot be read, does not belong to
+                the message type, or records more content than the partial
+                XML file holds.
+        """
+        try:
+            with open(self.journal_file_path, encoding="utf-8") as f:
+                journal = json.load(f)
+            if journal["version"] != JOURNAL_VERSION:
+                raise ValueError(journal["version"])
+            checkpoint = {
+                "message_type": journal["message_type"],
+                "rows": int(journal["rows"]),
+                "bytes": int(journal["bytes"]),
+                "prefix_bytes": int(journal["prefix_bytes"]),
+                "control_sum": decimal.Decimal(journal["control_sum"]),
+            }
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, ArithmeticError):
+            raise ValueError(
+                f"Error: Invalid progress journal '{self.journal_file_path}'."
+            ) from None
+
+        message_type = self.payment_initiation_message_type
+        if checkpoint["message_type"] != message_type:
+            raise ValueError(
+                f"Error: The progress journal '{self.journal_file_path}' "
+                f"was not written for '{message_type}'."
+            )
+        try:
+            size = os.path.getsize(self.partial_xml_file_path)
+        except OSError:
+            size = -1
+        if size < checkpoint["bytes"]:
+            raise ValueError(
+                f"Error: The partial XML file '{self.partial_xml_file_path}' "
+                "is shorter than its progress journal records."
+            )
+        self.checkpoint = checkpoint
+        return checkpoint
+
+    def open(self):
+        """Opens the partial XML file for writing.
+
+        Returns:
+            file: The partial XML file, opened in binary mode. When resuming,
+            the content written after the checkpoint is truncated.
+        """
+        if self.checkpoint is None:
+            self.xml_file = open(self.partial_xml_file_path, "wb")
+        else:
+            self.xml_file = open(self.partial_xml_file_path, "r+b")
+            self.xml_file.truncate(self.checkpoint["bytes"])
+        return self.xml_file
+
+    def write(self, data):
+        """Writes a chunk of XML content to the partial XML file.
+
+        When resuming, the content up to the checkpoint is compared with the
+        partial XML file instead of being written again.
+
+        Args:
+            data (bytes): The next chunk of XML content.
+
+        Returns:
+            bytes: The content to validate: the new content, and of the
+            content up to the checkpoint only the group header and the first
+            transaction, which the XSD validation of the whole document
+            needs.
+
+        Raises:
+            ValueError: If the content up to the checkpoint differs from the
+                one written before.
+        """
+        offset = self.bytes
+        self.bytes += len(data)
+        checkpoint = self.checkpoint
+        if checkpoint is None or offset >= checkpoint["bytes"]:
+            self.xml_file.write(data)
+            return data
+
+        size = min(len(data), checkpoint["bytes"] - offset)
+        if self.xml_file.read(size) != data[:size]:
+            raise self._changed_error()
+        prefix = data[: max(0, checkpoint["prefix_bytes"] - offset)]
+        if size == len(data):
+            return prefix[:size]
+        self.xml_file.seek(checkpoint["bytes"])
+        self.xml_file.write(data[size:])
+        return prefix[:size] + data[size:]
+
+    def close(self):
+        """Checks that the content up to the checkpoint was produced again.
+
+        Raises:
+            ValueError: If the XML content ends before the checkpoint.
+        """
+        if self.checkpoint is not None and (
+            self.bytes < self.checkpoint["bytes"]
+        ):
+            raise self._changed_error()
+
+    def track(self, rows):
+        """Yields rows, taking a checkpoint every `checkpoint_rows` rows.
+
+        A checkpoint is taken when the next row is read, once all the XML
+        content of the previous rows has been written.
+
+        Args:
+            rows (iterable of dict): The rows being rendered.
+
+        Yields:
+            dict: The rows.
+
+        Raises:
+            ValueError: If, when resuming, the rows up to the checkpoint
+                differ from the ones recorded, or a payment amount is not a
+                number.
+        """
+        for row in rows:
+            if self.rows == 1:
+                self.prefix_bytes = self.bytes
+            if self.rows and not self.rows % self.checkpoint_rows:
+                self._checkpoint()
+            yield row
+            self.rows += 1
+            self.control_sum += get_payment_amount(row)
+
+    def remove(self):
+        """Removes the journal, once the XML file is complete."""
+        if os.path.exists(self.journal_file_path):
+            os.remove(self.journal_file_path)
+
+    def _checkpoint(self):
+        """Writes a checkpoint, or checks the one being resumed from."""
+        checkpoint = self.checkpoint
+        if checkpoint is not None and self.rows <= checkpoint["rows"]:
+            if self.rows == checkpoint["rows"] and (
+                self.bytes != checkpoint["bytes"]
+                or self.control_sum != checkpoint["control_sum"]
+            ):
+                raise self._changed_error()
+            return
+
+        # The content is on disk before the checkpoint recording it
+        self.xml_file.flush()
+        os.fsync(self.xml_file.fileno())
+        temporary_file_path = self.journal_file_path + ".tmp"
+        with open(temporary_file_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": JOURNAL_VERSION,
+                    "message_type": self.payment_initiation_message_type,
+                    "rows": self.rows,
+                    "bytes": self.bytes,
+                    "prefix_bytes": self.prefix_bytes,
+                    "control_sum": str(self.control_sum),
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_file_path, self.journal_file_path)
+
+    def _changed_error(self):
+        """Returns the error raised when the content to resume differs."""
+        return ValueError(
+            "Error: The Data file or the XML template has changed since the "
+            f"progress journal '{self.journal_file_path}' was written."
+        )
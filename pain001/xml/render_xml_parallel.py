@@ -0,0 +1,114 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the function `render_xml_parallel`, which renders a
+single pain.001 message with a pool of worker processes.
+
+The transactions are split into chunks of consecutive rows. Each chunk is
+rendered by a worker process with the direct XML writer, its loop index
+starting after the rows preceding it, while the group header and the end of
+the message are rendered by the main process. The parts are put back
+together in their original order, so that the message is the same as when
+it is rendered at once.
+
+The rows are set up once per worker process by the initializer of the pool,
+along with the compiled writer, so that each task only carries the range of
+rows it renders. With the fork start method the workers inherit the rows;
+with spawn or forkserver they are pickled once per worker, not per task.
+"""
+
+import concurrent.futures
+import os
+
+from pain001.xml.prepare_xml_data import prepare_xml_data
+from pain001.xml.xml_writer import load_xml_writer
+
+# The fewest rows rendered by a task
+MIN_CHUNK_ROWS = 1000
+
+# The number of tasks per worker process, to even out their load
+TASKS_PER_JOB = 4
+
+# The message type, direct XML writer and rows used by the current worker
+_worker_settings = None
+
+
+def render_xml_parallel(
+    data, payment_initiation_message_type, xml_file_path, jobs=None
+):
+    """Renders the XML template of a message with a pool of processes.
+
+    Args:
+        data (list of dict): The rows of the Data file.
+        payment_initiation_message_type (str): The message type, for example
+            "pain.001.001.03".
+        xml_file_path (str): The path of the XML template file.
+        jobs (int, optional): The number of worker processes. Defaults to
+            the number of CPUs.
+
+    Returns:
+        list of str: The parts of the XML document, in order. None if the
+        message would not be rendered faster in parallel, or if its
+        template has not got a single loop over the transactions that the
+        direct XML writer supports, in which case the caller renders the
+        template at once.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(data) < 2 * MIN_CHUNK_ROWS:
+        return None
+    try:
+        writer = load_xml_writer(xml_file_path)
+    except ValueError:
+        return None
+    if writer.loop_variable != "transactions":
+        return None
+
+    xml_data = prepare_xml_data(data[0], (), payment_initiation_message_type)
+    head, tail = writer.render_around_loop(**xml_data)
+
+    chunk_rows = max(MIN_CHUNK_ROWS, -(-len(data) // (jobs * TASKS_PER_JOB)))
+    starts = range(0, len(data), chunk_rows)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(starts)),
+        initializer=_init_worker,
+        initargs=(payment_initiation_message_type, xml_file_path, data),
+    ) as executor:
+        fragments = executor.map(
+            _render_chunk,
+            starts,
+            [min(start + chunk_rows, len(data)) for start in starts],
+        )
+        return [head, *fragments, tail]
+
+
+def _init_worker(payment_initiation_message_type, xml_file_path, data):
+    """Compiles the XML template once per worker and keeps the rows."""
+    global _worker_settings
+    _worker_settings = (
+        payment_initiation_message_type,
+        load_xml_writer(xml_file_path),
+        data,
+    )
+
+
+def _render_chunk(start, end):
+    """Renders the transactions of the rows from `start` to `end`."""
+    payment_initiation_message_type, writer, data = _worker_settings
+    xml_data = prepare_xml_data(
+        data[0], data[start:end], payment_initiation_message_type
+    )
+    transactions = xml_data.pop("transactions")
+    return writer.render_loop(transactions, start, **xml_data)
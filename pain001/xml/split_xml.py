@@ -0,0 +1,317 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the function `split_xml`, which spreads the rows of a
+Data file over several pain.001 messages so that none of them exceeds a
+maximum number of transactions, an estimated size in bytes or a total
+amount.
+
+Each message gets its own group header: `NbOfTxs` and `CtrlSum` are computed
+from the rows of the message and the `MsgId` of the Data file is suffixed
+with the number of the message (`<MsgId>-1`, `<MsgId>-2`, ...). The messages
+are written next to each other as `<name>-1.xml`, `<name>-2.xml`, ... and are
+rendered and validated in parallel by a pool of worker processes.
+"""
+
+import concurrent.futures
+import decimal
+import os
+
+from pain001.xml.generate_updated_xml_file_path import (
+    generate_updated_xml_file_path,
+)
+from pain001.xml.generate_xml import generate_xml
+from pain001.xml.load_xml_template import load_xml_template
+from pain001.xml.load_xsd_schema import load_xsd_schema
+from pain001.xml.prepare_xml_data import (
+    get_payment_amount,
+    prepare_xml_data,
+)
+from pain001.xml.register_namespaces import register_namespaces
+
+# The maximum length of a MsgId, an ISO 20022 Max35Text
+MAX_MESSAGE_ID_LENGTH = 35
+
+# The message type, XML template, XSD schema and engine used by the current
+# worker
+_worker_settings = None
+
+
+def split_xml(
+    data,
+    payment_initiation_message_type,
+    xml_file_path,
+    xsd_file_path,
+    max_txs=None,
+    max_bytes=None,
+    max_amount=None,
+    output_file_path=None,
+    jobs=None,
+    engine="jinja",
+):
+    """Generates several ISO 20022 pain.001 XML files from input data.
+
+    Args:
+        data: List of dictionaries containing payment data
+        payment_initiation_message_type: String indicating message type
+        such as "pain.001.001.03".
+        xml_file_path: Path to the XML template file.
+        xsd_file_path: Path to XML schema file for validation
+        max_txs (int, optional): Maximum number of transactions per message.
+        max_bytes (int, optional): Maximum estimated size of a message, in
+        bytes.
+        max_amount (str or Decimal, optional): Maximum total amount of the
+        transactions of a message.
+        output_file_path: Path from which the names of the generated XML
+        files are derived. Defaults to a file named after the message type
+        next to the XML template file.
+        jobs (int, optional): Number of worker processes. Defaults to the
+        number of CPUs. With a single job, the messages are generated in the
+        current process.
+        engine: "jinja" to render the XML template with Jinja2, or "direct"
+        to write it with the direct XML writer.
+
+    Returns:
+        list: The paths of the generated XML files, in order.
+
+    Raises:
+        ValueError: If the data cannot be split within the limits, or a
+        suffixed message id exceeds the 35 characters of a MsgId.
+    """
+    if not data:
+        raise ValueError("Error: No data to process.")
+
+    # Estimate the size of a message from the template itself
+    template = load_xml_template(xml_file_path, engine)
+    base_size, tx_size = _measure_template(
+        template, data[0], payment_initiation_message_type
+    )
+
+    chunks = split_rows(
+        data,
+        max_txs=max_txs,
+        max_bytes=max_bytes,
+        max_amount=max_amount,
+        base_size=base_size,
+        tx_size=tx_size,
+    )
+
+    if output_file_path is None:
+        output_file_path = generate_updated_xml_file_path(
+            xml_file_path, payment_initiation_message_type
+        )
+    root, extension = os.path.splitext(output_file_path)
+
+    settings = (
+        payment_initiation_message_type,
+        xml_file_path,
+        xsd_file_path,
+        engine,
+    )
+    tasks = [
+        (
+            _with_group_header(chunk, data[0]["id"], number),
+            f"{root}-{number}{extension}",
+        )
+        for number, chunk in enumerate(chunks, start=1)
+    ]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+
+    try:
+        if jobs <= 1:
+            _init_worker(*settings)
+            for task in tasks:
+                _generate_chunk(*task)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_worker, initargs=settings
+            ) as executor:
+                futures = [
+                    executor.submit(_generate_chunk, *task) for task in tasks
+                ]
+                for future in futures:
+                    future.result()
+    except BaseException:
+        # Do not leave part of a payment run behind
+        for _, chunk_file_path in tasks:
+            if os.path.exists(chunk_file_path):
+                os.remove(chunk_file_path)
+        raise
+
+    return [chunk_file_path for _, chunk_file_path in tasks]
+
+
+def split_rows(
+    rows,
+    max_txs=None,
+    max_bytes=None,
+    max_amount=None,
+    base_size=0,
+    tx_size=0,
+):
+    """Partitions rows into consecutive chunks within the given limits.
+
+    Args:
+        rows (list of dict): The rows of the Data file.
+        max_txs (int, optional): Maximum number of rows per chunk.
+        max_bytes (int, optional): Maximum estimated size of a chunk.
+        max_amount (str or Decimal, optional): Maximum total of the
+            `payment_amount` column per chunk.
+        base_size (int): Estimated size of a message without transactions.
+        tx_size (int): Estimated markup size of one transaction, excluding
+            the values of its row.
+
+    Returns:
+        list: The chunks, each a non-empty list of rows.
+
+    Raises:
+        ValueError: If a single row does not fit within the limits.
+    """
+    if max_amount is not None:
+        try:
+            max_amount = decimal.Decimal(str(max_amount))
+        except decimal.InvalidOperation:
+            raise ValueError(
+                f"Error: Invalid maximum amount: '{max_amount}'."
+            ) from None
+
+    chunks = []
+    chunk = []
+    chunk_size = base_size
+    chunk_amount = decimal.Decimal(0)
+    for row in rows:
+        row_size = tx_size + _values_size(row)
+        row_amount = get_payment_amount(row)
+
+        if max_bytes is not None and base_size + row_size > max_bytes:
+            raise ValueError(
+                f"Error: Transaction '{row.get('payment_id')}' does not fit "
+                f"in a message of {max_bytes} bytes."
+            )
+        if max_amount is not None and row_amount > max_amount:
+            raise ValueError(
+                f"Error: Transaction '{row.get('payment_id')}' exceeds the "
+                f"maximum amount of {max_amount} per message."
+            )
+
+        if chunk and (
+            (max_txs is not None and len(chunk) >= max_txs)
+            or (max_bytes is not None and chunk_size + row_size > max_bytes)
+            or (
+                max_amount is not None
+                and chunk_amount + row_amount > max_amount
+            )
+        ):
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = base_size
+            chunk_amount = decimal.Decimal(0)
+
+        chunk.append(row)
+        chunk_size += row_size
+        chunk_amount += row_amount
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _values_size(row):
+    """Returns the size of the values of a row once encoded."""
+    return sum(len(str(value).encode()) for value in row.values() if value)
+
+
+def _measure_template(template, row, payment_initiation_message_type):
+    """Returns the size of a message without transactions and the markup size
+    of one transaction, by rendering the template with one and two rows.
+
+    Raises:
+        ValueError: If the template does not render one block per row, in
+            which case the rows cannot be spread over several messages.
+    """
+    sizes = [
+        len(
+            template.render(
+                **prepare_xml_data(
+                    row, [row] * count, payment_initiation_message_type
+                )
+            ).encode()
+        )
+        for count in (1, 2)
+    ]
+    row_size = sizes[1] - sizes[0]
+    if row_size <= 0:
+        raise ValueError(
+            "Error: The XML template does not render every transaction, so "
+            "the data cannot be split into several messages."
+        )
+    return sizes[0] - row_size, row_size - _values_size(row)
+
+
+def _with_group_header(chunk, message_id, number):
+    """Returns the rows of a chunk, the first row holding the group header
+    values of the chunk."""
+    ctrl_sum = sum(
+        (get_payment_amount(row) for row in chunk), decimal.Decimal(0)
+    )
+    chunk_message_id = f"{message_id}-{number}"
+    if len(chunk_message_id) > MAX_MESSAGE_ID_LENGTH:
+        raise ValueError(
+            f"Error: The message id '{chunk_message_id}' of message {number} "
+            f"exceeds the {MAX_MESSAGE_ID_LENGTH} characters of a Max35Text; "
+            "shorten the id of the Data file."
+        )
+    header = dict(
+        chunk[0],
+        id=chunk_message_id,
+        nb_of_txs=str(len(chunk)),
+        ctrl_sum=str(ctrl_sum),
+    )
+    return [header] + chunk[1:]
+
+
+def _init_worker(
+    payment_initiation_message_type, xml_file_path, xsd_file_path, engine
+):
+    """Compiles the XML template and the XSD schema once per worker."""
+    global _worker_settings
+    load_xml_template(xml_file_path, engine)
+    load_xsd_schema(xsd_file_path)
+    register_namespaces(payment_initiation_message_type)
+    _worker_settings = (
+        payment_initiation_message_type,
+        xml_file_path,
+        xsd_file_path,
+        engine,
+    )
+
+
+def _generate_chunk(rows, chunk_file_path):
+    """Generates and validates the XML file of one chunk."""
+    (
+        payment_initiation_message_type,
+        xml_file_path,
+        xsd_file_path,
+        engine,
+    ) = _worker_settings
+    generate_xml(
+        rows,
+        payment_initiation_message_type,
+        xml_file_path,
+        xsd_file_path,
+        chunk_file_path,
+        engine,
+    )
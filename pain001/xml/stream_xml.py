@@ -0,0 +1,321 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains the function `stream_xml`, the constant-memory
+counterpart of `generate_xml`.
+
+Rows are pulled one at a time from an iterator, rendered through
+`jinja2.Template.stream` and written straight to the output file, so that the
+whole Data file never has to be held in memory. Each rendered chunk is also
+fed to an `XsdStreamValidator`, so the output is validated as it is produced
+rather than read back from disk. It is written to a temporary `.part` file
+and is only moved into place once it has been found valid.
+
+In resumable mode, the progress is recorded in a `ProgressJournal` next to
+the `.part` file, which is kept if generation fails. Generation is then
+resumed from the last checkpoint: the rows up to it are rendered again and
+compared with the `.part` file rather than being written and validated
+again.
+
+When the group header totals are computed from the rows, the transactions
+are rendered in batches with the direct XML writer to a temporary `.body`
+file while the rows are counted and their amounts added up. The group header
+is then rendered with these totals, and the message is put together and
+validated in the `.part` file. This needs a template that renders every
+transaction in a loop, as splitting does.
+"""
+
+import decimal
+import itertools
+import os
+import sys
+
+from pain001.context.context import Context
+from pain001.xml.generate_updated_xml_file_path import (
+    generate_updated_xml_file_path,
+)
+from pain001.xml.load_xml_template import load_xml_template
+from pain001.xml.prepare_xml_data import (
+    get_payment_amount,
+    prepare_xml_data,
+)
+from pain001.xml.progress_journal import ProgressJournal
+from pain001.xml.xml_writer import load_xml_writer
+from pain001.xml.xsd_stream_validator import XsdStreamValidator
+
+# The number of rows whose transactions are rendered at once when the group
+# header totals are computed from the rows
+TOTALS_BATCH_ROWS = 1000
+
+# The size of the blocks in which the rendered transactions are read back
+_BLOCK_SIZE = 1024 * 1024
+
+
+def stream_xml(
+    rows,
+    payment_initiation_message_type,
+    xml_file_path,
+    xsd_file_path,
+    output_file_path=None,
+    engine="jinja",
+    resume=False,
+    compute_totals=False,
+):
+    """Generates an ISO 20022 pain.001 XML file from a stream of rows.
+
+    Args:
+        rows: An iterable of dictionaries containing payment data. It is
+        consumed lazily, one row at a time.
+        payment_initiation_message_type: String indicating message type
+        such as "pain.001.001.03".
+        xml_file_path: Path to the XML template file. The generated file is
+        written next to it.
+        xsd_file_path: Path to XML schema file for validation
+        output_file_path: Path of the generated XML file. Defaults to a file
+        named after the message type next to the XML template file.
+        engine: "jinja" to render the XML template with Jinja2, or "direct"
+        to write it with the direct XML writer.
+        resume: If True, the progress is recorded in a journal so that a
+        failed generation can be resumed, and generation is resumed from
+        the journal left by a previous run, if there is one.
+        compute_totals: If True, the number of transactions and control sum
+        of the group header are those of the rows streamed rather than the
+        values of the first row. The template must then render the
+        transactions in a single loop supported by the direct XML writer,
+        which renders it whatever the engine, and the generation cannot be
+        resumed.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the totals are computed in resumable mode, or with a
+        template that does not render every transaction in a single loop
+        that the direct XML writer supports.
+    """
+    if compute_totals:
+        if resume:
+            raise ValueError(
+                "Error: The group header totals cannot be computed in "
+                "resumable mode."
+            )
+        _stream_with_totals(
+            rows,
+            payment_initiation_message_type,
+            xml_file_path,
+            xsd_file_path,
+            output_file_path,
+        )
+        return
+
+    rows = iter(rows)
+    header = _first_row(rows)
+
+    # Load the compiled template from the template registry
+    template = load_xml_template(xml_file_path, engine)
+
+    # Generate updated XML file path
+    updated_xml_file_path, partial_xml_file_path = _get_output_paths(
+        xml_file_path, payment_initiation_message_type, output_file_path
+    )
+
+    # Put the header row back in front of the remaining rows
+    rows = itertools.chain([header], rows)
+    journal = None
+    if resume:
+        journal = ProgressJournal(
+            partial_xml_file_path, payment_initiation_message_type
+        )
+        if journal.load() is not None:
+            print(
+                f"Resuming `{updated_xml_file_path}` after "
+                f"{journal.checkpoint['rows']} rows"
+            )
+        rows = journal.track(rows)
+
+    # Prepare the data for rendering
+    xml_data = prepare_xml_data(header, rows, payment_initiation_message_type)
+
+    # Render the template chunk by chunk straight into the output file,
+    # validating each chunk against the XSD schema on the way
+    validator = XsdStreamValidator(xsd_file_path)
+    try:
+        if journal is None:
+            with open(partial_xml_file_path, "w") as xml_file:
+                for chunk in template.stream(**xml_data):
+                    xml_file.write(chunk)
+                    validator.feed(chunk)
+                    if not validator.is_valid:
+                        break
+        else:
+            with journal.open():
+                for chunk in template.stream(**xml_data):
+                    validator.feed(journal.write(chunk.encode("utf-8")))
+                    if not validator.is_valid:
+                        break
+                if validator.is_valid:
+                    journal.close()
+        is_valid = validator.close()
+    except BaseException:
+        # The partial file of a resumable run is kept for the next one
+        if journal is None and os.path.exists(partial_xml_file_path):
+            os.remove(partial_xml_file_path)
+        raise
+
+    _finish(
+        is_valid,
+        partial_xml_file_path,
+        updated_xml_file_path,
+        xsd_file_path,
+        journal,
+    )
+
+
+def _stream_with_totals(
+    rows,
+    payment_initiation_message_type,
+    xml_file_path,
+    xsd_file_path,
+    output_file_path=None,
+):
+    """Generates a message whose group header totals are those of its rows.
+
+    The transactions are rendered first, the group header once all the rows
+    have been counted, and the parts are then written in order to the
+    partial XML file and fed to the validator.
+    """
+    # The template is checked before any row is consumed
+    writer = load_xml_writer(xml_file_path)
+    if writer.loop_variable != "transactions":
+        raise ValueError(
+            "Error: The XML template does not render every transaction, so "
+            "the group header totals cannot be computed from the rows."
+        )
+
+    rows = iter(rows)
+    header = _first_row(rows)
+    rows = itertools.chain([header], rows)
+    updated_xml_file_path, partial_xml_file_path = _get_output_paths(
+        xml_file_path, payment_initiation_message_type, output_file_path
+    )
+    body_file_path = partial_xml_file_path + ".body"
+
+    validator = XsdStreamValidator(xsd_file_path)
+    try:
+        with open(body_file_path, "w+") as body_file:
+            nb_of_txs, ctrl_sum = _render_transactions(
+                writer,
+                header,
+                rows,
+                payment_initiation_message_type,
+                body_file,
+            )
+            header = dict(
+                header, nb_of_txs=str(nb_of_txs), ctrl_sum=str(ctrl_sum)
+            )
+            head, tail = writer.render_around_loop(
+                **prepare_xml_data(header, (), payment_initiation_message_type)
+            )
+            body_file.seek(0)
+            body = iter(lambda: body_file.read(_BLOCK_SIZE), "")
+            with open(partial_xml_file_path, "w") as xml_file:
+                for chunk in itertools.chain([head], body, [tail]):
+                    xml_file.write(chunk)
+                    validator.feed(chunk)
+                    if not validator.is_valid:
+                        break
+        is_valid = validator.close()
+    except BaseException:
+        if os.path.exists(partial_xml_file_path):
+            os.remove(partial_xml_file_path)
+        raise
+    finally:
+        if os.path.exists(body_file_path):
+            os.remove(body_file_path)
+
+    _finish(
+        is_valid, partial_xml_file_path, updated_xml_file_path, xsd_file_path
+    )
+
+
+def _render_transactions(
+    writer, header, rows, payment_initiation_message_type, body_file
+):
+    """Renders the transactions of the rows in batches to a file.
+
+    Returns:
+        tuple: The number of rows, and the sum of their amounts as a
+        Decimal.
+    """
+    nb_of_txs = 0
+    ctrl_sum = decimal.Decimal(0)
+    while batch := list(itertools.islice(rows, TOTALS_BATCH_ROWS)):
+        xml_data = prepare_xml_data(
+            header, batch, payment_initiation_message_type
+        )
+        transactions = xml_data.pop("transactions")
+        body_file.write(
+            writer.render_loop(transactions, nb_of_txs, **xml_data)
+        )
+        nb_of_txs += len(batch)
+        ctrl_sum += sum(map(get_payment_amount, batch), decimal.Decimal(0))
+    return nb_of_txs, ctrl_sum
+
+
+def _first_row(rows):
+    """Returns the first row, which also provides the group header values."""
+    try:
+        return next(rows)
+    except StopIteration:
+        print("Error: No data to process.")
+        sys.exit(1)
+
+
+def _get_output_paths(
+    xml_file_path, payment_initiation_message_type, output_file_path=None
+):
+    """Returns the path of the generated XML file and of its partial file."""
+    if output_file_path is None:
+        output_file_path = generate_updated_xml_file_path(
+            xml_file_path, payment_initiation_message_type
+        )
+    return output_file_path, output_file_path + ".part"
+
+
+def _finish(
+    is_valid,
+    partial_xml_file_path,
+    updated_xml_file_path,
+    xsd_file_path,
+    journal=None,
+):
+    """Moves a valid partial XML file into place, or discards it."""
+    if not is_valid:
+        os.remove(partial_xml_file_path)
+        if journal is not None:
+            journal.remove()
+        print("Error: Invalid XML data.")
+        sys.exit(1)
+
+    os.replace(partial_xml_file_path, updated_xml_file_path)
+    if journal is not None:
+        journal.remove()
+    Context.get_instance().increment(
+        "bytes_written", os.path.getsize(updated_xml_file_path)
+    )
+
+    print(f"A new XML file has been created at `{updated_xml_file_path}`")
+    print(f"The XML has been validated against `{xsd_file_path}`")
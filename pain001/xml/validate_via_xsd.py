@@ -1,5 +1,3 @@
-import xmlschema
-
 # Copyright (C) 2023-2024 Sebastien Rousseau.
 #
 # Licensed under the Apache License, Version 2.0 (the "License");
@@ -15,30 +13,73 @@ import xmlschema
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import re
 import xml.etree.ElementTree as et
+from xml.parsers import expat
+
+from pain001.xml.load_xsd_schema import load_xsd_schema
+from pain001.xml.xsd_stream_validator import XsdError, XsdStreamValidator
+
+# The size of the blocks in which the XML file is read when it is streamed
+_BLOCK_SIZE = 1024 * 1024
+
+# A step of the path of an element: its tag, possibly qualified by a
+# namespace or a prefix, and its position among the siblings of that tag
+_PATH_STEP = re.compile(r"/((?:\{[^}]*\})?[^/\[{]+)(?:\[(\d+)\])?")
 
 
-def validate_via_xsd(xml_file_path, xsd_file_path):
+def validate_via_xsd(xml_file_path, xsd_file_path, lazy=False, jobs=None):
     """
     Validates an XML file against an XSD schema.
 
     Args:
         xml_file_path (str): Path to the XML file to validate.
         xsd_file_path (str): Path to the XSD schema file.
+        lazy (bool or int): If set, the XML file is parsed incrementally and
+            validated element by element instead of being loaded as a whole
+            tree, so that memory use does not grow with the file size. An
+            integer gives the depth of the elements that are released once
+            they have been validated (True is the same as 1).
+        jobs (int, optional): If set, the CdtTrfTxInf blocks are validated
+            one at a time against their schema declaration by this many
+            worker processes, while the rest of the document is validated
+            once, which gives the same verdict as the validation of the
+            whole document.
 
     Returns:
         bool: True if the XML file is valid, False otherwise.
     """
 
-    # Load XML file into an ElementTree object.
+    # Feed the XML file to a validator that releases the transactions to
+    # worker processes.
+    if jobs is not None:
+        validator = XsdStreamValidator(xsd_file_path, jobs=jobs)
+        try:
+            with open(xml_file_path, "rb") as xml_file:
+                for block in iter(lambda: xml_file.read(_BLOCK_SIZE), b""):
+                    validator.feed(block)
+                    if not validator.is_valid:
+                        break
+        except OSError as e:
+            print(f"Error: {e}")
+            return False
+        return validator.close()
+
+    # Load XML file into an ElementTree object, or into a lazy resource
+    # that is parsed while it is being validated.
     try:
-        xml_tree = et.parse(xml_file_path)
+        if lazy:
+            import xmlschema
+
+            xml_tree = xmlschema.XMLResource(xml_file_path, lazy=lazy)
+        else:
+            xml_tree = et.parse(xml_file_path)
     except Exception as e:
         print(f"Error: {e}")
         return False
 
-    # Load XSD schema into an XMLSchema object.
-    xsd = xmlschema.XMLSchema(xsd_file_path)
+    # Get the compiled XMLSchema object from the schema registry.
+    xsd = load_xsd_schema(xsd_file_path)
 
     # Validate XML file against XSD schema.
     try:
@@ -49,3 +90,106 @@ def validate_via_xsd(xml_file_path, xsd_file_path):
 
     # Return True if XML file is valid, False otherwise.
     return is_valid
+
+
+def find_xsd_errors(
+    xml_file_path, xsd_file_path, max_errors=None, fail_fast=False, lazy=3
+):
+    """
+    Returns the errors found validating an XML file against an XSD schema.
+
+    The XML file is parsed incrementally and its elements are validated as
+    soon as they are complete, so that the validation stops as soon as
+    enough errors have been found, without reading the rest of the file.
+
+    Args:
+        xml_file_path (str): Path to the XML file to validate.
+        xsd_file_path (str): Path to the XSD schema file.
+        max_errors (int, optional): The number of errors after which the
+            validation stops. Defaults to finding all the errors.
+        fail_fast (bool): If True, the validation stops at the first error.
+        lazy (int): The depth of the elements that are validated and
+            released as soon as they are complete. Defaults to the depth of
+            the CdtTrfTxInf blocks of a pain.001 message.
+
+    Returns:
+        list of XsdError: The errors found, in document order, with the
+        path and line of each invalid element. A file that is not
+        well-formed XML ends with an error without a path.
+
+    Raises:
+        OSError: If the XML file cannot be read.
+    """
+    import xmlschema
+
+    if fail_fast:
+        max_errors = 1
+    xsd = load_xsd_schema(xsd_file_path)
+    errors = []
+    if max_errors is not None and max_errors < 1:
+        return errors
+
+    try:
+        resource = xmlschema.XMLResource(xml_file_path, lazy=lazy)
+        for error in xsd.iter_errors(resource):
+            errors.append(XsdError(error.path, error.reason))
+            if len(errors) == max_errors:
+                break
+    except et.ParseError as e:
+        # The position of the syntax error is held by the error of the
+        # underlying parser
+        position = getattr(e, "position", None) or getattr(
+            e.__cause__, "position", None
+        )
+        errors.append(XsdError(None, str(e), position and position[0]))
+
+    lines = _find_lines(xml_file_path, [error.path for error in errors])
+    return [
+        error._replace(line=lines.get(error.path, error.line))
+        for error in errors
+    ]
+
+
+def _find_lines(xml_file_path, paths):
+    """Returns the line of the start tag of the element at each path.
+
+    The XML file is only read up to the last of the elements.
+    """
+    wanted = {_get_steps(path): path for path in paths if path}
+    lines = {}
+    stack = []
+    counts = [{}]
+    parser = expat.ParserCreate(namespace_separator="}")
+
+    def start(name, attributes):
+        count = counts[-1][name] = counts[-1].get(name, 0) + 1
+        stack.append((name.rpartition("}")[2], count))
+        counts.append({})
+        path = wanted.get(tuple(stack))
+        if path is not None and path not in lines:
+            lines[path] = parser.CurrentLineNumber
+
+    def end(name):
+        stack.pop()
+        counts.pop()
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        with open(xml_file_path, "rb") as xml_file:
+            while len(lines) < len(wanted):
+                block = xml_file.read(_BLOCK_SIZE)
+                parser.Parse(block, not block)
+                if not block:
+                    break
+    except (OSError, expat.ExpatError):
+        pass
+    return lines
+
+
+def _get_steps(path):
+    """Returns the local name and position of each element of a path."""
+    return tuple(
+        (tag.rpartition("}")[2].rpartition(":")[2], int(position or 1))
+        for tag, position in _PATH_STEP.findall(path)
+    )
@@ -15,17 +15,29 @@
 
 """
 This module contains a utility function for writing XML content to a file.
-The XML content is pretty-formatted with proper indentation for better
-readability.
+The XML content is streamed to the file as it is serialized, either
+pretty-formatted with proper indentation for better readability or compact
+for machine-to-machine delivery.
 """
 
 import xml.etree.ElementTree as et
-from defusedxml.minidom import parseString
 
+# The XML declaration written at the top of every file
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>\n'
 
-def write_xml_to_file(xml_file_path, root):
+
+def write_xml_to_file(xml_file_path, root, pretty_print=True, indent="\t"):
     """
-    Write the XML tree to a file, with pretty formatting (indentation).
+    Write the XML tree to a file, with pretty formatting (indentation) unless
+    it is turned off.
+
+    The tree is serialized straight to the file, without building the whole
+    document as a string or as a DOM first. When pretty-printing, the
+    whitespace-only text and tails of the elements are replaced with the
+    indentation, as `xml.etree.ElementTree.indent` does. When writing
+    compact XML, they are removed. Other text content is left untouched, and
+    the text and tails of the elements are restored once the tree has been
+    written, so that the caller's tree is not changed.
 
     Parameters
     ----------
@@ -33,6 +45,13 @@ def write_xml_to_file(xml_file_path, root):
         The file path where the XML content will be written.
     root : xml.etree.ElementTree.Element
         The root element of the XML tree.
+    pretty_print : bool, optional
+        Whether to indent the XML content. When False, the whitespace-only
+        text and tails are dropped instead and the XML content is written
+        compact, on a single line. Defaults to True.
+    indent : str, optional
+        The whitespace used for each level of indentation when
+        pretty-printing. Defaults to a tab.
 
     Returns
     -------
@@ -41,11 +60,26 @@ def write_xml_to_file(xml_file_path, root):
         value.
     """
 
-    with open(xml_file_path, "w") as f:
-        xml_string = et.tostring(root, encoding="utf-8")
-        xml_declaration = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_string = xml_declaration + xml_string.decode("utf-8")
+    tree = et.ElementTree(root)
+    whitespace = [
+        (element, element.text, element.tail) for element in root.iter()
+    ]
+    try:
+        if pretty_print:
+            et.indent(tree, space=indent)
+        else:
+            for element in root.iter():
+                if element.text is not None and not element.text.strip():
+                    element.text = None
+                if element.tail is not None and not element.tail.strip():
+                    element.tail = None
 
-        # Pretty-format the XML string using minidom
-        dom = parseString(xml_string)
-        f.write(dom.toprettyxml())
+        with open(xml_file_path, "wb") as f:
+            f.write(XML_DECLARATION)
+            tree.write(f, encoding="utf-8", xml_declaration=False)
+            if pretty_print:
+                f.write(b"\n")
+    finally:
+        for element, text, tail in whitespace:
+            element.text = text
+            element.tail = tail
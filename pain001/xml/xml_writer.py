@@ -0,0 +1,1002 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module contains `XmlWriter`, the "direct" XML engine, an alternative to
+rendering XML templates with Jinja2.
+
+An XML template is compiled once into a table of output segments: the markup
+between two values is kept as a literal, and each run of markup and values
+becomes a single format string. Writing a transaction then comes down to one
+`str.format` call over its escaped values, instead of evaluating every
+`{{tx.field}}` expression through Jinja2. The values of a transaction are
+escaped together in a single pass, the same way as Jinja2 autoescaping
+does, so the output is byte for byte the same as the one of the template
+rendered by Jinja2 for values that are strings, numbers or None.
+
+The writer can also build the XML document as an ElementTree tree, without
+rendering it to a string and parsing it back. The markup of the template is
+parsed once, with markers in place of its values and blocks. Each element
+that holds no loop, such as a transaction, becomes a prototype, and building
+a document then comes down to copying prototypes and filling in their
+values.
+
+Only the subset of Jinja2 used by the pain.001 templates is supported:
+
+- `{{ name }}` and `{{ item.field }}` expressions, where `item` is a loop
+  variable, and `{{ loop.index }}`,
+- `{% for item in name %}` loops and `{% if item.field %}` blocks,
+- `{# comments #}`.
+
+Compiling a template using anything else raises a `ValueError`.
+"""
+
+import functools
+import itertools
+import operator
+import os
+import re
+import xml.etree.ElementTree as et
+
+# The tags of a template: expressions, statements and comments
+_TAG_RE = re.compile(r"({{.*?}}|{%.*?%}|{#.*?#})", re.DOTALL)
+
+# The newline sequences normalized by Jinja2
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")
+
+# The supported expressions and statements
+_NAME_RE = re.compile(r"^([A-Za-z_]\w*)(?:\.([A-Za-z_]\w*))?$")
+_FOR_RE = re.compile(r"^for\s+([A-Za-z_]\w*)\s+in\s+([A-Za-z_]\w*)$")
+_IF_RE = re.compile(r"^if\s+(.+)$")
+
+# The replacements made by Jinja2 autoescaping, in order
+_ESCAPES = (
+    ("&", "&amp;"),
+    ("<", "&lt;"),
+    (">", "&gt;"),
+    ('"', "&#34;"),
+    ("'", "&#39;"),
+)
+
+# The names of the attributes of a dictionary, which Jinja2 would return
+# instead of the values of the keys of the same name
+_DICT_ATTRIBUTES = frozenset(dir(dict))
+
+# The markers standing for values and blocks in the markup parsed to build
+# trees: values are replaced by private use characters around their number,
+# and blocks by processing instructions
+_MARKER = "\ue000{}\ue001"
+_MARKER_RE = re.compile("\ue000(\\d+)\ue001")
+_BLOCK_TARGET = "pain001-block"
+
+# A format string made of a single value
+_FIELD_RE = re.compile(r"{(\d+)}")
+
+# The whitespace replaced by spaces in attribute values by XML parsers
+_ATTRIBUTE_WHITESPACE = str.maketrans("\t\n\r", "   ")
+
+
+class XmlWriter:
+    """An XML template compiled into direct writes.
+
+    The writer has the same `render` and `stream` methods as a Jinja2
+    template, so that the two engines can be used interchangeably.
+
+    Attributes:
+        xml_template_file_path (str): The path of the compiled template.
+
+    Methods:
+        render(self, **context): Returns the XML document as a string.
+        stream(self, **context): Yields the XML document piece by piece.
+        render_around_loop(self, **context): Returns the XML document
+            without the output of its loop.
+        render_loop(self, items, start, **context): Returns the output of
+            the loop for some items.
+        build(self, **context): Returns the root element of the XML
+            document.
+    """
+
+    def __init__(self, source, xml_template_file_path=None):
+        """Compiles a template.
+
+        Args:
+            source (str): The source of the template.
+            xml_template_file_path (str, optional): The path of the
+                template, used in error messages.
+
+        Raises:
+            ValueError: If the template uses unsupported Jinja2 syntax.
+        """
+        self.xml_template_file_path = xml_template_file_path
+        self._nodes = _parse(source, xml_template_file_path)
+        fields = []
+        self._segments = _compile(self._nodes, fields)
+        self._fields = tuple(fields)
+        self._tree = None
+
+    def render(self, **context):
+        """Returns the XML document of the given template variables."""
+        return "".join(self.stream(**context))
+
+    def stream(self, **context):
+        """Yields the XML document of the given template variables.
+
+        Each transaction is yielded as a single string as soon as it has
+        been written, so that iterables of rows are consumed lazily. The
+        output preceding a loop is yielded before its first item is read,
+        as Jinja2 does.
+        """
+        raw = [_lookup(context, {}, *key) for key in self._fields]
+        values = _escape_values(raw)
+        parts = []
+        for _ in _write(self._segments, raw, values, context, {}, 0, parts):
+            if parts:
+                yield "".join(parts)
+                parts.clear()
+        if parts:
+            yield "".join(parts)
+
+    @property
+    def loop_variable(self):
+        """The name of the variable the only loop of the template iterates
+        over, or None if the template has not got a single loop outside of
+        any block."""
+        try:
+            return self._segments[self._get_loop_position()][2]
+        except ValueError:
+            return None
+
+    def render_around_loop(self, **context):
+        """Returns the XML document of the given template variables without
+        the output of its loop, split where the loop stands.
+
+        Together with `render_loop`, this renders a document whose
+        transactions are rendered in several parts, possibly in parallel.
+
+        Returns:
+            tuple: The output before the loop and the output after it.
+
+        Raises:
+            ValueError: If the template has not got a single loop outside of
+                any block.
+        """
+        position = self._get_loop_position()
+        raw = [_lookup(context, {}, *key) for key in self._fields]
+        values = _escape_values(raw)
+        head = []
+        _append(self._segments[:position], raw, values, 0, head)
+        tail = []
+        _append(self._segments[position + 1 :], raw, values, 0, tail)
+        return "".join(head), "".join(tail)
+
+    def render_loop(self, items, start=0, /, **context):
+        """Returns the output of the loop of the template for some items.
+
+        Args:
+            items (iterable): The items to render, in place of the ones the
+                loop iterates over.
+            start (int): The number of items preceding them in the loop,
+                which offsets the loop index.
+            **context: The template variables.
+
+        Returns:
+            str: The output of the loop for the items.
+
+        Raises:
+            ValueError: If the template has not got a single loop outside of
+                any block.
+        """
+        segment = self._segments[self._get_loop_position()]
+        parts = []
+        for _ in _write_loop(segment, items, start, context, {}, parts):
+            pass
+        return "".join(parts)
+
+    def _get_loop_position(self):
+        """Returns the position of the only loop of the template, which
+        must stand outside of any block."""
+        positions = [
+            position
+            for position, segment in enumerate(self._segments)
+            if segment[0] == "for"
+        ]
+        if len(positions) != 1 or not _is_flat(
+            self._segments[: positions[0]] + self._segments[positions[0] + 1 :]
+        ):
+            raise ValueError(
+                "Error: The XML template has not got a single loop outside "
+                "of any block."
+            )
+        return positions[0]
+
+    def build(self, **context):
+        """Returns the root element of the XML document of the given
+        template variables.
+
+        The tree is the same as the one parsed from the rendered document,
+        but the document is never rendered: the elements are created
+        straight from the values.
+
+        Raises:
+            ValueError: If the blocks of the template do not enclose whole
+                elements, or if its markup is not well-formed.
+        """
+        if self._tree is None:
+            self._tree = _compile_tree(
+                self._nodes, self.xml_template_file_path
+            )
+        ops, fields = self._tree
+        raw = [_lookup(context, {}, *key) for key in fields]
+        builder = _TreeBuilder()
+        _build(ops, raw, _text_values(raw), context, {}, 0, builder)
+        return builder.root
+
+
+def load_xml_writer(xml_template_file_path):
+    """Returns the compiled direct XML writer of an XML template file.
+
+    Writers are compiled once and reused, and compiled again when the file
+    is modified.
+
+    Args:
+        xml_template_file_path (str): Path to the XML template file.
+
+    Returns:
+        XmlWriter: The compiled writer.
+
+    Raises:
+        FileNotFoundError: If the XML template file does not exist.
+        ValueError: If the template uses unsupported Jinja2 syntax.
+    """
+    xml_template_file_path = os.path.abspath(xml_template_file_path)
+    stat = os.stat(xml_template_file_path)
+    return _load_xml_writer(
+        xml_template_file_path, stat.st_mtime_ns, stat.st_size
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _load_xml_writer(xml_template_file_path, mtime_ns, size):
+    """Compiles the writer of a version of a template file."""
+    with open(xml_template_file_path, encoding="utf-8") as template_file:
+        return XmlWriter(template_file.read(), xml_template_file_path)
+
+
+def _parse(source, xml_template_file_path=None):
+    """Parses a template into a tree of nodes.
+
+    Nodes are `("text", text)`, `("value", name, field)`, `("index",)`,
+    `("for", item, name, body)` and `("if", name, field, body)` tuples.
+    """
+    # Normalize newlines and drop the trailing newline, as Jinja2 does
+    lines = _NEWLINE_RE.split(source)
+    if lines[-1] == "":
+        del lines[-1]
+    source = "\n".join(lines)
+
+    root = []
+    stack = [("root", None, root)]
+    loop_items = []
+    for position, token in enumerate(_TAG_RE.split(source)):
+        if position % 2 == 0:
+            if token:
+                stack[-1][2].append(("text", token))
+            continue
+        if token.startswith("{#"):
+            continue
+
+        body = token[2:-2]
+        if body[:1] in "-+" or body[-1:] in "-+":
+            raise _unsupported(token, xml_template_file_path)
+        body = body.strip()
+
+        if token.startswith("{{"):
+            node = _parse_expression(body, loop_items)
+            if node is None:
+                raise _unsupported(token, xml_template_file_path)
+            stack[-1][2].append(node)
+        elif not _parse_statement(body, stack, loop_items):
+            raise _unsupported(token, xml_template_file_path)
+
+    if len(stack) > 1:
+        raise _unsupported(f"{{% {stack[-1][0]} %}}", xml_template_file_path)
+    return root
+
+
+def _unsupported(tag, xml_template_file_path=None):
+    """Returns the error raised for a tag the writer does not support."""
+    return ValueError(
+        f"Error: Unsupported template syntax {tag!r} in "
+        f"'{xml_template_file_path or '<string>'}' for the direct XML "
+        "engine."
+    )
+
+
+def _parse_expression(body, loop_items):
+    """Parses the body of a `{{ ... }}` tag into a node.
+
+    Returns None if the expression is not supported.
+    """
+    match = _NAME_RE.match(body)
+    if not match:
+        return None
+    name, field = match.groups()
+    if name == "loop" and loop_items:
+        return ("index",) if field == "index" else None
+    if field is None:
+        return ("value", name, None)
+    if name in loop_items and field not in _DICT_ATTRIBUTES:
+        return ("value", name, field)
+    return None
+
+
+def _parse_statement(body, stack, loop_items):
+    """Parses the body of a `{% ... %}` tag, opening or closing a block.
+
+    Returns False if the statement is not supported.
+    """
+    nodes = stack[-1][2]
+    for_match = _FOR_RE.match(body)
+    if_match = _IF_RE.match(body)
+    if for_match:
+        item, name = for_match.groups()
+        block = ("for", item, name, [])
+        nodes.append(block)
+        stack.append(("for", item, block[3]))
+        loop_items.append(item)
+    elif if_match:
+        match = _NAME_RE.match(if_match.group(1).strip())
+        if not match:
+            return False
+        name, field = match.groups()
+        if field is not None and (
+            name not in loop_items or field in _DICT_ATTRIBUTES
+        ):
+            return False
+        block = ("if", name, field, [])
+        nodes.append(block)
+        stack.append(("if", None, block[3]))
+    elif body in ("endfor", "endif") and stack[-1][0] == body[3:]:
+        if stack.pop()[0] == "for":
+            loop_items.pop()
+    else:
+        return False
+    return True
+
+
+def _compile(nodes, fields):
+    """Compiles a list of nodes into output segments.
+
+    The values of a loop body, or of the template outside of any loop, are
+    all escaped at once: `fields` collects the `(name, field)` of each of
+    them, and segments refer to values by their position in `fields`.
+    Consecutive text and value nodes are merged into a single
+    `("format", format_string)` segment, formatted with the escaped values
+    as positional arguments and the loop index as the `index` keyword.
+    Blocks become `("if", position, segments)` and
+    `("for", item, name, segments, fields, item_fields, flat)` segments.
+    """
+    segments = []
+    pieces = []
+
+    def position(key):
+        if key not in fields:
+            fields.append(key)
+        return fields.index(key)
+
+    def flush():
+        if pieces:
+            segments.append(("format", "".join(pieces)))
+            pieces.clear()
+
+    for node in nodes:
+        if node[0] == "text":
+            pieces.append(node[1].replace("{", "{{").replace("}", "}}"))
+        elif node[0] == "value":
+            pieces.append(f"{{{position(node[1:])}}}")
+        elif node[0] == "index":
+            pieces.append("{index}")
+        elif node[0] == "if":
+            flush()
+            segments.append(
+                ("if", position(node[1:3]), _compile(node[3], fields))
+            )
+        else:
+            flush()
+            _, item, name, body = node
+            body_fields = []
+            body = _compile(body, body_fields)
+            item_fields = None
+            if all(key[0] == item and key[1] for key in body_fields):
+                item_fields = tuple(field for _, field in body_fields)
+            segments.append(
+                (
+                    "for",
+                    item,
+                    name,
+                    body,
+                    tuple(body_fields),
+                    item_fields,
+                    _is_flat(body),
+                )
+            )
+    flush()
+    return tuple(segments)
+
+
+def _is_flat(segments):
+    """Returns True if segments hold no loop."""
+    return all(
+        segment[0] == "format" or segment[0] == "if" and _is_flat(segment[2])
+        for segment in segments
+    )
+
+
+def _lookup(context, items, name, field):
+    """Returns the value of `name` or `name.field`, or "" if undefined."""
+    if name in items:
+        value = items[name]
+        if field is None:
+            return value
+        return value.get(field, "")
+    if field is None:
+        return context.get(name, "")
+    return ""
+
+
+@functools.lru_cache(maxsize=64)
+def _item_reader(item_type, item_fields):
+    """Returns a function reading the fields of the items of a loop.
+
+    Named tuples holding every field, such as the transactions prepared by
+    `prepare_xml_data`, are read by position in a single call, and other
+    items through their `get` method, with "" for undefined fields.
+    """
+    positions = getattr(item_type, "_fields", None)
+    if (
+        issubclass(item_type, tuple)
+        and positions is not None
+        and set(item_fields) <= set(positions)
+    ):
+        read_fields = operator.itemgetter(
+            *[positions.index(field) for field in item_fields]
+        )
+        if len(item_fields) > 1:
+            return read_fields
+        return lambda value: (read_fields(value),)
+    return lambda value: list(map(value.get, item_fields, _EMPTY))
+
+
+def _write(segments, raw, values, context, items, index, parts):
+    """Appends the output of segments to `parts`.
+
+    `raw` and `values` are the values of the fields of the segments, before
+    and after escaping. Yields once before each loop and after each
+    transaction, so that the caller can flush the output of a loop piece by
+    piece.
+    """
+    for segment in segments:
+        kind = segment[0]
+        if kind == "format":
+            parts.append(segment[1].format(*values, index=index))
+        elif kind == "if":
+            if raw[segment[1]]:
+                yield from _write(
+                    segment[2], raw, values, context, items, index, parts
+                )
+        else:
+            loop = _lookup(context, items, segment[2], None)
+            yield None
+            yield from _write_loop(segment, loop, 0, context, items, parts)
+
+
+def _write_loop(segment, loop, start, context, items, parts):
+    """Appends the output of a loop over `loop` to `parts`, the index of
+    its first item being `start + 1`, and yields after each item."""
+    _, item, _, body, body_fields, item_fields, flat = segment
+    item_type = read_item = None
+    for loop_index, value in enumerate(loop, start=start + 1):
+        scope = None
+        if not flat or item_fields is None:
+            scope = dict(items)
+            scope[item] = value
+        if item_fields is not None:
+            if type(value) is not item_type:
+                item_type = type(value)
+                read_item = _item_reader(item_type, item_fields)
+            body_raw = read_item(value)
+        else:
+            body_raw = [_lookup(context, scope, *key) for key in body_fields]
+        body_values = _escape_values(body_raw)
+        if flat:
+            _append(body, body_raw, body_values, loop_index, parts)
+        else:
+            yield from _write(
+                body,
+                body_raw,
+                body_values,
+                context,
+                scope,
+                loop_index,
+                parts,
+            )
+        yield None
+
+
+def _append(segments, raw, values, index, parts):
+    """Appends the output of segments holding no loop to `parts`."""
+    for segment in segments:
+        if segment[0] == "format":
+            parts.append(segment[1].format(*values, index=index))
+        elif raw[segment[1]]:
+            _append(segment[2], raw, values, index, parts)
+
+
+def _compile_tree(nodes, xml_template_file_path=None):
+    """Compiles a list of nodes into tree building operations.
+
+    Returns the operations and the `(name, field)` of the values outside of
+    any loop. Operations are:
+
+    - `("start", tag, attributes)` and `("end", tag)`, for the elements
+      that hold a loop,
+    - `("data", format_string, text)`, where `text` is the text itself when
+      it holds no value,
+    - `("element", operations, conditions, prototypes)`, for an element
+      holding no loop: it is built once for each combination of the values
+      of its `conditions`, cached in `prototypes`, and copied afterwards,
+    - `("if", position, operations)` and
+      `("for", item, name, operations, fields, item_fields)` blocks.
+
+    Raises:
+        ValueError: If the blocks of the template do not enclose whole
+            elements, or if its markup is not well-formed.
+    """
+    blocks = []
+    parser = et.XMLParser(target=_TreeRecorder(blocks))
+    try:
+        parser.feed(_mark(nodes, blocks))
+        ops, fields = parser.close()
+    except (et.ParseError, ValueError) as e:
+        raise ValueError(
+            f"Error: The XML template '{xml_template_file_path or '<string>'}'"
+            f" cannot be built as a tree by the direct XML engine: {e}"
+        ) from e
+    return _plan(ops), fields
+
+
+def _mark(nodes, blocks):
+    """Returns the markup of nodes with markers in place of their values and
+    blocks. `blocks` collects the value and block nodes, in order."""
+    pieces = []
+    for node in nodes:
+        if node[0] == "text":
+            pieces.append(node[1])
+            continue
+        number = len(blocks)
+        blocks.append(node)
+        if node[0] in ("for", "if"):
+            pieces.append(f"<?{_BLOCK_TARGET} {number}?>")
+            pieces.append(_mark(node[-1], blocks))
+            pieces.append(f"<?{_BLOCK_TARGET} /{number}?>")
+        else:
+            pieces.append(_MARKER.format(number))
+    return "".join(pieces)
+
+
+class _TreeRecorder:
+    """An XML parser target recording the operations that build the tree of
+    the marked markup of a template."""
+
+    def __init__(self, blocks):
+        self._blocks = blocks
+        # The operations, fields, depth and block number of the open
+        # scopes, innermost last
+        self._scopes = [([], [], 0, None)]
+        self._depth = 0
+        self._data = []
+
+    def start(self, tag, attrib):
+        self._flush()
+        if _MARKER_RE.search(tag) or any(map(_MARKER_RE.search, attrib)):
+            raise ValueError(
+                "values are only supported in text and attribute values"
+            )
+        if any(map(_MARKER_RE.search, attrib.values())):
+            attrib = tuple(
+                (name, self._format(value)) for name, value in attrib.items()
+            )
+        self._scopes[-1][0].append(("start", tag, attrib))
+        self._depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if self._depth == self._scopes[-1][2]:
+            raise ValueError("blocks must enclose whole elements")
+        self._scopes[-1][0].append(("end", tag))
+        self._depth -= 1
+
+    def data(self, data):
+        self._data.append(data)
+
+    def pi(self, target, text):
+        if target != _BLOCK_TARGET:
+            return
+        self._flush()
+        if not text.startswith("/"):
+            # Conditions share the values of their enclosing scope, and
+            # loops have their own
+            number = int(text)
+            fields = self._scopes[-1][1]
+            if self._blocks[number][0] == "for":
+                fields = []
+            self._scopes.append(([], fields, self._depth, number))
+            return
+
+        ops, fields, depth, number = self._scopes.pop()
+        if self._depth != depth:
+            raise ValueError("blocks must enclose whole elements")
+        node = self._blocks[number]
+        if node[0] == "if":
+            self._scopes[-1][0].append(
+                ("if", self._position(node[1:3]), tuple(ops))
+            )
+            return
+        item = node[1]
+        item_fields = None
+        if all(key[0] == item and key[1] for key in fields):
+            item_fields = tuple(field for _, field in fields)
+        self._scopes[-1][0].append(
+            ("for", item, node[2], tuple(ops), tuple(fields), item_fields)
+        )
+
+    def close(self):
+        self._flush()
+        ops, fields, _, _ = self._scopes[0]
+        return tuple(ops), tuple(fields)
+
+    def _flush(self):
+        """Records the text read since the last element or block."""
+        if self._data:
+            text = "".join(self._data)
+            self._data.clear()
+            format_string = self._format(text)
+            if _MARKER_RE.search(text):
+                text = None
+            self._scopes[-1][0].append(("data", format_string, text))
+
+    def _format(self, text):
+        """Returns the format string of a text holding value markers."""
+        pieces = _MARKER_RE.split(text)
+        for position, piece in enumerate(pieces):
+            if position % 2 == 0:
+                pieces[position] = piece.replace("{", "{{").replace("}", "}}")
+            elif self._blocks[int(piece)][0] == "index":
+                pieces[position] = "{index}"
+            else:
+                key = self._blocks[int(piece)][1:]
+                pieces[position] = f"{{{self._position(key)}}}"
+        return "".join(pieces)
+
+    def _position(self, key):
+        """Returns the position of a value in the fields of its scope."""
+        fields = self._scopes[-1][1]
+        if key not in fields:
+            fields.append(key)
+        return fields.index(key)
+
+
+def _plan(ops):
+    """Replaces the elements holding no loop by `("element", ...)`
+    operations."""
+    planned = []
+    position = 0
+    while position < len(ops):
+        op = ops[position]
+        if op[0] == "start":
+            end = _find_end(ops, position)
+            inner = ops[position + 1 : end]
+            if _has_loop(inner):
+                planned.append(op)
+                planned.extend(_plan(inner))
+                planned.append(ops[end])
+            else:
+                planned.append(
+                    (
+                        "element",
+                        ops[position : end + 1],
+                        _conditions(inner),
+                        {},
+                    )
+                )
+            position = end + 1
+            continue
+        if op[0] == "if":
+            op = ("if", op[1], _plan(op[2]))
+        elif op[0] == "for":
+            op = op[:3] + (_plan(op[3]),) + op[4:]
+        planned.append(op)
+        position += 1
+    return tuple(planned)
+
+
+def _find_end(ops, start):
+    """Returns the position of the end of the element started at `start`."""
+    depth = 0
+    for position in range(start, len(ops)):
+        if ops[position][0] == "start":
+            depth += 1
+        elif ops[position][0] == "end":
+            depth -= 1
+            if depth == 0:
+                return position
+    raise ValueError("Error: Unbalanced XML template.")
+
+
+def _has_loop(ops):
+    """Returns True if operations hold a loop."""
+    return any(
+        op[0] == "for" or op[0] == "if" and _has_loop(op[2]) for op in ops
+    )
+
+
+def _conditions(ops):
+    """Returns the positions of the values of the conditions of operations
+    holding no loop."""
+    conditions = []
+    for op in ops:
+        if op[0] == "if":
+            conditions.append(op[1])
+            conditions.extend(_conditions(op[2]))
+    return tuple(conditions)
+
+
+def _prototype(ops, raw):
+    """Builds the prototype of an element for the given condition values.
+
+    Returns the element, with the text that holds no value, and where the
+    values go: the `(element number, value position)` of the texts and
+    tails made of a single value, and the
+    `(element number, slot, format_string)` of the other texts holding
+    values, where elements are numbered in document order and `slot` is
+    "text", "tail" or the name of an attribute.
+    """
+    builder = et.TreeBuilder()
+    count = 0
+    sites = []
+    stack = []
+    target = None
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        if all(text is not None for _, text in pending):
+            builder.data("".join(text for _, text in pending))
+        else:
+            sites.append(
+                target
+                + ("".join(format_string for format_string, _ in pending),)
+            )
+        pending.clear()
+
+    def resolve(ops):
+        for op in ops:
+            if op[0] == "if":
+                if raw[op[1]]:
+                    yield from resolve(op[2])
+            else:
+                yield op
+
+    for op in resolve(ops):
+        if op[0] == "data":
+            pending.append(op[1:])
+        elif op[0] == "start":
+            flush()
+            attrib = op[2]
+            if not isinstance(attrib, dict):
+                for name, format_string in attrib:
+                    sites.append((count, name, format_string))
+                attrib = {}
+            builder.start(op[1], attrib)
+            stack.append(count)
+            target = (count, "text")
+            count += 1
+        else:
+            flush()
+            builder.end(op[1])
+            target = (stack.pop(), "tail")
+
+    # The texts made of a single value are set without formatting
+    single = {"text": [], "tail": []}
+    others = []
+    for number, slot, format_string in sites:
+        match = _FIELD_RE.fullmatch(format_string)
+        if match and slot in single:
+            single[slot].append((number, int(match.group(1))))
+        else:
+            others.append((number, slot, format_string))
+    return (
+        builder.close(),
+        tuple(single["text"]),
+        tuple(single["tail"]),
+        tuple(others),
+    )
+
+
+class _TreeBuilder:
+    """Assembles a tree from elements, built or copied, and text, the same
+    way as `xml.etree.ElementTree.TreeBuilder` assembles parsed markup."""
+
+    def __init__(self):
+        self.root = None
+        self._stack = []
+        self._last = None
+        self._tail = False
+        self._data = []
+
+    def data(self, data):
+        self._data.append(data)
+
+    def start(self, tag, attrib):
+        self.append(et.Element(tag, attrib))
+        self._stack.append(self._last)
+        self._tail = False
+
+    def end(self, tag):
+        self._flush()
+        self._last = self._stack.pop()
+        self._tail = True
+
+    def append(self, element):
+        """Appends a whole element to the current element."""
+        self._flush()
+        if self._stack:
+            self._stack[-1].append(element)
+        elif self.root is None:
+            self.root = element
+        self._last = element
+        self._tail = True
+
+    def _flush(self):
+        if self._data:
+            text = "".join(self._data) or None
+            self._data.clear()
+            if self._last is None:
+                return
+            if self._tail:
+                self._last.tail = text
+            else:
+                self._last.text = text
+
+
+def _build(ops, raw, texts, context, items, index, builder):
+    """Runs tree building operations.
+
+    `raw` and `texts` are the values of the fields of the operations,
+    before and after their conversion to text.
+    """
+    for op in ops:
+        kind = op[0]
+        if kind == "element":
+            builder.append(_copy_element(op, raw, texts, index))
+        elif kind == "data":
+            text = op[2]
+            if text is None:
+                text = op[1].format(*texts, index=index)
+            builder.data(text)
+        elif kind == "start":
+            attrib = op[2]
+            if not isinstance(attrib, dict):
+                attrib = {
+                    name: _attribute(format_string.format(*texts, index=index))
+                    for name, format_string in attrib
+                }
+            builder.start(op[1], attrib)
+        elif kind == "end":
+            builder.end(op[1])
+        elif kind == "if":
+            if raw[op[1]]:
+                _build(op[2], raw, texts, context, items, index, builder)
+        else:
+            _, item, name, body, body_fields, item_fields = op
+            loop = _lookup(context, items, name, None)
+            item_type = read_item = None
+            for loop_index, value in enumerate(loop, start=1):
+                scope = dict(items)
+                scope[item] = value
+                if item_fields is not None:
+                    if type(value) is not item_type:
+                        item_type = type(value)
+                        read_item = _item_reader(item_type, item_fields)
+                    body_raw = read_item(value)
+                else:
+                    body_raw = [
+                        _lookup(context, scope, *key) for key in body_fields
+                    ]
+                _build(
+                    body,
+                    body_raw,
+                    _text_values(body_raw),
+                    context,
+                    scope,
+                    loop_index,
+                    builder,
+                )
+
+
+def _copy_element(op, raw, texts, index):
+    """Returns a copy of the prototype of an element filled with values."""
+    _, ops, conditions, prototypes = op
+    key = ()
+    if conditions:
+        key = tuple(bool(raw[position]) for position in conditions)
+    prototype = prototypes.get(key)
+    if prototype is None:
+        prototype = prototypes[key] = _prototype(ops, raw)
+    element, text_sites, tail_sites, sites = prototype
+    element = element.__deepcopy__({})
+    elements = list(element.iter())
+    # Empty texts are left unset, as XML parsers do
+    for number, position in text_sites:
+        elements[number].text = texts[position] or None
+    for number, position in tail_sites:
+        elements[number].tail = texts[position] or None
+    for number, slot, format_string in sites:
+        text = format_string.format(*texts, index=index)
+        if slot == "text":
+            elements[number].text = text or None
+        elif slot == "tail":
+            elements[number].tail = text or None
+        else:
+            elements[number].set(slot, _attribute(text))
+    return element
+
+
+def _attribute(text):
+    """Normalizes the whitespace of an attribute value as XML parsers do."""
+    return text.translate(_ATTRIBUTE_WHITESPACE)
+
+
+def _text_values(values):
+    """Converts values to text, with the line endings normalized as XML
+    parsers do."""
+    texts = list(map(str, values))
+    if "\r" in "".join(texts):
+        texts = [
+            text.replace("\r\n", "\n").replace("\r", "\n") for text in texts
+        ]
+    return texts
+
+
+def _escape(text):
+    """Escapes a string as Jinja2 autoescaping does."""
+    for character, replacement in _ESCAPES:
+        if character in text:
+            text = text.replace(character, replacement)
+    return text
+
+
+def _escape_values(values):
+    """Escapes a list of values, joined so that they are escaped at once."""
+    escaped = _escape("\0".join(map(str, values))).split("\0")
+    if len(escaped) != len(values):
+        # A value holds the separator, or there is no value at all
+        escaped = [_escape(str(value)) for value in values]
+    return escaped
+
+
+# An endless supply of empty defaults for dict.get
+_EMPTY = itertools.repeat("")
@@ -0,0 +1,357 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import concurrent.futures
+import xml.etree.ElementTree as et
+
+from pain001.xml.load_xsd_schema import load_xsd_schema
+
+# The number of fragments validated by a task of a worker process
+FRAGMENT_BATCH_SIZE = 256
+
+# An error found by the XSD validation: the path of the element in the
+# document, in the form used by `xmlschema`, the reason it is invalid, and
+# the line of the element in the XML file when it is known
+XsdError = collections.namedtuple(
+    "XsdError", ["path", "reason", "line"], defaults=[None]
+)
+
+# The compiled schema used by the current worker process, and the
+# declarations found in it
+_worker_xsd = None
+_worker_declarations = {}
+
+
+class XsdStreamValidator:
+    """Validates XML content against an XSD schema while it is produced.
+
+    The content is fed chunk by chunk, as it is rendered, into an
+    incremental parser. Repeated elements found at `fragment_depth` (the
+    CdtTrfTxInf blocks of a pain.001 message) are validated on their own
+    against their schema declaration as soon as they are complete and are
+    then dropped from the tree, so that memory use does not grow with the
+    number of transactions. The first element of each run is kept so that
+    the remaining document can be validated as a whole once the content is
+    complete.
+
+    With several jobs, the fragments are validated in batches by a pool of
+    worker processes, which is only started once a whole batch has been
+    found, while the rest of the document is parsed and validated by the
+    current process. All the errors of the document are then collected, in
+    the order and with the paths that the validation of the whole document
+    reports, whereas the validation stops at the first invalid fragment
+    otherwise.
+
+    Attributes:
+        is_valid (bool): False once the XML content is found invalid.
+        errors (list of XsdError): The errors found, once closed.
+
+    Methods:
+        __init__(self, xsd_file_path, fragment_depth, jobs): Initializes
+            the validator.
+        feed(self, data): Feeds a chunk of XML content to the validator.
+        close(self): Validates the rest of the document.
+    """
+
+    def __init__(self, xsd_file_path, fragment_depth=3, jobs=None):
+        """Initializes the validator.
+
+        Args:
+            xsd_file_path (str): Path to the XSD schema file.
+            fragment_depth (int): Depth of the repeated elements that are
+                validated and released one at a time.
+            jobs (int, optional): The number of worker processes validating
+                the repeated elements. Defaults to validating them in the
+                current process.
+        """
+        self.xsd = load_xsd_schema(xsd_file_path)
+        self.xsd_file_path = xsd_file_path
+        self.fragment_depth = fragment_depth
+        self.jobs = jobs if jobs is not None and jobs > 1 else None
+        self.is_valid = True
+        self.errors = []
+        self._parser = et.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._stack = []
+        self._previous = None
+        self._anchor = None
+        self._declarations = {}
+        # The number of elements of each run, and the position of the
+        # elements kept in the tree among those of their run
+        self._counts = {}
+        self._ordinals = {}
+        # The errors of the released elements, with the element of their
+        # run kept in the tree and their position in the run
+        self._fragment_errors = []
+        self._batch = []
+        self._batch_fragments = []
+        self._tasks = collections.deque()
+        self._executor = None
+
+    def feed(self, data):
+        """Feeds a chunk of XML content to the validator.
+
+        Args:
+            data (str or bytes): The next chunk of XML content.
+        """
+        if not self.is_valid:
+            return
+        try:
+            self._parser.feed(data)
+            self._read_events()
+        except Exception as e:
+            print(f"Error: {e}")
+            self.is_valid = False
+
+    def close(self):
+        """Validates the rest of the document once all content is fed.
+
+        Returns:
+            bool: True if the XML content is valid, False otherwise.
+        """
+        try:
+            if not self.is_valid:
+                return False
+            try:
+                self._parser.close()
+                self._read_events()
+                if self._batch:
+                    if self._executor is None:
+                        self._collect(
+                            _validate_fragments(
+                                self._get_declaration, self._batch
+                            ),
+                            self._batch_fragments,
+                        )
+                    else:
+                        self._submit()
+                while self._tasks:
+                    self._collect_task()
+                errors = list(self.xsd.iter_errors(self._root))
+            except Exception as e:
+                print(f"Error: {e}")
+                self.is_valid = False
+                return False
+            self.errors = self._sort_errors(errors)
+            self.is_valid = not self.errors
+            return self.is_valid
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def _read_events(self):
+        """Validates and releases the fragments completed so far."""
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if not self._stack:
+                    self._root = element
+                self._stack.append(element)
+                continue
+
+            self._stack.pop()
+            if len(self._stack) != self.fragment_depth:
+                continue
+
+            parent = self._stack[-1]
+            run = (parent, element.tag)
+            ordinal = self._counts[run] = self._counts.get(run, 0) + 1
+
+            # Only release repeats of elements that may occur any number of
+            # times, keeping the first one in place for the validation of
+            # the enclosing document
+            if self._previous != run:
+                self._previous = run
+                self._anchor = element
+                self._ordinals[element] = ordinal
+                continue
+            path = self._get_declaration_path(element)
+            if self._get_declaration(path).max_occurs is not None:
+                self._ordinals[element] = ordinal
+                continue
+
+            fragment = (parent, self._anchor, ordinal)
+            if self.jobs is None:
+                errors = _validate_fragments(
+                    self._get_declaration, [(path, element)]
+                )
+                if errors:
+                    self._collect(errors, [fragment])
+                    self.is_valid = False
+                    return
+            else:
+                self._batch.append((path, et.tostring(element)))
+                self._batch_fragments.append(fragment)
+                if len(self._batch) == FRAGMENT_BATCH_SIZE:
+                    self._submit()
+            parent.remove(element)
+
+    def _get_declaration_path(self, element):
+        """Returns the path of the schema declaration of an element."""
+        return "/".join(e.tag for e in self._stack) + "/" + element.tag
+
+    def _get_declaration(self, path):
+        """Returns the schema declaration of a fragment element."""
+        if path not in self._declarations:
+            self._declarations[path] = _find_declaration(self.xsd, path)
+        return self._declarations[path]
+
+    def _submit(self):
+        """Hands the current batch of fragments to the worker processes."""
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_init_worker,
+                initargs=(self.xsd_file_path,),
+            )
+        future = self._executor.submit(_validate_batch, self._batch)
+        self._tasks.append((future, self._batch_fragments))
+        self._batch = []
+        self._batch_fragments = []
+
+        # Wait for the workers when they fall behind, so that the fragments
+        # waiting for them do not pile up in memory
+        while self._tasks and (
+            len(self._tasks) > 2 * self.jobs or self._tasks[0][0].done()
+        ):
+            self._collect_task()
+
+    def _collect_task(self):
+        """Waits for the oldest batch of fragments to be validated."""
+        future, fragments = self._tasks.popleft()
+        self._collect(future.result(), fragments)
+
+    def _collect(self, errors, fragments):
+        """Records the errors found in a batch of fragments."""
+        for index, path, reason in errors:
+            self._fragment_errors.append((*fragments[index], path, reason))
+
+    def _sort_errors(self, errors):
+        """Returns the errors of the document in the order, and with the
+        paths, that the validation of the whole document reports.
+
+        The errors of the released elements of a run follow those of the
+        element of the run kept in the tree.
+        """
+        elements = list(self._root.iter())
+        starts = {element: index for index, element in enumerate(elements)}
+        ends = {}
+        depths = {self._root: 0}
+        parents = {}
+        for element in elements:
+            for child in element:
+                parents[child] = element
+                depths[child] = depths[element] + 1
+        for element in reversed(elements):
+            ends[element] = (
+                ends[element[-1]] if len(element) else (starts[element] + 1)
+            )
+
+        keyed_errors = []
+        for error in errors:
+            element = error.elem
+            if element not in starts:
+                key = (0, 1, 0, 0)
+            elif hasattr(error, "index"):
+                # The errors of the children of an element are reported
+                # once all of them have been validated
+                key = (ends[element], 0, -depths[element], 0)
+            else:
+                key = (starts[element], 1, 0, 0)
+            path = error.path
+            if element in parents or element is self._root:
+                path = self._get_path(element, parents)
+            keyed_errors.append((key, XsdError(path, error.reason)))
+
+        for parent, anchor, ordinal, path, reason in self._fragment_errors:
+            key = (ends[anchor], 0, -depths[anchor], 1)
+            tag = anchor.tag
+            if self._counts[(parent, tag)] != 1:
+                tag = f"{tag}[{ordinal}]"
+            # The path of the error within the fragment starts with its tag
+            relative_path = (path or "")[len(anchor.tag) + 1 :]
+            path = self._get_path(parent, parents) + "/" + tag + relative_path
+            keyed_errors.append((key, XsdError(path, reason)))
+
+        keyed_errors.sort(key=lambda keyed_error: keyed_error[0])
+        return [error for _, error in keyed_errors]
+
+    def _get_path(self, element, parents):
+        """Returns the path of an element in the whole document."""
+        parts = []
+        while element in parents:
+            parent = parents[element]
+            count = self._counts.get((parent, element.tag))
+            if count is None:
+                siblings = [c for c in parent if c.tag == element.tag]
+                count = len(siblings)
+                position = siblings.index(element) + 1
+            else:
+                position = self._ordinals[element]
+            parts.append(
+                element.tag if count == 1 else f"{element.tag}[{position}]"
+            )
+            element = parent
+        parts.append(element.tag)
+        return "/" + "/".join(reversed(parts))
+
+
+def _find_declaration(xsd, path):
+    """Returns the schema declaration found at a path."""
+    declaration = xsd.find(path)
+    if declaration is None:
+        raise ValueError(f"No schema declaration for '{path}'.")
+    return declaration
+
+
+def _validate_fragments(get_declaration, fragments):
+    """Validates fragments against their schema declarations.
+
+    Args:
+        get_declaration (callable): Returns the declaration at a path.
+        fragments (list of tuple): The path of the declaration of each
+            fragment, and the fragment as an element or as XML content.
+
+    Returns:
+        list of tuple: The position of the fragment, the path of the
+        invalid element within it and the reason of each error.
+    """
+    errors = []
+    for index, (path, fragment) in enumerate(fragments):
+        if isinstance(fragment, bytes):
+            fragment = et.fromstring(fragment)
+        for error in get_declaration(path).iter_errors(fragment):
+            errors.append((index, error.path, error.reason))
+    return errors
+
+
+def _init_worker(xsd_file_path):
+    """Compiles the XSD schema once per worker process."""
+    global _worker_xsd
+    _worker_xsd = load_xsd_schema(xsd_file_path)
+    _worker_declarations.clear()
+
+
+def _get_worker_declaration(path):
+    """Returns the schema declaration of a fragment in a worker process."""
+    if path not in _worker_declarations:
+        _worker_declarations[path] = _find_declaration(_worker_xsd, path)
+    return _worker_declarations[path]
+
+
+def _validate_batch(fragments):
+    """Validates a batch of fragments in a worker process."""
+    return _validate_fragments(_get_worker_declaration, fragments)
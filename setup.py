@@ -47,7 +47,7 @@ setup(
         "Topic :: Software Development :: Libraries :: Python Modules",
     ],
     keywords="pain001,iso20022,payment-processing,automate-payments,sepa,financial,banking-payments,csv,sqlite",
-    packages=find_packages(exclude=["docs", "tests*"]),
+    packages=find_packages(exclude=["benchmarks*", "docs", "tests*"]),
     install_requires=[
         "click==8.1.7",
         "colorama==0.4.6",
@@ -0,0 +1,175 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from pain001.__main__ import cli
+from pain001.core.batch import find_data_files, process_batch
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.xml_message_type = "pain.001.001.03"
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+        source = "pain001/templates/pain.001.001.03"
+        self.xml_file_path = os.path.join(source, "template.xml")
+        self.xsd_file_path = os.path.join(source, "pain.001.001.03.xsd")
+        with open(os.path.join(source, "pain.001.001.03.xml")) as f:
+            self.expected = f.read()
+
+        self.data_dir = os.path.join(self.directory, "data")
+        os.makedirs(self.data_dir)
+        for name in ["a.csv", "b.csv", "c.csv"]:
+            shutil.copy(
+                os.path.join(source, "template.csv"),
+                os.path.join(self.data_dir, name),
+            )
+        with open(os.path.join(self.data_dir, "notes.txt"), "w") as f:
+            f.write("not a data file")
+        self.output_dir = os.path.join(self.directory, "out")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_find_data_files(self):
+        expected = [
+            os.path.join(self.data_dir, name)
+            for name in ["a.csv", "b.csv", "c.csv"]
+        ]
+        self.assertEqual(find_data_files(self.data_dir), expected)
+        self.assertEqual(
+            find_data_files(os.path.join(self.data_dir, "*")), expected
+        )
+
+        manifest = os.path.join(self.data_dir, "manifest.txt")
+        with open(manifest, "w") as f:
+            f.write("# entities\nc.csv\n\na.csv\n")
+        self.assertEqual(find_data_files(manifest), [expected[2], expected[0]])
+
+        with self.assertRaises(FileNotFoundError):
+            find_data_files(os.path.join(self.directory, "*.db"))
+
+    def test_process_batch(self):
+        for jobs in [1, 2]:
+            output_dir = f"{self.output_dir}{jobs}"
+            results = list(
+                process_batch(
+                    self.xml_message_type,
+                    self.xml_file_path,
+                    self.xsd_file_path,
+                    find_data_files(self.data_dir),
+                    output_dir=output_dir,
+                    jobs=jobs,
+                )
+            )
+            self.assertEqual(len(results), 3)
+            self.assertTrue(all(result["ok"] for result in results))
+            for name in ["a.xml", "b.xml", "c.xml"]:
+                with open(os.path.join(output_dir, name)) as f:
+                    self.assertEqual(f.read(), self.expected)
+
+    def test_process_batch_reports_failures(self):
+        with open(os.path.join(self.data_dir, "b.csv"), "w") as f:
+            f.write("id,date\n1,\n")
+        results = {
+            os.path.basename(result["data_file_path"]): result
+            for result in process_batch(
+                self.xml_message_type,
+                self.xml_file_path,
+                self.xsd_file_path,
+                find_data_files(self.data_dir),
+                output_dir=self.output_dir,
+                jobs=1,
+            )
+        }
+        self.assertTrue(results["a.csv"]["ok"])
+        self.assertFalse(results["b.csv"]["ok"])
+        self.assertIn("Invalid CSV data", results["b.csv"]["error"])
+        self.assertTrue(results["c.csv"]["ok"])
+
+    def test_process_batch_does_not_overwrite_template(self):
+        # The template and the Data file share a directory and a name
+        source = "pain001/templates/pain.001.001.03"
+        for name in ["template.xml", "template.csv"]:
+            shutil.copy(os.path.join(source, name), self.directory)
+        xml_file_path = os.path.join(self.directory, "template.xml")
+        with open(xml_file_path) as f:
+            template = f.read()
+
+        with self.assertRaises(ValueError) as context:
+            list(
+                process_batch(
+                    self.xml_message_type,
+                    xml_file_path,
+                    self.xsd_file_path,
+                    find_data_files(os.path.join(self.directory, "*.csv")),
+                    jobs=1,
+                )
+            )
+        self.assertIn("--output_dir", str(context.exception))
+        with open(xml_file_path) as f:
+            self.assertEqual(f.read(), template)
+
+    def test_process_batch_rejects_duplicate_names(self):
+        os.makedirs(os.path.join(self.data_dir, "sub"))
+        shutil.copy(
+            os.path.join(self.data_dir, "a.csv"),
+            os.path.join(self.data_dir, "sub", "a.csv"),
+        )
+        with self.assertRaises(ValueError):
+            list(
+                process_batch(
+                    self.xml_message_type,
+                    self.xml_file_path,
+                    self.xsd_file_path,
+                    find_data_files(
+                        os.path.join(self.data_dir, "**", "*.csv")
+                    ),
+                    output_dir=self.output_dir,
+                )
+            )
+
+    def test_cli_batch(self):
+        result = CliRunner().invoke(
+            cli,
+            [
+                "-t",
+                self.xml_message_type,
+                "-m",
+                self.xml_file_path,
+                "-s",
+                self.xsd_file_path,
+                "--batch",
+                self.data_dir,
+                "--output_dir",
+                self.output_dir,
+                "--jobs",
+                "1",
+            ],
+        )
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Processed 3 file(s), 0 failed", result.output)
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "c.xml")))
+
+
+if __name__ == "__main__":
+    unittest.main()
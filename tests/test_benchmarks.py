@@ -0,0 +1,70 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import tempfile
+import unittest
+
+from benchmarks.generate_data import MESSAGE_TYPES, generate_rows
+from benchmarks.run_benchmarks import (
+    STAGES,
+    compare_results,
+    run_benchmarks,
+)
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generate_rows(self):
+        rows = generate_rows("pain.001.001.03", 3)
+        self.assertEqual(len({row["payment_id"] for row in rows}), 3)
+        self.assertEqual({row["nb_of_txs"] for row in rows}, {"3"})
+        self.assertEqual(generate_rows("pain.001.001.03", 3), rows)
+
+    def test_run_benchmarks(self):
+        # The synthetic data of every message type must be valid
+        with tempfile.TemporaryDirectory() as data_dir:
+            results = run_benchmarks(
+                MESSAGE_TYPES, [3], ["csv", "db"], data_dir
+            )
+        self.assertEqual(len(results["results"]), 2 * len(MESSAGE_TYPES))
+        for result in results["results"]:
+            self.assertEqual(tuple(result["stages"]), STAGES)
+            self.assertGreater(result["size"], 0)
+
+    def test_compare_results(self):
+        def results(render):
+            return {
+                "results": [
+                    {
+                        "message_type": "pain.001.001.03",
+                        "rows": 1000,
+                        "format": "csv",
+                        "stages": dict(
+                            dict.fromkeys(STAGES, 1.0), render=render
+                        ),
+                        "total": 4.0 + render,
+                    }
+                ]
+            }
+
+        self.assertEqual(compare_results(results(1.1), results(1.0)), [])
+        self.assertEqual(
+            compare_results(results(2.0), results(1.0)),
+            [(("pain.001.001.03", 1000, "csv"), "render", 1.0, 2.0)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,7 @@
 
 
 import logging
+import tracemalloc
 import unittest
 
 from pain001.context.context import Context
@@ -93,6 +94,47 @@ class TestContext(unittest.TestCase):
         context.set_log_level(logging.DEBUG)
         self.assertEqual(context.logger.level, logging.DEBUG)
 
+    def test_metrics(self):
+        """Test the timers, counters and gauges."""
+        context = Context.get_instance()
+        for _ in range(2):
+            with context.timer("render"):
+                pass
+        context.increment("rows", 3)
+        context.increment("rows")
+        context.set_gauge("messages", 2)
+
+        metrics = context.get_metrics()
+        self.assertEqual(metrics["timers"]["render"]["calls"], 2)
+        self.assertGreaterEqual(metrics["timers"]["render"]["seconds"], 0)
+        self.assertEqual(metrics["counters"], {"rows": 4})
+        self.assertEqual(metrics["gauges"], {"messages": 2})
+
+        context.reset_metrics()
+        self.assertEqual(
+            context.get_metrics(),
+            {"timers": {}, "counters": {}, "gauges": {}},
+        )
+
+    def test_timer_peak_memory(self):
+        """Test that timers record the peak memory of nested stages."""
+        context = Context.get_instance()
+        tracemalloc.start()
+        try:
+            with context.timer("total"):
+                with context.timer("load"):
+                    data = bytearray(1_000_000)
+                    del data
+                with context.timer("write"):
+                    pass
+        finally:
+            tracemalloc.stop()
+
+        timers = context.get_metrics()["timers"]
+        self.assertGreaterEqual(timers["load"]["peak_memory"], 1_000_000)
+        self.assertLess(timers["write"]["peak_memory"], 1_000_000)
+        self.assertGreaterEqual(timers["total"]["peak_memory"], 1_000_000)
+
 
 if __name__ == "__main__":
     unittest.main()
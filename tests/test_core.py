@@ -15,6 +15,7 @@
 
 
 import os
+import tempfile
 import unittest
 from unittest.mock import patch
 from io import StringIO
@@ -171,6 +172,16 @@ class TestProcessFiles(unittest.TestCase):
                 self.csv_file_path,
             )
 
+    def test_invalid_xml_engine(self):
+        with self.assertRaises(ValueError):
+            process_files(
+                "pain.001.001.03",
+                self.xml_template_file_path,
+                self.xsd_schema_file_path,
+                self.csv_file_path,
+                engine="invalid",
+            )
+
     def test_missing_xml_template_file(self):
         with self.assertRaises(FileNotFoundError):
             with self.assertLogs(level="ERROR") as log:
@@ -246,10 +257,41 @@ class TestProcessFiles(unittest.TestCase):
             )
             mock_generate_xml.assert_called_once()
 
+    def quarantine_file_path(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return os.path.join(directory.name, "quarantine.csv")
+
+    def test_invalid_csv_data_quarantined(self):
+        quarantine_file_path = self.quarantine_file_path()
+        with patch("pain001.core.core.stream_xml") as mock_stream_xml:
+            process_files(
+                self.xml_message_type,
+                self.xml_template_file_path,
+                self.xsd_schema_file_path,
+                self.invalid_csv_file_path,
+                quarantine_file_path=quarantine_file_path,
+            )
+        args, kwargs = mock_stream_xml.call_args
+        self.assertEqual(list(args[0]), [])
+        self.assertTrue(kwargs["compute_totals"])
+        with open(quarantine_file_path) as f:
+            self.assertIn("errors", f.readline())
+
+    def test_quarantine_requires_csv_data(self):
+        with self.assertRaises(ValueError):
+            process_files(
+                self.xml_message_type,
+                self.xml_template_file_path,
+                self.xsd_schema_file_path,
+                self.sqlite_file_path,
+                quarantine_file_path=self.quarantine_file_path(),
+            )
+
     def test_valid_sqlite_data(self):
         with (
             patch("pain001.core.core.load_db_data", return_value=[{}]),
-            patch("pain001.core.core.validate_db_data", return_value=True),
+            patch("pain001.core.core.validate_db_table", return_value=True),
             patch("pain001.core.core.generate_xml") as mock_generate_xml,
         ):
             process_files(
@@ -263,7 +305,7 @@ class TestProcessFiles(unittest.TestCase):
     def test_invalid_sqlite_data(self):
         with (
             patch("pain001.core.core.load_db_data", return_value=[{}]),
-            patch("pain001.core.core.validate_db_data", return_value=False),
+            patch("pain001.core.core.validate_db_table", return_value=False),
         ):
             with self.assertRaises(ValueError):
                 process_files(
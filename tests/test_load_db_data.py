@@ -16,7 +16,12 @@
 
 import pytest
 import sqlite3
-from pain001.db.load_db_data import sanitize_table_name, load_db_data
+from pain001.db.load_db_data import (
+    iter_db_data,
+    load_db_data,
+    sanitize_table_name,
+)
+from pain001.xml.prepare_xml_data import get_message_columns
 
 
 # Test sanitize_table_name function
@@ -58,6 +63,47 @@ def test_load_db_data(tmp_path):
         load_db_data(db_file, "non_existent_table")
 
 
+# Test iter_db_data function
+def test_iter_db_data(tmp_path):
+    db_file = tmp_path / "test.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        "CREATE TABLE test_table "
+        "(id INTEGER PRIMARY KEY, name TEXT, note TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO test_table (name, note) VALUES (?, ?)",
+        [(f"Name{i}", "x") for i in range(5)],
+    )
+    conn.commit()
+    conn.close()
+
+    # Only the requested columns present in the table are selected
+    rows = iter_db_data(
+        db_file, "test_table", columns=["name", "missing"], arraysize=2
+    )
+    assert next(rows) == {"name": "Name0"}
+    assert [row["name"] for row in rows] == [f"Name{i}" for i in range(1, 5)]
+
+    # Errors are raised before the first row is requested
+    with pytest.raises(FileNotFoundError):
+        iter_db_data("non_existent.db", "test_table")
+    with pytest.raises(sqlite3.OperationalError):
+        iter_db_data(db_file, "non_existent_table")
+    with pytest.raises(sqlite3.OperationalError):
+        iter_db_data(db_file, "test_table", columns=["missing"])
+
+
+# Test get_message_columns function
+def test_get_message_columns():
+    columns = get_message_columns("pain.001.001.03")
+    assert columns[0] == "id"
+    assert "payment_amount" in columns
+    assert len(columns) == len(set(columns))
+    with pytest.raises(ValueError):
+        get_message_columns("pain.001.001.99")
+
+
 # If the script is executed directly, run the tests
 if __name__ == "__main__":
     pytest.main()
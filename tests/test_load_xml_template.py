@@ -0,0 +1,51 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+
+from pain001.xml.load_xml_template import (
+    load_bundled_xml_template,
+    load_xml_template,
+)
+
+
+class TestLoadXmlTemplate(unittest.TestCase):
+    def test_template_is_compiled_once(self):
+        template = load_xml_template("tests/data/template.xml")
+        self.assertIs(
+            load_xml_template(os.path.abspath("tests/data/template.xml")),
+            template,
+        )
+
+    def test_bundled_template_does_not_depend_on_cwd(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                template = load_bundled_xml_template("pain.001.001.03")
+            finally:
+                os.chdir(cwd)
+        self.assertTrue(
+            template.filename.endswith(
+                os.path.join("pain.001.001.03", "template.xml")
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
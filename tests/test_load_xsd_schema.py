@@ -0,0 +1,76 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pain001.xml.load_xsd_schema import (
+    clear_xsd_schema_cache,
+    load_xsd_schema,
+)
+
+
+class TestLoadXsdSchema(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.xsd_file_path = os.path.join(self.directory, "schema.xsd")
+        self.cache_dir = os.path.join(self.directory, "cache")
+        with open(self.xsd_file_path, "w") as f:
+            f.write(
+                """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+                    <xs:element name="root" type="xs:string"/>
+                </xs:schema>"""
+            )
+        clear_xsd_schema_cache()
+
+    def tearDown(self):
+        clear_xsd_schema_cache()
+        shutil.rmtree(self.directory)
+
+    def test_schema_is_compiled_once(self):
+        schema = load_xsd_schema(self.xsd_file_path)
+        self.assertIs(load_xsd_schema(self.xsd_file_path), schema)
+
+    def test_schema_is_recompiled_when_modified(self):
+        schema = load_xsd_schema(self.xsd_file_path)
+        stat = os.stat(self.xsd_file_path)
+        os.utime(
+            self.xsd_file_path,
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000),
+        )
+        self.assertIsNot(load_xsd_schema(self.xsd_file_path), schema)
+
+    def test_schema_is_loaded_from_disk_cache(self):
+        load_xsd_schema(self.xsd_file_path, cache_dir=self.cache_dir)
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.cache_dir, "schemas"))), 1
+        )
+
+        # A new process starts with an empty in-memory cache
+        clear_xsd_schema_cache()
+        with patch("xmlschema.XMLSchema") as m:
+            schema = load_xsd_schema(
+                self.xsd_file_path, cache_dir=self.cache_dir
+            )
+            m.assert_not_called()
+        self.assertTrue(schema.is_valid("<root>text</root>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
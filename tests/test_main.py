@@ -13,6 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import os
+import shutil
+
 from click.testing import CliRunner
 from pain001.__main__ import cli
 
@@ -45,6 +49,86 @@ class TestMain:
             in result.output
         )
 
+    def test_main_quiet(self):
+        result = self.runner.invoke(
+            cli,
+            [
+                "--quiet",
+                "--xml_message_type",
+                self.xml_message_type,
+                "--xml_template_file_path",
+                self.xml_file,
+                "--xsd_schema_file_path",
+                self.xsd_file,
+                "--data_file_path",
+                self.csv_file,
+            ],
+        )
+        assert result.exit_code == 0
+        assert result.output == ""
+
+        result = self.runner.invoke(
+            cli,
+            [
+                "--quiet",
+                "--xml_message_type",
+                self.xml_message_type,
+                "--xml_template_file_path",
+                self.xml_file,
+                "--xsd_schema_file_path",
+                self.xsd_file,
+                "--data_file_path",
+                "invalid",
+            ],
+        )
+        assert result.exit_code == 1
+        assert "The data file 'invalid' does not exist." in result.output
+
+    def test_main_profile(self, tmp_path):
+        profile_file_path = tmp_path / "profile.json"
+        result = self.runner.invoke(
+            cli,
+            [
+                "--profile",
+                str(profile_file_path),
+                "--xml_message_type",
+                self.xml_message_type,
+                "--xml_template_file_path",
+                self.xml_file,
+                "--xsd_schema_file_path",
+                self.xsd_file,
+                "--data_file_path",
+                self.csv_file,
+            ],
+        )
+        assert result.exit_code == 0
+        report = json.loads(profile_file_path.read_text())
+        assert report["rows"] > 0
+        assert "render" in report["stages"]
+
+    def test_main_direct_engine(self):
+        outputs = []
+        for engine in ("jinja", "direct"):
+            result = self.runner.invoke(
+                cli,
+                [
+                    "--engine",
+                    engine,
+                    "--xml_message_type",
+                    self.xml_message_type,
+                    "--xml_template_file_path",
+                    self.xml_file,
+                    "--xsd_schema_file_path",
+                    self.xsd_file,
+                    "--data_file_path",
+                    self.csv_file,
+                ],
+            )
+            assert result.exit_code == 0
+            with open("tests/data/pain.001.001.03.xml", "rb") as xml_file:
+                outputs.append(xml_file.read())
+        assert outputs[0] == outputs[1]
+
     def test_main_with_missing_xml_message_type(self):
         result = self.runner.invoke(
             cli,
@@ -161,3 +245,78 @@ class TestMain:
         )
         assert result.exit_code == 1
         assert "The data file 'invalid' does not exist." in result.output
+
+    def test_main_errors_file(self, tmp_path):
+        data_file = tmp_path / "data.csv"
+        with open(self.csv_file) as f:
+            lines = f.read().splitlines()
+        header = lines[0].split(",")
+        row = lines[1].split(",")
+        row[header.index("payment_amount")] = "abc"
+        data_file.write_text("\n".join([lines[0], ",".join(row)]) + "\n")
+        errors_file = tmp_path / "errors.csv"
+
+        arguments = [
+            "--xml_message_type",
+            self.xml_message_type,
+            "--xml_template_file_path",
+            self.xml_file,
+            "--xsd_schema_file_path",
+            self.xsd_file,
+            "--data_file_path",
+            str(data_file),
+            "--errors_file",
+            str(errors_file),
+        ]
+        result = self.runner.invoke(cli, arguments)
+        assert result.exit_code == 1
+        assert "payment_amount: 1 invalid, expected float" in result.output
+        assert errors_file.read_text().splitlines() == [
+            "row,column,error",
+            "1,payment_amount,invalid",
+        ]
+
+        result = self.runner.invoke(cli, arguments + ["--stream"])
+        assert result.exit_code == 1
+        assert "not available in batch or streaming mode" in result.output
+
+    def test_main_quarantine_file(self, tmp_path):
+        # The totals are computed with a template rendering every transaction
+        source = "pain001/templates/pain.001.001.03"
+        xml_file = shutil.copy(os.path.join(source, "template.xml"), tmp_path)
+        xsd_file = shutil.copy(
+            os.path.join(source, "pain.001.001.03.xsd"), tmp_path
+        )
+        data_file = tmp_path / "data.csv"
+        with open(os.path.join(source, "template.csv")) as f:
+            lines = f.read().splitlines()
+        header = lines[0].split(",")
+        row = lines[1].split(",")
+        row[header.index("payment_amount")] = "abc"
+        data_file.write_text("\n".join([lines[0], ",".join(row)] + lines[2:]))
+        quarantine_file = tmp_path / "quarantine.csv"
+
+        arguments = [
+            "--xml_message_type",
+            self.xml_message_type,
+            "--xml_template_file_path",
+            xml_file,
+            "--xsd_schema_file_path",
+            xsd_file,
+            "--data_file_path",
+            str(data_file),
+            "--quarantine_file",
+            str(quarantine_file),
+        ]
+        result = self.runner.invoke(cli, arguments)
+        assert result.exit_code == 0
+        assert "1 invalid row(s)" in result.output
+        rejected = quarantine_file.read_text().splitlines()
+        assert rejected[0] == lines[0] + ",errors"
+        assert rejected[1:] == [",".join(row) + ",payment_amount: invalid"]
+        output = (tmp_path / "pain.001.001.03.xml").read_text()
+        assert f"<NbOfTxs>{len(lines) - 2}</NbOfTxs>" in output
+
+        result = self.runner.invoke(cli, arguments + ["--resume"])
+        assert result.exit_code == 1
+        assert "quarantine file is not available" in result.output
@@ -0,0 +1,136 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import csv
+import datetime
+import io
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+from pain001 import generate_message
+from pain001.core.core import process_files
+
+MESSAGE_TYPE = "pain.001.001.03"
+TEMPLATES_DIR = os.path.join("pain001", "templates", MESSAGE_TYPE)
+CSV_FILE_PATH = os.path.join(TEMPLATES_DIR, "template.csv")
+
+
+class TestGenerateMessage(unittest.TestCase):
+    def setUp(self):
+        with open(CSV_FILE_PATH, encoding="utf-8") as f:
+            self.rows = list(csv.DictReader(f))
+
+    def test_matches_process_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_file_path = os.path.join(directory, "message.xml")
+            with patch("sys.stdout", new_callable=io.StringIO):
+                process_files(
+                    MESSAGE_TYPE,
+                    os.path.join(TEMPLATES_DIR, "template.xml"),
+                    os.path.join(TEMPLATES_DIR, f"{MESSAGE_TYPE}.xsd"),
+                    CSV_FILE_PATH,
+                    output_file_path=output_file_path,
+                )
+            with open(output_file_path, "rb") as f:
+                expected = f.read()
+
+        for engine in ("jinja", "direct"):
+            with self.subTest(engine=engine):
+                self.assertEqual(
+                    generate_message(self.rows, MESSAGE_TYPE, engine=engine),
+                    expected,
+                )
+
+    def test_write_to_file_like_object(self):
+        expected = generate_message(self.rows, MESSAGE_TYPE)
+        output = io.BytesIO()
+
+        result = generate_message(iter(self.rows), MESSAGE_TYPE, output)
+
+        self.assertIsNone(result)
+        self.assertEqual(output.getvalue(), expected)
+
+    def test_tuple_rows(self):
+        columns = list(self.rows[0])
+        rows = (tuple(row.values()) for row in self.rows)
+
+        self.assertEqual(
+            generate_message(rows, MESSAGE_TYPE, columns=columns),
+            generate_message(self.rows, MESSAGE_TYPE),
+        )
+
+    def test_tuple_rows_need_columns(self):
+        rows = [tuple(row.values()) for row in self.rows]
+
+        with self.assertRaises(ValueError):
+            generate_message(rows, MESSAGE_TYPE)
+        with self.assertRaises(ValueError):
+            generate_message(rows, MESSAGE_TYPE, columns=["id"])
+
+    def test_typed_values(self):
+        rows = [
+            dict(
+                row,
+                batch_booking=row["batch_booking"] == "true",
+                payment_amount=Decimal(row["payment_amount"]),
+                nb_of_txs=int(row["nb_of_txs"]),
+                requested_execution_date=datetime.date.fromisoformat(
+                    row["requested_execution_date"]
+                ),
+            )
+            for row in self.rows
+        ]
+
+        self.assertEqual(
+            generate_message(rows, MESSAGE_TYPE),
+            generate_message(self.rows, MESSAGE_TYPE),
+        )
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_invalid_rows(self, mock_stdout):
+        self.rows[1]["payment_amount"] = "not an amount"
+        output = io.BytesIO()
+
+        with self.assertRaises(ValueError):
+            generate_message(self.rows, MESSAGE_TYPE, output)
+        self.assertIn("payment_amount", mock_stdout.getvalue())
+
+    def test_no_rows(self):
+        with self.assertRaises(ValueError):
+            generate_message([], MESSAGE_TYPE)
+
+    def test_invalid_message_type(self):
+        with self.assertRaises(ValueError):
+            generate_message(self.rows, "pain.001.001.99")
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            generate_message(self.rows, MESSAGE_TYPE, engine="invalid")
+
+    def test_missing_template(self):
+        with self.assertRaises(FileNotFoundError):
+            generate_message(
+                self.rows,
+                MESSAGE_TYPE,
+                xml_template_file_path="non_existent_template.xml",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import subprocess
+import sys
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.cli.output import print_banner, quiet_output
+
+
+class TestOutput(unittest.TestCase):
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_banner_is_not_printed_without_terminal(self, mock_stdout):
+        print_banner()
+        self.assertEqual(mock_stdout.getvalue(), "")
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_quiet_output(self, mock_stdout):
+        with quiet_output():
+            print("done")
+        self.assertEqual(mock_stdout.getvalue(), "")
+
+        with self.assertRaises(SystemExit):
+            with quiet_output():
+                print("failed")
+                sys.exit(1)
+        self.assertEqual(mock_stdout.getvalue(), "failed\n")
+
+        with quiet_output(quiet=False):
+            print("shown")
+        self.assertEqual(mock_stdout.getvalue(), "failed\nshown\n")
+
+    def test_import_is_lazy(self):
+        # Importing the command line or the library must neither print
+        # anything nor load the template and schema engines
+        code = (
+            "import sys, pain001.__main__, pain001.core.core; "
+            "print(sorted({'jinja2', 'rich', 'xmlschema'} & set(sys.modules)))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout, "[]\n")
+        self.assertEqual(result.stderr, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.core.core import process_files
+from pain001.core.output_cache import (
+    compute_digest,
+    fetch_cached_output,
+    fetch_output,
+    get_output_cache_dir,
+    store_cached_output,
+    store_output,
+)
+
+SOURCE = "pain001/templates/pain.001.001.03"
+
+
+class TestOutputCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache_dir = os.path.join(self.directory, "cache", "outputs")
+        for name in ["template.xml", "template.csv", "pain.001.001.03.xsd"]:
+            shutil.copy(os.path.join(SOURCE, name), self.directory)
+        self.xml_template_file_path = os.path.join(
+            self.directory, "template.xml"
+        )
+        self.xsd_schema_file_path = os.path.join(
+            self.directory, "pain.001.001.03.xsd"
+        )
+        self.data_file_path = os.path.join(self.directory, "template.csv")
+        self.output_file_path = os.path.join(self.directory, "output.xml")
+
+    def digest(self, xml_message_type="pain.001.001.03"):
+        return compute_digest(
+            xml_message_type,
+            self.xml_template_file_path,
+            self.xsd_schema_file_path,
+            self.data_file_path,
+        )
+
+    def write_file(self, file_path, content):
+        with open(file_path, "w") as f:
+            f.write(content)
+        return file_path
+
+    def test_get_output_cache_dir(self):
+        with patch.dict(os.environ, {"PAIN001_CACHE_DIR": self.directory}):
+            self.assertEqual(
+                get_output_cache_dir(), os.path.join(self.directory, "outputs")
+            )
+        with patch.dict(os.environ, {"PAIN001_CACHE_DIR": ""}):
+            self.assertIsNone(get_output_cache_dir())
+
+    def test_digest_covers_every_input(self):
+        digest = self.digest()
+        self.assertEqual(self.digest(), digest)
+        self.assertNotEqual(self.digest("pain.001.001.09"), digest)
+        for file_path in (
+            self.data_file_path,
+            self.xml_template_file_path,
+            self.xsd_schema_file_path,
+        ):
+            with self.subTest(file_path=file_path):
+                with open(file_path, "a") as f:
+                    f.write("\n")
+                self.assertNotEqual(self.digest(), digest)
+                digest = self.digest()
+
+    def test_store_and_fetch(self):
+        xml_file_path = self.write_file(
+            os.path.join(self.directory, "a.xml"), "<a/>"
+        )
+        self.assertFalse(
+            fetch_output("digest", self.output_file_path, self.cache_dir)
+        )
+        self.assertFalse(os.path.exists(self.output_file_path))
+
+        self.assertTrue(store_output("digest", xml_file_path, self.cache_dir))
+        self.assertTrue(
+            fetch_output("digest", self.output_file_path, self.cache_dir)
+        )
+        with open(self.output_file_path) as f:
+            self.assertEqual(f.read(), "<a/>")
+
+    def test_eviction_of_least_recently_used(self):
+        xml_file_path = self.write_file(
+            os.path.join(self.directory, "a.xml"), "x" * 10
+        )
+        for number, digest in enumerate(["first", "second", "third"]):
+            store_output(digest, xml_file_path, self.cache_dir, max_size=25)
+            os.utime(
+                os.path.join(self.cache_dir, digest + ".xml"),
+                ns=(number, number),
+            )
+        # "first" was evicted, "second" then becomes the most recently used
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir)), ["second.xml", "third.xml"]
+        )
+        fetch_output("second", self.output_file_path, self.cache_dir)
+        store_output("fourth", xml_file_path, self.cache_dir, max_size=25)
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir)), ["fourth.xml", "second.xml"]
+        )
+
+        # An XML file larger than the cache is not stored
+        self.assertFalse(
+            store_output("large", xml_file_path, self.cache_dir, max_size=5)
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_fetch_and_store_cached_output(self, mock_stdout):
+        def fetch():
+            return fetch_cached_output(
+                "pain.001.001.03",
+                self.xml_template_file_path,
+                self.xsd_schema_file_path,
+                self.data_file_path,
+                self.output_file_path,
+            )
+
+        with patch.dict(os.environ, {"PAIN001_CACHE_DIR": ""}):
+            self.assertIsNone(fetch())
+
+        cache_dir = os.path.join(self.directory, "cache")
+        with patch.dict(os.environ, {"PAIN001_CACHE_DIR": cache_dir}):
+            # An XML file left by an earlier run is not stored
+            self.write_file(self.output_file_path, "<a/>")
+            lookup = fetch()
+            self.assertFalse(lookup.reused)
+            store_cached_output(lookup)
+            self.assertFalse(os.path.exists(self.cache_dir))
+
+            os.remove(self.output_file_path)
+            lookup = fetch()
+            self.write_file(self.output_file_path, "<b/>")
+            store_cached_output(lookup)
+            os.remove(self.output_file_path)
+
+            self.assertTrue(fetch().reused)
+            with open(self.output_file_path) as f:
+                self.assertEqual(f.read(), "<b/>")
+        self.assertIn("reused from the cache", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_process_files_reuses_output(self, mock_stdout):
+        def run(**kwargs):
+            process_files(
+                "pain.001.001.03",
+                self.xml_template_file_path,
+                self.xsd_schema_file_path,
+                self.data_file_path,
+                output_file_path=self.output_file_path,
+                **kwargs,
+            )
+            with open(self.output_file_path) as f:
+                return f.read()
+
+        cache_dir = os.path.join(self.directory, "cache")
+        with patch.dict(os.environ, {"PAIN001_CACHE_DIR": cache_dir}):
+            expected = run()
+            self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+            os.remove(self.output_file_path)
+
+            with patch("pain001.core.core.generate_xml") as generate_xml:
+                self.assertEqual(run(), expected)
+                self.assertEqual(run(stream=True), expected)
+                generate_xml.assert_not_called()
+            self.assertIn("reused from the cache", mock_stdout.getvalue())
+
+            with patch("pain001.core.core.generate_xml") as generate_xml:
+                run(cache=False)
+                generate_xml.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import unittest
+
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.xml.load_xml_template import (
+    bundled_templates_dir,
+    load_bundled_xml_template,
+)
+from pain001.xml.prepare_xml_data import (
+    MESSAGE_MAPPINGS,
+    get_message_columns,
+    get_payment_amount,
+    prepare_xml_data,
+)
+
+
+def load_rows(payment_initiation_message_type):
+    return list(
+        load_csv_data(
+            os.path.join(
+                bundled_templates_dir(),
+                payment_initiation_message_type,
+                "template.csv",
+            )
+        )
+    )
+
+
+class TestPrepareXmlData(unittest.TestCase):
+    def test_header_and_transactions(self):
+        rows = load_rows("pain.001.001.03")
+        xml_data = prepare_xml_data(rows[0], rows, "pain.001.001.03")
+
+        self.assertEqual(xml_data["id"], rows[0]["id"])
+        self.assertEqual(xml_data["debtor_name"], rows[0]["debtor_name"])
+        transactions = list(xml_data["transactions"])
+        self.assertEqual(len(transactions), len(rows))
+        for transaction, row in zip(transactions, rows):
+            self.assertEqual(transaction.payment_id, row["payment_id"])
+            self.assertEqual(
+                transaction.get("creditor_name"), row["creditor_name"]
+            )
+            self.assertIsNone(transaction.get("undefined"))
+            self.assertEqual(transaction.get("undefined", ""), "")
+
+    def test_transactions_are_read_lazily(self):
+        rows = load_rows("pain.001.001.09")
+
+        def read_rows():
+            yield rows[0]
+            raise AssertionError("Rows read before rendering")
+
+        xml_data = prepare_xml_data(rows[0], read_rows(), "pain.001.001.09")
+
+        self.assertEqual(
+            next(xml_data["transactions"]).payment_id, rows[0]["payment_id"]
+        )
+
+    def test_optional_columns_take_their_defaults(self):
+        rows = load_rows("pain.001.001.04")
+        for row in rows:
+            del row["payment_currency"]
+        xml_data = prepare_xml_data(rows[0], rows, "pain.001.001.04")
+
+        transactions = list(xml_data["transactions"])
+        self.assertEqual(
+            [transaction.payment_currency for transaction in transactions],
+            ["EUR"] * len(rows),
+        )
+        self.assertEqual(transactions[0].creditor_street, "")
+
+    def test_missing_required_column(self):
+        rows = load_rows("pain.001.001.03")
+        del rows[1]["creditor_name"]
+        xml_data = prepare_xml_data(rows[0], rows, "pain.001.001.03")
+
+        with self.assertRaises(KeyError):
+            list(xml_data["transactions"])
+
+    def test_message_without_transactions(self):
+        rows = load_rows("pain.001.001.05")
+        xml_data = prepare_xml_data(rows[0], rows, "pain.001.001.05")
+
+        self.assertNotIn("transactions", xml_data)
+
+    def test_invalid_message_type(self):
+        with self.assertRaises(ValueError) as context:
+            prepare_xml_data({}, [], "pain.001.001.99")
+        self.assertEqual(
+            str(context.exception),
+            "Error: Invalid XML message type: 'pain.001.001.99'.",
+        )
+        with self.assertRaises(ValueError):
+            get_message_columns("pain.001.001.99")
+
+    def test_invalid_payment_amount(self):
+        row = dict(load_rows("pain.001.001.03")[0], payment_amount="abc")
+        with self.assertRaises(ValueError) as context:
+            get_payment_amount(row)
+        self.assertEqual(
+            str(context.exception),
+            "Error: Invalid payment amount for payment "
+            f"'{row['payment_id']}'.",
+        )
+        self.assertNotIn(row["debtor_account_IBAN"], str(context.exception))
+
+    def test_get_message_columns(self):
+        for payment_initiation_message_type in MESSAGE_MAPPINGS:
+            with self.subTest(payment_initiation_message_type):
+                columns = get_message_columns(payment_initiation_message_type)
+                self.assertEqual(len(columns), len(set(columns)))
+                self.assertTrue(
+                    set(columns)
+                    <= set(load_rows(payment_initiation_message_type)[0])
+                    | {"creditor_street_name", "creditor_town_name"}
+                )
+
+    def test_records_render_like_dictionaries(self):
+        for payment_initiation_message_type in MESSAGE_MAPPINGS:
+            rows = load_rows(payment_initiation_message_type)
+            for engine in ("jinja", "direct"):
+                with self.subTest(
+                    payment_initiation_message_type, engine=engine
+                ):
+                    template = load_bundled_xml_template(
+                        payment_initiation_message_type, engine
+                    )
+                    xml_data = prepare_xml_data(
+                        rows[0], rows, payment_initiation_message_type
+                    )
+                    expected = dict(xml_data)
+                    if "transactions" in xml_data:
+                        expected["transactions"] = [
+                            transaction._asdict()
+                            for transaction in xml_data["transactions"]
+                        ]
+                        xml_data = prepare_xml_data(
+                            rows[0], rows, payment_initiation_message_type
+                        )
+
+                    self.assertEqual(
+                        template.render(**xml_data),
+                        template.render(**expected),
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
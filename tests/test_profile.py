@@ -0,0 +1,104 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.context.profile import build_profile_report, profile
+from pain001.core.core import process_files
+from pain001.xml.load_xsd_schema import load_xsd_schema
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profile_file_path = os.path.join(
+            self.temp_dir.name, "profile.json"
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_build_profile_report(self):
+        report = build_profile_report(
+            {
+                "timers": {
+                    "total": {"seconds": 4.0, "calls": 1, "peak_memory": 9},
+                    "load": {"seconds": 1.0, "calls": 1},
+                },
+                "counters": {"rows": 100},
+                "gauges": {},
+            }
+        )
+        self.assertEqual(report["wall_time"], 4.0)
+        self.assertEqual(report["rows_per_second"], 25.0)
+        self.assertEqual(report["peak_memory"], 9)
+        self.assertEqual(
+            report["stages"],
+            {
+                "load": {
+                    "wall_time": 1.0,
+                    "rows_per_second": 100.0,
+                    "peak_memory": None,
+                    "calls": 1,
+                }
+            },
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_profile_process_files(self, mock_stdout):
+        source = "pain001/templates/pain.001.001.03"
+        # Compiling the schema while memory is traced would be slow
+        load_xsd_schema(os.path.join(source, "pain.001.001.03.xsd"))
+        with profile(self.profile_file_path):
+            process_files(
+                "pain.001.001.03",
+                os.path.join(source, "template.xml"),
+                os.path.join(source, "pain.001.001.03.xsd"),
+                os.path.join(source, "template.csv"),
+                output_file_path=os.path.join(self.temp_dir.name, "out.xml"),
+            )
+
+        with open(self.profile_file_path) as profile_file:
+            report = json.load(profile_file)
+        self.assertEqual(report["rows"], 4)
+        self.assertGreater(report["peak_memory"], 0)
+        self.assertEqual(
+            list(report["stages"]),
+            [
+                "load",
+                "validate",
+                "register_namespaces",
+                "render",
+                "xsd_validate",
+                "write",
+            ],
+        )
+        self.assertGreater(report["counters"]["bytes_written"], 0)
+
+    def test_profile_is_written_on_failure(self):
+        with self.assertRaises(ValueError):
+            with profile(self.profile_file_path):
+                raise ValueError("failed")
+        self.assertTrue(os.path.exists(self.profile_file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+
+from pain001.xml.progress_journal import ProgressJournal
+
+ROWS = [{"payment_amount": "10.50"}, {"payment_amount": "2"}, {}]
+
+
+class TestProgressJournal(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.partial_xml_file_path = os.path.join(directory.name, "out.part")
+
+    def make_journal(self):
+        return ProgressJournal(self.partial_xml_file_path, "pain.001.001.03")
+
+    def write(self, journal, rows):
+        """Writes one chunk of content per row, as a template would."""
+        with journal.open():
+            journal.write(b"<Header/>")
+            for number, _ in enumerate(journal.track(rows)):
+                journal.write(f"<Tx{number}/>".encode())
+            journal.close()
+
+    def test_checkpoints(self):
+        journal = self.make_journal()
+        journal.checkpoint_rows = 2
+        self.write(journal, ROWS)
+
+        with open(journal.journal_file_path) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint["rows"], 2)
+        self.assertEqual(checkpoint["bytes"], len(b"<Header/><Tx0/><Tx1/>"))
+        self.assertEqual(checkpoint["prefix_bytes"], len(b"<Header/><Tx0/>"))
+        self.assertEqual(Decimal(checkpoint["control_sum"]), Decimal("12.5"))
+        self.assertEqual(journal.control_sum, Decimal("12.5"))
+
+        journal.remove()
+        self.assertFalse(os.path.exists(journal.journal_file_path))
+
+    def test_invalid_payment_amount(self):
+        journal = self.make_journal()
+        with self.assertRaises(ValueError):
+            self.write(journal, ROWS + [{"payment_amount": "abc"}])
+
+    def test_load_without_journal(self):
+        self.assertIsNone(self.make_journal().load())
+
+    def test_load_resumes_from_checkpoint(self):
+        journal = self.make_journal()
+        journal.checkpoint_rows = 2
+        self.write(journal, ROWS)
+        with open(self.partial_xml_file_path, "ab") as f:
+            f.write(b"<Garbage")
+
+        journal = self.make_journal()
+        journal.checkpoint_rows = 2
+        self.assertEqual(journal.load()["rows"], 2)
+        self.write(journal, ROWS)
+        with open(self.partial_xml_file_path, "rb") as f:
+            self.assertEqual(f.read(), b"<Header/><Tx0/><Tx1/><Tx2/>")
+
+    def test_load_invalid_journal(self):
+        journal = self.make_journal()
+        with open(journal.journal_file_path, "w") as f:
+            f.write("{")
+        with self.assertRaises(ValueError):
+            journal.load()
+
+    def test_load_journal_of_another_message_type(self):
+        journal = self.make_journal()
+        journal.checkpoint_rows = 1
+        self.write(journal, ROWS)
+
+        journal = ProgressJournal(
+            self.partial_xml_file_path, "pain.001.001.09"
+        )
+        with self.assertRaises(ValueError):
+            journal.load()
+
+    def test_load_truncated_partial_file(self):
+        journal = self.make_journal()
+        journal.checkpoint_rows = 1
+        self.write(journal, ROWS)
+        with open(self.partial_xml_file_path, "r+b") as f:
+            f.truncate(4)
+
+        with self.assertRaises(ValueError):
+            self.make_journal().load()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.xml.generate_xml import generate_xml
+from pain001.xml.load_xml_template import load_xml_template
+from pain001.xml.prepare_xml_data import prepare_xml_data
+from pain001.xml.render_xml_parallel import render_xml_parallel
+
+TEMPLATES_DIR = os.path.join("pain001", "templates")
+
+
+class TestRenderXmlParallel(unittest.TestCase):
+    def load(self, message_type, count):
+        directory = os.path.join(TEMPLATES_DIR, message_type)
+        rows = load_csv_data(os.path.join(directory, "template.csv"))
+        data = [
+            dict(rows[index % len(rows)], payment_id=f"ID-{index}")
+            for index in range(count)
+        ]
+        return data, os.path.join(directory, "template.xml")
+
+    @patch("pain001.xml.render_xml_parallel.MIN_CHUNK_ROWS", 3)
+    def test_matches_serial_rendering(self):
+        for message_type in ("pain.001.001.03", "pain.001.001.09"):
+            with self.subTest(message_type=message_type):
+                data, xml_file_path = self.load(message_type, 20)
+                expected = load_xml_template(xml_file_path).render(
+                    **prepare_xml_data(data[0], data, message_type)
+                )
+                parts = render_xml_parallel(
+                    data, message_type, xml_file_path, jobs=2
+                )
+                self.assertGreater(len(parts), 3)
+                self.assertEqual("".join(parts), expected)
+
+    @patch("pain001.xml.render_xml_parallel.MIN_CHUNK_ROWS", 3)
+    def test_falls_back_to_serial_rendering(self):
+        data, xml_file_path = self.load("pain.001.001.03", 20)
+        self.assertIsNone(
+            render_xml_parallel(data, "pain.001.001.03", xml_file_path, 1)
+        )
+        self.assertIsNone(
+            render_xml_parallel(data[:5], "pain.001.001.03", xml_file_path, 2)
+        )
+        # The group header only template has no loop over the transactions
+        data, xml_file_path = self.load("pain.001.001.05", 20)
+        self.assertIsNone(
+            render_xml_parallel(data, "pain.001.001.05", xml_file_path, 2)
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("pain001.xml.render_xml_parallel.MIN_CHUNK_ROWS", 3)
+    def test_generate_xml_with_jobs(self, mock_stdout):
+        data, xml_file_path = self.load("pain.001.001.03", 20)
+        xsd_file_path = os.path.join(
+            TEMPLATES_DIR, "pain.001.001.03", "pain.001.001.03.xsd"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            contents = []
+            for jobs in (None, 2):
+                output_file_path = os.path.join(directory, f"{jobs}.xml")
+                generate_xml(
+                    data,
+                    "pain.001.001.03",
+                    xml_file_path,
+                    xsd_file_path,
+                    output_file_path,
+                    jobs=jobs,
+                )
+                with open(output_file_path) as f:
+                    contents.append(f.read())
+        self.assertEqual(contents[0], contents[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
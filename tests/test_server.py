@@ -0,0 +1,201 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import csv
+import http.client
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as et
+
+from click.testing import CliRunner
+
+from pain001.__main__ import cli
+from pain001.core.server import GenerationServer, find_templates
+
+MESSAGE_TYPE = "pain.001.001.03"
+NAMESPACE = "urn:iso:std:iso:20022:tech:xsd:pain.001.001.03"
+CSV_FILE_PATH = os.path.join(
+    "pain001", "templates", MESSAGE_TYPE, "template.csv"
+)
+
+
+class TestGenerationServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GenerationServer(
+            find_templates(xml_message_types=[MESSAGE_TYPE]), jobs=1
+        )
+        await self.server.start(port=0)
+        self.port = self.server.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def request(self, method, path, body=None, content_type=None):
+        """Sends one request and returns its status and JSON or XML body."""
+
+        def send():
+            connection = http.client.HTTPConnection("127.0.0.1", self.port)
+            headers = {"Content-Type": content_type} if content_type else {}
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            finally:
+                connection.close()
+
+        status, content = await asyncio.get_running_loop().run_in_executor(
+            None, send
+        )
+        if content.startswith(b"<?xml"):
+            return status, et.fromstring(content)
+        return status, json.loads(content)
+
+    async def test_health(self):
+        status, content = await self.request("GET", "/health")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(content["status"], "ok")
+        self.assertEqual(content["message_types"], [MESSAGE_TYPE])
+
+    async def test_generate_from_csv(self):
+        with open(CSV_FILE_PATH, "rb") as f:
+            body = f.read()
+        status, root = await self.request(
+            "POST", f"/{MESSAGE_TYPE}", body, "text/csv"
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(root.tag, f"{{{NAMESPACE}}}Document")
+        self.assertEqual(
+            len(root.findall(f".//{{{NAMESPACE}}}CdtTrfTxInf")), 4
+        )
+
+    async def test_generate_from_json_matches_csv(self):
+        with open(CSV_FILE_PATH, "rb") as f:
+            body = f.read()
+        with open(CSV_FILE_PATH, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        rows[0]["batch_booking"] = rows[0]["batch_booking"] == "true"
+
+        _, expected = await self.request(
+            "POST", f"/{MESSAGE_TYPE}", body, "text/csv"
+        )
+        status, root = await self.request(
+            "POST",
+            f"/{MESSAGE_TYPE}",
+            json.dumps(rows),
+            "application/json; charset=utf-8",
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(et.tostring(root), et.tostring(expected))
+
+    async def test_invalid_data(self):
+        status, content = await self.request(
+            "POST", f"/{MESSAGE_TYPE}", "id,date\n1,bad\n", "text/csv"
+        )
+
+        self.assertEqual(status, 422)
+        self.assertEqual(content["error"], "Error: Invalid CSV data.")
+        self.assertIn("Missing value(s)", content["output"][0])
+
+    async def test_invalid_json(self):
+        for body in ("[", "{}", "[]", '[{"id": [1]}]'):
+            with self.subTest(body=body):
+                status, content = await self.request(
+                    "POST", f"/{MESSAGE_TYPE}", body, "application/json"
+                )
+                self.assertEqual(status, 400)
+                self.assertTrue(content["error"].startswith("Error:"))
+
+    async def test_request_errors(self):
+        for method, path, content_type, expected_status in (
+            ("POST", f"/{MESSAGE_TYPE}", "text/plain", 415),
+            ("POST", f"/{MESSAGE_TYPE}", None, 415),
+            ("POST", "/pain.001.001.09", "text/csv", 404),
+            ("GET", f"/{MESSAGE_TYPE}", None, 405),
+            ("POST", "/health", "text/csv", 405),
+        ):
+            with self.subTest(method=method, path=path):
+                status, content = await self.request(
+                    method, path, "id\n1\n", content_type
+                )
+                self.assertEqual(status, expected_status)
+                self.assertIn("error", content)
+
+    async def test_keep_alive(self):
+        def send_twice():
+            connection = http.client.HTTPConnection("127.0.0.1", self.port)
+            try:
+                statuses = []
+                for _ in range(2):
+                    connection.request("GET", "/health")
+                    response = connection.getresponse()
+                    response.read()
+                    statuses.append(response.status)
+                return statuses
+            finally:
+                connection.close()
+
+        statuses = await asyncio.get_running_loop().run_in_executor(
+            None, send_twice
+        )
+        self.assertEqual(statuses, [200, 200])
+
+    async def test_malformed_request(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"GARBAGE\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 Bad Request"))
+
+
+class TestFindTemplates(unittest.TestCase):
+    def test_bundled_templates(self):
+        templates = find_templates()
+
+        self.assertIn(MESSAGE_TYPE, templates)
+        for xml_template_file_path, xsd_schema_file_path in templates.values():
+            self.assertTrue(os.path.isfile(xml_template_file_path))
+            self.assertTrue(os.path.isfile(xsd_schema_file_path))
+
+    def test_invalid_message_type(self):
+        with self.assertRaises(ValueError):
+            find_templates(xml_message_types=["pain.001.001.99"])
+
+    def test_missing_templates(self):
+        with tempfile.TemporaryDirectory() as templates_dir:
+            with self.assertRaises(FileNotFoundError):
+                find_templates(templates_dir)
+            with self.assertRaises(FileNotFoundError):
+                find_templates(templates_dir, [MESSAGE_TYPE])
+
+    def test_serve_command_with_invalid_message_type(self):
+        result = CliRunner().invoke(
+            cli, ["serve", "-q", "-t", "pain.001.001.99"]
+        )
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Invalid XML message type", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as et
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.xml.split_xml import split_rows, split_xml
+
+NAMESPACE = "{urn:iso:std:iso:20022:tech:xsd:pain.001.001.03}"
+
+
+class TestSplitXml(unittest.TestCase):
+    def setUp(self):
+        self.xml_message_type = "pain.001.001.03"
+        source = "pain001/templates/pain.001.001.03"
+        self.xml_file_path = os.path.join(source, "template.xml")
+        self.xsd_file_path = os.path.join(source, "pain.001.001.03.xsd")
+        rows = load_csv_data(os.path.join(source, "template.csv"))
+        self.data = []
+        for i in range(7):
+            row = dict(rows[0])
+            row["payment_id"] = f"PaymentID{i}"
+            row["payment_amount"] = str(100 * (i + 1))
+            self.data.append(row)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_file_path = os.path.join(self.temp_dir.name, "run.xml")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_split_rows(self):
+        chunks = split_rows(self.data, max_txs=3)
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+
+        # 100 + 200 + 300 | 400 | 500 | 600 | 700
+        chunks = split_rows(self.data, max_amount="700")
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1, 1, 1, 1])
+
+        row_size = sum(len(value) for value in self.data[0].values())
+        chunks = split_rows(
+            self.data, max_bytes=100 + 2 * row_size, base_size=100
+        )
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 2, 1])
+
+        with self.assertRaises(ValueError):
+            split_rows(self.data, max_amount="650")
+        with self.assertRaises(ValueError):
+            split_rows(self.data, max_bytes=10)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_split_xml(self, mock_stdout):
+        for jobs in [1, 2]:
+            paths = split_xml(
+                self.data,
+                self.xml_message_type,
+                self.xml_file_path,
+                self.xsd_file_path,
+                max_txs=3,
+                output_file_path=self.output_file_path,
+                jobs=jobs,
+            )
+            self.assertEqual(
+                [os.path.basename(path) for path in paths],
+                ["run-1.xml", "run-2.xml", "run-3.xml"],
+            )
+            payment_ids = []
+            for number, path in enumerate(paths, start=1):
+                header = et.parse(path).find(f".//{NAMESPACE}GrpHdr")
+                self.assertEqual(
+                    header.find(f"{NAMESPACE}MsgId").text, f"1-{number}"
+                )
+                self.assertEqual(
+                    header.find(f"{NAMESPACE}NbOfTxs").text,
+                    str(3 if number < 3 else 1),
+                )
+                payment_ids += [
+                    element.text
+                    for element in et.parse(path).iter(
+                        f"{NAMESPACE}EndToEndId"
+                    )
+                ]
+            self.assertEqual(
+                payment_ids, [row["payment_id"] for row in self.data]
+            )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_split_xml_removes_messages_on_error(self, mock_stdout):
+        self.data[5]["date"] = "not-a-date"
+        with self.assertRaises(SystemExit):
+            split_xml(
+                self.data,
+                self.xml_message_type,
+                self.xml_file_path,
+                self.xsd_file_path,
+                max_txs=1,
+                output_file_path=self.output_file_path,
+                jobs=1,
+            )
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_split_xml_rejects_long_message_ids(self):
+        for row in self.data:
+            row["id"] = "M" * 34
+        with self.assertRaises(ValueError) as context:
+            split_xml(
+                self.data,
+                self.xml_message_type,
+                self.xml_file_path,
+                self.xsd_file_path,
+                max_txs=3,
+                output_file_path=self.output_file_path,
+                jobs=1,
+            )
+        self.assertIn("Max35Text", str(context.exception))
+        self.assertIn("M" * 34 + "-1", str(context.exception))
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_split_xml_requires_a_transaction_loop(self):
+        source = "pain001/templates/pain.001.001.05"
+        with self.assertRaises(ValueError):
+            split_xml(
+                load_csv_data(os.path.join(source, "template.csv")),
+                "pain.001.001.05",
+                os.path.join(source, "template.xml"),
+                os.path.join(source, "pain.001.001.05.xsd"),
+                max_txs=1,
+                output_file_path=self.output_file_path,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import csv
+import os
+import shutil
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.csv.load_csv_data import iter_csv_data, load_csv_data
+from pain001.csv.validate_csv_data import iter_valid_csv_data
+from pain001.xml.generate_xml import generate_xml
+from pain001.xml.stream_xml import stream_xml
+
+
+def crash_after(rows, count):
+    """Yields the first rows, then fails as a killed run would."""
+    yield from rows[:count]
+    raise KeyboardInterrupt
+
+
+class TestStreamXml(unittest.TestCase):
+    def setUp(self):
+        self.xml_message_type = "pain.001.001.03"
+        self.directory = "tests/data/stream"
+        os.makedirs(self.directory, exist_ok=True)
+        source = "pain001/templates/pain.001.001.03"
+        for name in ["template.xml", "template.csv", "pain.001.001.03.xsd"]:
+            shutil.copy(os.path.join(source, name), self.directory)
+        self.xml_file_path = os.path.join(self.directory, "template.xml")
+        self.xsd_file_path = os.path.join(
+            self.directory, "pain.001.001.03.xsd"
+        )
+        self.csv_file_path = os.path.join(self.directory, "template.csv")
+        self.output_file_path = os.path.join(
+            self.directory, "pain.001.001.03.xml"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_matches_generate(self, mock_stdout):
+        generate_xml(
+            load_csv_data(self.csv_file_path),
+            self.xml_message_type,
+            self.xml_file_path,
+            self.xsd_file_path,
+        )
+        with open(self.output_file_path) as f:
+            expected = f.read()
+
+        stream_xml(
+            iter_valid_csv_data(iter_csv_data(self.csv_file_path)),
+            self.xml_message_type,
+            self.xml_file_path,
+            self.xsd_file_path,
+        )
+        with open(self.output_file_path) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertFalse(os.path.exists(self.output_file_path + ".part"))
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_stops_at_invalid_row(self, mock_stdout):
+        rows = list(iter_csv_data(self.csv_file_path))
+        rows[2]["date"] = "not-a-date"
+        with self.assertRaises(ValueError):
+            stream_xml(
+                iter_valid_csv_data(rows),
+                self.xml_message_type,
+                self.xml_file_path,
+                self.xsd_file_path,
+            )
+        self.assertFalse(os.path.exists(self.output_file_path))
+        self.assertFalse(os.path.exists(self.output_file_path + ".part"))
+
+    @patch("pain001.xml.stream_xml.TOTALS_BATCH_ROWS", 2)
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_quarantines_invalid_rows(self, mock_stdout):
+        rows = list(iter_csv_data(self.csv_file_path)) * 2
+        rows[0] = dict(rows[0], payment_amount="abc")
+        rows[3] = dict(rows[3], debtor_name="", date="not-a-date")
+        valid_rows = [row for i, row in enumerate(rows) if i not in (0, 3)]
+        valid_rows[0] = dict(valid_rows[0], nb_of_txs=str(len(valid_rows)))
+        generate_xml(
+            valid_rows,
+            self.xml_message_type,
+            self.xml_file_path,
+            self.xsd_file_path,
+        )
+        expected = self.read_output()
+        os.remove(self.output_file_path)
+
+        quarantine_file_path = os.path.join(self.directory, "rejected.csv")
+        for engine in ("jinja", "direct"):
+            with self.subTest(engine=engine):
+                stream_xml(
+                    iter_valid_csv_data(rows, quarantine_file_path),
+                    self.xml_message_type,
+                    self.xml_file_path,
+                    self.xsd_file_path,
+                    engine=engine,
+                    compute_totals=True,
+                )
+                self.assertEqual(self.read_output(), expected)
+                self.assertEqual(
+                    os.listdir(self.directory).count("pain.001.001.03.xml"),
+                    1,
+                )
+                with open(quarantine_file_path, newline="") as f:
+                    rejected = list(csv.DictReader(f))
+                self.assertEqual(
+                    [row["errors"] for row in rejected],
+                    [
+                        "payment_amount: invalid",
+                        "debtor_name: missing; date: invalid",
+                    ],
+                )
+                self.assertEqual(
+                    rejected[1]["payment_id"], rows[3]["payment_id"]
+                )
+        self.assertIn("2 invalid row(s)", mock_stdout.getvalue())
+        self.assertFalse(
+            any(
+                name.endswith((".part", ".body"))
+                for name in os.listdir(self.directory)
+            )
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_computes_control_sum(self, mock_stdout):
+        source = "pain001/templates/pain.001.001.06"
+        with open(os.path.join(source, "template.xml")) as f:
+            template = f.read()
+        # Render one CdtTrfTxInf block per row
+        xml_file_path = os.path.join(self.directory, "loop.xml")
+        with open(xml_file_path, "w") as f:
+            f.write(
+                template.replace(
+                    "<CdtTrfTxInf>",
+                    "{% for transaction in transactions %}<CdtTrfTxInf>",
+                ).replace("</CdtTrfTxInf>", "</CdtTrfTxInf>{% endfor %}")
+            )
+        rows = list(iter_csv_data(os.path.join(source, "template.csv")))
+        rows.append(dict(rows[0], payment_amount="20.50"))
+        stream_xml(
+            rows,
+            "pain.001.001.06",
+            xml_file_path,
+            os.path.join(source, "pain.001.001.06.xsd"),
+            output_file_path=self.output_file_path,
+            compute_totals=True,
+        )
+        output = self.read_output().decode("utf-8")
+        self.assertEqual(output.count("<CdtTrfTxInf>"), 2)
+        self.assertIn("<NbOfTxs>2</NbOfTxs>", output)
+        self.assertIn("<CtrlSum>120.50</CtrlSum>", output)
+
+    def test_compute_totals_needs_a_loop(self):
+        # The template renders the first row only, whatever the rows
+        source = "pain001/templates/pain.001.001.05"
+        rows = iter(iter_csv_data(os.path.join(source, "template.csv")))
+        with self.assertRaises(ValueError):
+            stream_xml(
+                rows,
+                "pain.001.001.05",
+                os.path.join(source, "template.xml"),
+                os.path.join(source, "pain.001.001.05.xsd"),
+                output_file_path=self.output_file_path,
+                compute_totals=True,
+            )
+        self.assertIsNotNone(next(rows, None))
+        self.assertFalse(os.path.exists(self.output_file_path))
+
+    def test_compute_totals_is_not_resumable(self):
+        with self.assertRaises(ValueError):
+            stream_xml(
+                iter_csv_data(self.csv_file_path),
+                self.xml_message_type,
+                self.xml_file_path,
+                self.xsd_file_path,
+                resume=True,
+                compute_totals=True,
+            )
+
+    def stream(self, rows, engine="jinja", resume=True):
+        stream_xml(
+            rows,
+            self.xml_message_type,
+            self.xml_file_path,
+            self.xsd_file_path,
+            engine=engine,
+            resume=resume,
+        )
+
+    def read_output(self):
+        with open(self.output_file_path, "rb") as f:
+            return f.read()
+
+    @patch("pain001.xml.progress_journal.CHECKPOINT_ROWS", 1)
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_resume_after_crash(self, mock_stdout):
+        rows = list(iter_csv_data(self.csv_file_path))
+        journal_file_path = self.output_file_path + ".part.journal"
+        for engine in ("jinja", "direct"):
+            with self.subTest(engine=engine):
+                self.stream(rows, engine, resume=False)
+                expected = self.read_output()
+                os.remove(self.output_file_path)
+
+                with self.assertRaises(KeyboardInterrupt):
+                    self.stream(crash_after(rows, 3), engine)
+                self.assertFalse(os.path.exists(self.output_file_path))
+                self.assertTrue(os.path.exists(journal_file_path))
+
+                self.stream(rows, engine)
+                self.assertEqual(self.read_output(), expected)
+                self.assertIn("Resuming", mock_stdout.getvalue())
+                self.assertFalse(os.path.exists(journal_file_path))
+                self.assertFalse(
+                    os.path.exists(self.output_file_path + ".part")
+                )
+
+    @patch("pain001.xml.progress_journal.CHECKPOINT_ROWS", 1)
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_resume_with_changed_data(self, mock_stdout):
+        rows = list(iter_csv_data(self.csv_file_path))
+        with self.assertRaises(KeyboardInterrupt):
+            self.stream(crash_after(rows, 3))
+
+        rows[1]["payment_amount"] = "1.00"
+        with self.assertRaises(ValueError):
+            self.stream(rows)
+        self.assertFalse(os.path.exists(self.output_file_path))
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_resume_without_journal(self, mock_stdout):
+        rows = list(iter_csv_data(self.csv_file_path))
+        self.stream(rows, resume=False)
+        expected = self.read_output()
+
+        self.stream(rows)
+        self.assertEqual(self.read_output(), expected)
+        self.assertNotIn("Resuming", mock_stdout.getvalue())
+
+    def test_iter_csv_data_empty_file(self):
+        empty_file_path = os.path.join(self.directory, "empty.csv")
+        with open(empty_file_path, "w") as f:
+            f.write("")
+        with self.assertRaises(ValueError):
+            list(iter_csv_data(empty_file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import csv
+import datetime
+import os
+import tempfile
+import unittest
+
+from pain001.csv.validate_csv_columns import (
+    CsvValidationError,
+    compile_column_validator,
+    validate_csv_columns,
+)
+
+
+class TestValidateCsvColumns(unittest.TestCase):
+    def test_column_validators(self):
+        cases = [
+            (int, ["1", "+2", " 3 ", "x", "1.5", "", None], [5, 6], [3, 4]),
+            (float, ["1", "1.5", "1e3", "1,5", " "], [4], [3]),
+            (bool, ["true", "FALSE", "yes", ""], [3], [2]),
+            (
+                datetime.datetime,
+                ["2023-03-10T15:30:47.000Z", "2023-03-12", "12/03/2023"],
+                [],
+                [2],
+            ),
+            (str, ["a", "", "  ", None, "b"], [1, 2, 3], []),
+        ]
+        for data_type, values, missing, invalid in cases:
+            with self.subTest(data_type=data_type):
+                validate_column = compile_column_validator(data_type)
+                self.assertEqual(validate_column(values), (missing, invalid))
+
+    def test_valid_columns(self):
+        validate_column = compile_column_validator(int)
+        self.assertEqual(validate_column(["1", "2", "2", "3"]), ([], []))
+
+    def test_validate_csv_columns(self):
+        columns = {"id": int, "date": datetime.datetime, "name": str}
+        data = [
+            {"id": "1", "date": "2023-03-12", "name": "a"},
+            {"id": "x", "date": "2023-03-12", "name": ""},
+            {"id": "3", "date": "2023-03-12"},
+            {"id": "4", "date": "tomorrow", "name": "d"},
+        ]
+        report = validate_csv_columns(data, columns)
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.row_count, 4)
+        self.assertEqual(
+            report.errors,
+            [
+                CsvValidationError(1, "id", "invalid", "x"),
+                CsvValidationError(1, "name", "missing", ""),
+                CsvValidationError(2, "name", "missing", None),
+                CsvValidationError(3, "date", "invalid", "tomorrow"),
+            ],
+        )
+        self.assertEqual(list(report.rows()), [1, 2, 3])
+        self.assertEqual(report.error_counts()["name"], 2)
+
+        report = validate_csv_columns(data[:1], columns)
+        self.assertTrue(report.is_valid())
+
+    def test_capped_report(self):
+        columns = {"id": int, "name": str}
+        data = [{"id": "x", "name": ""}] * 3 + [{"id": "4", "name": ""}] * 3
+        report = validate_csv_columns(data, columns, max_examples=4)
+        self.assertEqual(
+            [(error.row, error.column) for error in report.errors],
+            [(0, "id"), (0, "name"), (1, "id"), (1, "name")],
+        )
+        self.assertEqual(report.error_count, 9)
+        self.assertEqual(report.error_counts(), {"id": 3, "name": 6})
+        self.assertEqual(len(report.rows()), 2)
+        self.assertEqual(
+            report.summary(),
+            [
+                "Error: 9 missing or invalid value(s) in 6 of 6 row(s).",
+                "  id: 3 invalid, expected int",
+                "  name: 6 missing",
+            ],
+        )
+
+        errors = list(report.iter_errors())
+        self.assertEqual(len(errors), 9)
+        self.assertEqual(
+            errors[:3],
+            [
+                (0, "id", "invalid"),
+                (0, "name", "missing"),
+                (1, "id", "invalid"),
+            ],
+        )
+        self.assertEqual(errors[-1], (5, "name", "missing"))
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "errors.csv")
+            report.write_errors(file_path)
+            with open(file_path, newline="") as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["row", "column", "error"])
+        self.assertEqual(
+            rows[1:],
+            [[str(row + 1), column, error] for row, column, error in errors],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,8 +14,18 @@
 # limitations under the License.
 
 
+import os
+import tempfile
 import unittest
-from pain001.csv.validate_csv_data import validate_csv_data
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.csv.validate_csv_data import (
+    MAX_ERROR_EXAMPLES,
+    iter_valid_csv_data,
+    validate_csv_data,
+)
 
 
 class TestValidateCsvData(unittest.TestCase):
@@ -117,6 +127,43 @@ class TestValidateCsvData(unittest.TestCase):
         ]
         self.assertFalse(validate_csv_data(data))
 
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_validate_csv_reports_capped_errors(self, mock_stdout):
+        row = load_csv_data("pain001/templates/pain.001.001.03/template.csv")[
+            0
+        ]
+        data = [dict(row, payment_amount="abc", debtor_name="")] * 1000
+        with tempfile.TemporaryDirectory() as directory:
+            errors_file_path = os.path.join(directory, "errors.csv")
+            self.assertFalse(validate_csv_data(data, errors_file_path))
+            with open(errors_file_path) as f:
+                self.assertEqual(len(f.readlines()), 2001)
+
+        output = mock_stdout.getvalue()
+        self.assertNotIn(row["debtor_account_IBAN"], output)
+        self.assertIn(
+            "Error: Missing value(s) for column(s) ['debtor_name'] in row 1\n",
+            output,
+        )
+        self.assertIn(
+            "Error: 2000 missing or invalid value(s) in 1000 of 1000 row(s).",
+            output,
+        )
+        self.assertIn("  payment_amount: 1000 invalid, expected float", output)
+        self.assertLess(len(output.splitlines()), MAX_ERROR_EXAMPLES + 5)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_reports_row_number(self, mock_stdout):
+        rows = load_csv_data("pain001/templates/pain.001.001.03/template.csv")
+        rows[1] = dict(rows[1], payment_amount="abc")
+        with self.assertRaises(ValueError):
+            list(iter_valid_csv_data(rows))
+
+        output = mock_stdout.getvalue()
+        self.assertIn("column(s) ['payment_amount']", output)
+        self.assertTrue(output.rstrip().endswith("in row 2"))
+        self.assertNotIn(rows[1]["debtor_account_IBAN"], output)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -14,9 +14,16 @@
 # limitations under the License.
 
 
+import os
+import sqlite3
+import tempfile
 import unittest
 from unittest.mock import patch
-from pain001.db.validate_db_data import validate_db_data
+from pain001.db.validate_db_data import (
+    required_columns,
+    validate_db_data,
+    validate_db_table,
+)
 
 
 class TestValidateDbData(unittest.TestCase):
@@ -90,5 +97,69 @@ class TestValidateDbData(unittest.TestCase):
         )
 
 
+class TestValidateDbTable(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, "test.db")
+        self.create_table(required_columns, rows=3)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_table(self, columns, rows):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("DROP TABLE IF EXISTS pain001")
+        conn.execute(
+            "CREATE TABLE pain001 ("
+            + ", ".join(f'"{column}"' for column in columns)
+            + ")"
+        )
+        conn.executemany(
+            "INSERT INTO pain001 VALUES ("
+            + ", ".join("?" for _ in columns)
+            + ")",
+            [[f"{column}-{i}" for column in columns] for i in range(rows)],
+        )
+        conn.commit()
+        conn.close()
+
+    def update(self, statement):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def test_validate_db_table_valid(self):
+        self.assertTrue(validate_db_table(self.db_file, "pain001"))
+
+    @patch("pain001.db.validate_db_data.logger.error")
+    def test_validate_db_table_missing_column(self, mock_logging_error):
+        self.create_table(required_columns[1:], rows=1)
+        self.assertFalse(validate_db_table(self.db_file, "pain001"))
+        mock_logging_error.assert_called_once_with(
+            "Error: Missing column(s) %s in table '%s'", ["id"], "pain001"
+        )
+
+    @patch("pain001.db.validate_db_data.logger.error")
+    def test_validate_db_table_missing_values(self, mock_logging_error):
+        self.update(
+            "UPDATE pain001 SET id = NULL, date = '  ' WHERE rowid = 2"
+        )
+        self.update("UPDATE pain001 SET currency = '' WHERE rowid = 3")
+        self.assertFalse(validate_db_table(self.db_file, "pain001"))
+        self.assertEqual(
+            [call.args[1:] for call in mock_logging_error.call_args_list],
+            [
+                (2, "pain001"),
+                (["id", "date"], 2),
+                (["currency"], 3),
+            ],
+        )
+
+    def test_validate_db_table_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            validate_db_table("missing.db", "pain001")
+
+
 if __name__ == "__main__":
     unittest.main()
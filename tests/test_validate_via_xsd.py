@@ -16,7 +16,7 @@
 
 import unittest
 import os
-from pain001.xml.validate_via_xsd import validate_via_xsd
+from pain001.xml.validate_via_xsd import find_xsd_errors, validate_via_xsd
 
 # Test if the XML file is validated correctly against the XSD schema
 
@@ -88,3 +88,65 @@ class TestValidateViaXsd(unittest.TestCase):
         """
         assert not validate_via_xsd(self.invalid_xml_file, self.xsd_file)
         assert not validate_via_xsd(self.invalid_xml_file, self.xsd_file)
+
+    def test_parallel_validation(self):
+        """
+        Test case for validating the transactions in worker processes.
+        """
+        directory = os.path.join("pain001", "templates", "pain.001.001.03")
+        xsd_file = os.path.join(directory, "pain.001.001.03.xsd")
+        assert validate_via_xsd(
+            os.path.join(directory, "pain.001.001.03.xml"), xsd_file, jobs=2
+        )
+        assert validate_via_xsd(self.valid_xml_file, self.xsd_file, jobs=2)
+        assert not validate_via_xsd(
+            self.invalid_xml_file, self.xsd_file, jobs=2
+        )
+        assert not validate_via_xsd("missing.xml", self.xsd_file, jobs=2)
+
+    def test_find_xsd_errors(self):
+        """
+        Test case for collecting a capped number of structured errors.
+        """
+        with open(self.invalid_xml_file, "w") as f:
+            f.write("<root>\n<element><b/></element>\n<element/>\n<b>")
+        assert find_xsd_errors(self.valid_xml_file, self.xsd_file) == []
+
+        errors = find_xsd_errors(self.invalid_xml_file, self.xsd_file, lazy=1)
+        self.assertEqual(
+            [(error.path, error.line) for error in errors],
+            [("/root/element[1]", 2), (None, 4)],
+        )
+        self.assertIn("child elements", errors[0].reason)
+        self.assertIn("no element found", errors[1].reason)
+
+        # The validation stops at the first error, before the syntax error
+        for kwargs in ({"fail_fast": True}, {"max_errors": 1}):
+            errors = find_xsd_errors(
+                self.invalid_xml_file, self.xsd_file, lazy=1, **kwargs
+            )
+            self.assertEqual([error.line for error in errors], [2])
+
+        with self.assertRaises(OSError):
+            find_xsd_errors("missing.xml", self.xsd_file)
+
+    def test_find_xsd_errors_in_message(self):
+        """
+        Test case for the path and line of an invalid transaction.
+        """
+        directory = os.path.join("pain001", "templates", "pain.001.001.03")
+        with open(os.path.join(directory, "pain.001.001.03.xml")) as f:
+            lines = f.read().splitlines(keepends=True)
+        line = max(i for i, text in enumerate(lines) if "<InstdAmt" in text)
+        lines[line] = lines[line].replace('">', '">abc', 1)
+        with open(self.invalid_xml_file, "w") as f:
+            f.writelines(lines)
+
+        errors = find_xsd_errors(
+            self.invalid_xml_file,
+            os.path.join(directory, "pain.001.001.03.xsd"),
+            fail_fast=True,
+        )
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].line, line + 1)
+        self.assertRegex(errors[0].path, r"/CdtTrfTxInf\[\d+\]/Amt/InstdAmt$")
@@ -0,0 +1,127 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as et
+
+from pain001.xml.write_xml_to_file import write_xml_to_file
+
+NAMESPACE = "urn:iso:std:iso:20022:tech:xsd:pain.001.001.03"
+
+
+class TestWriteXmlToFile(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.xml_file_path = os.path.join(directory.name, "output.xml")
+
+    def make_root(self):
+        return et.fromstring(
+            "<Document>\n"
+            "    <GrpHdr>\n"
+            "        <MsgId>Smith &amp; Sons &lt;Ltd&gt;</MsgId>\n"
+            '        <Amt Ccy="EUR">100.00</Amt>\n'
+            "        <Empty/>\n"
+            "    </GrpHdr>\n"
+            "</Document>"
+        )
+
+    def read(self):
+        with open(self.xml_file_path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_pretty_print(self):
+        root = self.make_root()
+        write_xml_to_file(self.xml_file_path, root)
+
+        self.assertEqual(
+            self.read(),
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            "<Document>\n"
+            "\t<GrpHdr>\n"
+            "\t\t<MsgId>Smith &amp; Sons &lt;Ltd&gt;</MsgId>\n"
+            '\t\t<Amt Ccy="EUR">100.00</Amt>\n'
+            "\t\t<Empty />\n"
+            "\t</GrpHdr>\n"
+            "</Document>\n",
+        )
+
+    def test_custom_indent(self):
+        write_xml_to_file(self.xml_file_path, self.make_root(), indent="  ")
+
+        self.assertIn("\n  <GrpHdr>\n    <MsgId>", self.read())
+
+    def test_compact(self):
+        write_xml_to_file(
+            self.xml_file_path, self.make_root(), pretty_print=False
+        )
+
+        content = self.read()
+        declaration, document = content.split("\n")
+        self.assertEqual(declaration, '<?xml version="1.0" encoding="UTF-8"?>')
+        self.assertTrue(
+            document.startswith("<Document>")
+            and document.endswith("</Document>")
+        )
+        self.assertIn("<GrpHdr><MsgId>", document)
+
+    def test_content_is_preserved(self):
+        expected = et.tostring(self.make_root())
+        for pretty_print in (True, False):
+            with self.subTest(pretty_print=pretty_print):
+                write_xml_to_file(
+                    self.xml_file_path,
+                    self.make_root(),
+                    pretty_print=pretty_print,
+                )
+                root = et.parse(self.xml_file_path).getroot()
+                et.indent(root, space="    ")
+                self.assertEqual(et.tostring(root), expected)
+
+    def test_root_is_not_changed(self):
+        for pretty_print in (True, False):
+            with self.subTest(pretty_print=pretty_print):
+                root = self.make_root()
+                expected = et.tostring(root)
+                write_xml_to_file(
+                    self.xml_file_path, root, pretty_print=pretty_print
+                )
+                self.assertEqual(et.tostring(root), expected)
+
+    def test_namespaces(self):
+        root = et.Element(f"{{{NAMESPACE}}}Document")
+        et.SubElement(root, f"{{{NAMESPACE}}}GrpHdr").text = "1"
+        write_xml_to_file(self.xml_file_path, root)
+
+        written_root = et.parse(self.xml_file_path).getroot()
+        self.assertEqual(written_root.tag, f"{{{NAMESPACE}}}Document")
+        self.assertEqual(written_root[0].tag, f"{{{NAMESPACE}}}GrpHdr")
+
+    def test_non_ascii_text(self):
+        root = et.Element("Nm")
+        root.text = "Société Générale – Zürich"
+        write_xml_to_file(self.xml_file_path, root)
+
+        self.assertEqual(
+            et.parse(self.xml_file_path).getroot().text,
+            "Société Générale – Zürich",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
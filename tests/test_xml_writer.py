@@ -0,0 +1,211 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import unittest
+import xml.etree.ElementTree as et
+
+from jinja2 import Environment
+
+from pain001.csv.load_csv_data import load_csv_data
+from pain001.xml.load_xml_template import (
+    load_bundled_xml_template,
+    load_xml_template,
+)
+from pain001.xml.prepare_xml_data import prepare_xml_data
+from pain001.xml.xml_writer import XmlWriter, load_xml_writer
+
+TEMPLATES_DIR = os.path.join("pain001", "templates")
+
+
+class TestXmlWriter(unittest.TestCase):
+    def assert_same_output(self, source, **context):
+        expected = (
+            Environment(autoescape=True).from_string(source).render(**context)
+        )
+        writer = XmlWriter(source)
+        self.assertEqual(writer.render(**context), expected)
+        self.assertEqual("".join(writer.stream(**context)), expected)
+
+    def test_matches_jinja_for_bundled_templates(self):
+        for message_type in sorted(os.listdir(TEMPLATES_DIR)):
+            with self.subTest(message_type=message_type):
+                directory = os.path.join(TEMPLATES_DIR, message_type)
+                rows = load_csv_data(os.path.join(directory, "template.csv"))
+                rows[0]["debtor_name"] = "Smith & Sons <\"Ltd\"> 'UK' {0}"
+                rows[-1] = {
+                    column: "" if "remittance" in column else value
+                    for column, value in rows[-1].items()
+                }
+                rows[-1]["payment_currency"] = None
+
+                expected = load_bundled_xml_template(message_type).render(
+                    **prepare_xml_data(rows[0], rows, message_type)
+                )
+                writer = load_xml_writer(
+                    os.path.join(directory, "template.xml")
+                )
+                self.assertEqual(
+                    writer.render(
+                        **prepare_xml_data(rows[0], rows, message_type)
+                    ),
+                    expected,
+                )
+                self.assertEqual(
+                    et.tostring(
+                        writer.build(
+                            **prepare_xml_data(rows[0], rows, message_type)
+                        )
+                    ),
+                    et.tostring(et.fromstring(expected)),
+                )
+
+    def test_escaping_and_undefined_values(self):
+        source = (
+            '<a x="{{ name }}">{# comment #}\r\n'
+            '{% for tx in txs %}<b i="{{ loop.index }}">{{tx.value}}'
+            "{% if tx.note %}<c>{{ tx.note }}</c>{% endif %}</b>"
+            "{% endfor %}{% if missing %}<d/>{% endif %}</a>\n"
+        )
+        self.assert_same_output(
+            source,
+            name="A & B",
+            txs=[
+                {"value": "<x>", "note": 'it\'s "quoted"'},
+                {"value": None, "note": ""},
+                {"value": 1.5},
+                {"value": "a\0b", "note": 0},
+            ],
+        )
+        self.assert_same_output(source)
+
+    def test_nested_loops(self):
+        self.assert_same_output(
+            "{% for group in groups %}{{ title }}"
+            "{% for tx in txs %}[{{ loop.index }}{{ tx.id }}]{% endfor %}"
+            "{% endfor %}",
+            title="<t>",
+            groups=[1, 2],
+            txs=[{"id": "a"}, {"id": "b"}],
+        )
+
+    def test_build_matches_parsed_render(self):
+        source = (
+            '<?xml version="1.0"?>\n<a xmlns="urn:x" x="{{ name }}">'
+            "<n>{{ name }}</n>\n"
+            '{% for tx in txs %}<b>\n<c i="{{ loop.index }}">{{tx.v}}</c>'
+            "{% if tx.note %}<d>{{ tx.note }}</d>{% endif %}\n"
+            "<e>id-{{ tx.v }}</e>tail {{ tx.note }}</b>{% endfor %}\n</a>"
+        )
+        context = dict(
+            name="A\tB\r\nC &amp;",
+            txs=[
+                {"v": "<x>", "note": "line\r\nbreak"},
+                {"v": "", "note": ""},
+                {"v": None},
+                {"v": 2.5, "note": "n"},
+            ],
+        )
+        writer = XmlWriter(source)
+        self.assertEqual(
+            et.tostring(writer.build(**context)),
+            et.tostring(et.fromstring(writer.render(**context))),
+        )
+
+    def test_build_requires_whole_elements_in_blocks(self):
+        writer = XmlWriter(
+            "<a>{% if open %}<b>{% endif %}text"
+            "{% if open %}</b>{% endif %}</a>"
+        )
+        self.assertEqual(writer.render(open=True), "<a><b>text</b></a>")
+        with self.assertRaises(ValueError):
+            writer.build(open=True)
+
+    def test_unsupported_syntax(self):
+        for source in (
+            "{{ name|upper }}",
+            "{{ name.field }}",
+            "{% set x = 1 %}",
+            "{%- if name %}{% endif %}",
+            "{% for tx in txs %}",
+            "{% for tx in txs %}{{ tx.items }}{% endfor %}",
+            "{% if a == b %}{% endif %}",
+        ):
+            with self.subTest(source=source):
+                with self.assertRaises(ValueError):
+                    XmlWriter(source)
+
+    def test_stream_is_lazy(self):
+        consumed = []
+
+        def rows():
+            for index in range(1000):
+                consumed.append(index)
+                yield {"id": index}
+
+        chunks = XmlWriter(
+            "<a>{% for tx in txs %}<b>{{ tx.id }}</b>{% endfor %}</a>"
+        ).stream(txs=rows())
+        self.assertEqual(next(chunks), "<a>")
+        self.assertEqual(len(consumed), 0)
+        self.assertEqual(next(chunks), "<b>0</b>")
+        self.assertEqual(next(chunks), "<b>1</b>")
+        self.assertEqual(len(consumed), 2)
+
+    def test_render_around_and_in_loop(self):
+        writer = XmlWriter(
+            '<a>{{ name }}{% for tx in txs %}<b i="{{ loop.index }}">'
+            "{{ name }}{{ tx.id }}</b>{% endfor %}</a>"
+        )
+        txs = [{"id": index} for index in range(5)]
+        self.assertEqual(writer.loop_variable, "txs")
+        head, tail = writer.render_around_loop(name="&")
+        fragments = [
+            writer.render_loop(txs[:2], 0, name="&"),
+            writer.render_loop(txs[2:], 2, name="&"),
+        ]
+        self.assertEqual(
+            head + "".join(fragments) + tail,
+            writer.render(name="&", txs=txs),
+        )
+        self.assertTrue(fragments[1].startswith('<b i="3">&amp;2'))
+
+        for source in (
+            "<a/>",
+            "{% for tx in txs %}{% endfor %}{% for tx in txs %}{% endfor %}",
+            "{% if a %}{% for tx in txs %}{% endfor %}{% endif %}",
+        ):
+            with self.subTest(source=source):
+                writer = XmlWriter(source)
+                self.assertIsNone(writer.loop_variable)
+                with self.assertRaises(ValueError):
+                    writer.render_around_loop()
+
+    def test_load_xml_template_engine(self):
+        writer = load_xml_template("tests/data/template.xml", "direct")
+        self.assertIsInstance(writer, XmlWriter)
+        self.assertIs(
+            load_xml_template(
+                os.path.abspath("tests/data/template.xml"), engine="direct"
+            ),
+            writer,
+        )
+        with self.assertRaises(ValueError):
+            load_xml_template("tests/data/template.xml", "xslt")
+
+
+if __name__ == "__main__":
+    unittest.main()
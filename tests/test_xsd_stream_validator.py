@@ -0,0 +1,149 @@
+# Copyright (C) 2023-2024 Sebastien Rousseau.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as et
+from io import StringIO
+from unittest.mock import patch
+
+from pain001.xml.load_xsd_schema import load_xsd_schema
+from pain001.xml.xsd_stream_validator import XsdStreamValidator
+
+# Test if XML content is validated correctly while it is being fed
+
+
+class TestXsdStreamValidator(unittest.TestCase):
+    def setUp(self):
+        """
+        Test case setup method.
+        """
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xsd_file = os.path.join(self.temp_dir.name, "test_schema.xsd")
+
+        # Create test XSD schema file with an unbounded and a bounded
+        # element below the root
+        with open(self.xsd_file, "w") as f:
+            f.write(
+                """
+            <xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+                <xs:element name="root">
+                    <xs:complexType>
+                        <xs:sequence>
+                            <xs:element name="tx" maxOccurs="unbounded">
+                                <xs:complexType>
+                                    <xs:sequence>
+                                        <xs:element name="amount"
+                                            type="xs:decimal"/>
+                                    </xs:sequence>
+                                </xs:complexType>
+                            </xs:element>
+                            <xs:element name="note" type="xs:string"
+                                maxOccurs="2"/>
+                        </xs:sequence>
+                    </xs:complexType>
+                </xs:element>
+            </xs:schema>
+            """
+            )
+
+    def tearDown(self):
+        """
+        Test case tear down method.
+        """
+        self.temp_dir.cleanup()
+
+    def validate(self, xml_content, chunk_size=7, jobs=None):
+        validator = XsdStreamValidator(
+            self.xsd_file, fragment_depth=1, jobs=jobs
+        )
+        for i in range(0, len(xml_content), chunk_size):
+            validator.feed(xml_content[i : i + chunk_size])
+        is_valid = validator.close()
+        self.errors = validator.errors
+        return is_valid
+
+    def test_valid_content(self):
+        """
+        Test case for valid content fed in small chunks.
+        """
+        txs = "".join(f"<tx><amount>{i}.5</amount></tx>" for i in range(50))
+        assert self.validate(f"<root>{txs}<note>a</note></root>")
+
+    def test_invalid_repeated_element(self):
+        """
+        Test case for an invalid element that is released after validation.
+        """
+        txs = "<tx><amount>1</amount></tx>" * 5
+        txs += "<tx><amount>abc</amount></tx>"
+        assert not self.validate(f"<root>{txs}<note>a</note></root>")
+
+    def test_bounded_element_is_not_released(self):
+        """
+        Test case for a repeated element with a maximum number of occurrences.
+        """
+        notes = "<note>a</note>" * 3
+        xml_content = f"<root><tx><amount>1</amount></tx>{notes}</root>"
+        assert not self.validate(xml_content)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("pain001.xml.xsd_stream_validator.FRAGMENT_BATCH_SIZE", 2)
+    def test_parallel_validation_reports_whole_document_errors(
+        self, mock_stdout
+    ):
+        """
+        Test case for the errors found by the worker processes.
+        """
+        xsd = load_xsd_schema(self.xsd_file)
+        txs = [f"<tx><amount>{i}</amount></tx>" for i in range(7)]
+        for xml_content in (
+            f"<root>{''.join(txs)}<note>a</note></root>",
+            f"<root>{''.join(txs)}</root>",
+            "<root><tx><amount>x</amount></tx><note>a</note></root>",
+            "<root>{}<note>a</note><note/><note/></root>".format(
+                "".join(txs[:2] + ["<tx><amount>x</amount><b/></tx>"] * 3)
+            ),
+            "<root>{}</root>".format(
+                "".join(txs[:4] + ["<tx/>"] + txs[4:] + ["<tx><b/></tx>"])
+            ),
+        ):
+            with self.subTest(xml_content=xml_content):
+                expected = [
+                    error.path
+                    for error in xsd.iter_errors(et.fromstring(xml_content))
+                ]
+                is_valid = self.validate(xml_content, jobs=2)
+                self.assertEqual(is_valid, not expected)
+                self.assertEqual(
+                    [error.path for error in self.errors], expected
+                )
+        self.assertTrue(
+            self.validate(
+                "<root><tx><amount>1</amount></tx><note>a</note></root>",
+                jobs=2,
+            )
+        )
+
+    def test_malformed_content(self):
+        """
+        Test case for content that is not well-formed XML.
+        """
+        assert not self.validate("<root><tx><amount>1</amount></root>")
+        assert not self.validate("")
+
+
+if __name__ == "__main__":
+    unittest.main()